@@ -0,0 +1,281 @@
+"""
+Referencing: The buckets in this file are doubly linked in the same way as
+the nodes of DSALinkedList.py, submitted by Jakob Wyatt in prac 3.
+"""
+
+import unittest
+
+
+class DSABucketEntry:
+    """
+    This class is used to represent a value inside the DSABucketQueue class.
+    It is returned when the value is added, and is used to change or remove
+    the value in O(1) time.
+    """
+
+    def __init__(self, value: object, bucket: 'DSABucket'):
+        self._value = value
+        self._bucket = bucket
+        self._prev = None
+        self._next = None
+
+    @property
+    def value(self) -> object:
+        return self._value
+
+    @property
+    def priority(self) -> int:
+        return self._bucket._priority
+
+
+class DSABucket:
+    """
+    This class holds every entry of a DSABucketQueue with the same priority,
+    in a doubly linked list.
+    """
+
+    def __init__(self, priority: int, lower: 'DSABucket',
+                 higher: 'DSABucket'):
+        self._priority = priority
+        self._lower = lower
+        self._higher = higher
+        self._head = None
+        self._tail = None
+
+
+class DSABucketQueue:
+    """
+    This class implements a priority queue of integer priorities, where
+    priorities usually change by one at a time, such as the degree of a
+    vertex. Each priority with at least one value has a bucket, and buckets
+    are doubly linked in order of priority, so changing a priority by one,
+    or removing a value, takes O(1) time, and the k values with the highest
+    priority are found in O(k) time. Values with the same priority are kept
+    in the order they reached that priority.
+    """
+
+    def __init__(self):
+        self._highest = None
+        self._lowest = None
+        self._count = 0
+
+    def add(self, value: object, priority: int = 0) -> 'DSABucketEntry':
+        """
+        Adds value with priority. This takes O(1) time if priority is not
+        between the priorities of other values, and otherwise takes time
+        proportional to the number of higher or lower priorities.
+        """
+        if self._highest is None or priority > self._highest._priority:
+            bucket = self._bucket(priority, self._highest, None)
+        elif priority - self._lowest._priority <= (self._highest._priority
+                                                   - priority):
+            bucket = self._lowest
+            while bucket._priority < priority:
+                bucket = bucket._higher
+            if bucket._priority != priority:
+                bucket = self._bucket(priority, bucket._lower, bucket)
+        else:
+            bucket = self._highest
+            while bucket._priority > priority:
+                bucket = bucket._lower
+            if bucket._priority != priority:
+                bucket = self._bucket(priority, bucket, bucket._higher)
+        entry = DSABucketEntry(value, bucket)
+        DSABucketQueue._append(entry, bucket)
+        self._count += 1
+        return entry
+
+    def remove(self, entry: 'DSABucketEntry') -> object:
+        if entry._bucket is None:
+            raise ValueError("Entry has been removed.")
+        self._detach(entry)
+        entry._bucket = None
+        self._count -= 1
+        return entry._value
+
+    def increment(self, entry: 'DSABucketEntry') -> None:
+        bucket = entry._bucket
+        higher = bucket._higher
+        if higher is None or higher._priority != bucket._priority + 1:
+            higher = self._bucket(bucket._priority + 1, bucket, higher)
+        self._detach(entry)
+        entry._bucket = higher
+        DSABucketQueue._append(entry, higher)
+
+    def decrement(self, entry: 'DSABucketEntry') -> None:
+        bucket = entry._bucket
+        lower = bucket._lower
+        if lower is None or lower._priority != bucket._priority - 1:
+            lower = self._bucket(bucket._priority - 1, lower, bucket)
+        self._detach(entry)
+        entry._bucket = lower
+        DSABucketQueue._append(entry, lower)
+
+    def move(self, entry: 'DSABucketEntry', delta: int) -> None:
+        """
+        Changes the priority of entry by delta, leaving it in the same place
+        as delta calls to :func:`increment` or :func:`decrement` would.
+        This takes time proportional to the number of priorities passed
+        over, rather than to delta.
+        """
+        if delta == 0:
+            return
+        bucket = entry._bucket
+        priority = bucket._priority + delta
+        if delta > 0:
+            lower, higher = bucket, bucket._higher
+            while higher is not None and higher._priority < priority:
+                lower, higher = higher, higher._higher
+            target = higher
+        else:
+            lower, higher = bucket._lower, bucket
+            while lower is not None and lower._priority > priority:
+                lower, higher = lower._lower, lower
+            target = lower
+        if target is None or target._priority != priority:
+            target = self._bucket(priority, lower, higher)
+        self._detach(entry)
+        entry._bucket = target
+        DSABucketQueue._append(entry, target)
+
+    def top(self, k: int = None) -> list:
+        """
+        Returns the k values with the highest priority, or every value if k
+        is None, from highest to lowest priority.
+        """
+        ret = []
+        bucket = self._highest
+        while bucket is not None and (k is None or len(ret) < k):
+            entry = bucket._head
+            while entry is not None and (k is None or len(ret) < k):
+                ret.append(entry._value)
+                entry = entry._next
+            bucket = bucket._lower
+        return ret
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        def iterate(bucket):
+            while bucket is not None:
+                entry = bucket._head
+                while entry is not None:
+                    yield entry._value, bucket._priority
+                    entry = entry._next
+                bucket = bucket._lower
+        return iterate(self._highest)
+
+    # Private methods
+
+    def _bucket(self, priority: int, lower: 'DSABucket',
+                higher: 'DSABucket') -> 'DSABucket':
+        # Creates an empty bucket between lower and higher
+        bucket = DSABucket(priority, lower, higher)
+        if lower is None:
+            self._lowest = bucket
+        else:
+            lower._higher = bucket
+        if higher is None:
+            self._highest = bucket
+        else:
+            higher._lower = bucket
+        return bucket
+
+    @staticmethod
+    def _append(entry: 'DSABucketEntry', bucket: 'DSABucket') -> None:
+        entry._prev = bucket._tail
+        entry._next = None
+        if bucket._tail is None:
+            bucket._head = entry
+        else:
+            bucket._tail._next = entry
+        bucket._tail = entry
+
+    def _detach(self, entry: 'DSABucketEntry') -> None:
+        # Removes entry from its bucket, and removes the bucket if empty
+        bucket = entry._bucket
+        if entry._prev is None:
+            bucket._head = entry._next
+        else:
+            entry._prev._next = entry._next
+        if entry._next is None:
+            bucket._tail = entry._prev
+        else:
+            entry._next._prev = entry._prev
+        if bucket._head is None:
+            if bucket._lower is None:
+                self._lowest = bucket._higher
+            else:
+                bucket._lower._higher = bucket._higher
+            if bucket._higher is None:
+                self._highest = bucket._lower
+            else:
+                bucket._higher._lower = bucket._lower
+
+
+class UnitTestDSABucketQueue(unittest.TestCase):
+    """
+    This class contains unittests for the DSABucketQueue class.
+    """
+
+    def testAddRemove(self):
+        queue = DSABucketQueue()
+        entries = [queue.add(x, p) for x, p in
+                   [("a", 0), ("b", 3), ("c", 0), ("d", 1), ("e", 3),
+                    ("f", 2), ("g", -1)]]
+        self.assertEqual(len(queue), 7)
+        self.assertEqual(queue.top(),
+                         ["b", "e", "f", "d", "a", "c", "g"])
+        self.assertEqual(queue.top(3), ["b", "e", "f"])
+        self.assertEqual(queue.remove(entries[1]), "b")
+        self.assertEqual(queue.remove(entries[6]), "g")
+        self.assertRaises(ValueError, queue.remove, entries[1])
+        self.assertEqual(list(queue),
+                         [("e", 3), ("f", 2), ("d", 1), ("a", 0), ("c", 0)])
+        for x in entries[2:6]:
+            queue.remove(x)
+        self.assertEqual(queue.top(), ["a"])
+        queue.remove(entries[0])
+        self.assertEqual(queue.top(), [])
+        self.assertEqual(len(queue), 0)
+
+    def testIncrementDecrement(self):
+        queue = DSABucketQueue()
+        a = queue.add("a")
+        b = queue.add("b")
+        c = queue.add("c")
+        queue.increment(b)
+        queue.increment(b)
+        queue.increment(a)
+        self.assertEqual(list(queue), [("b", 2), ("a", 1), ("c", 0)])
+        queue.increment(c)
+        self.assertEqual(queue.top(), ["b", "a", "c"])
+        queue.decrement(b)
+        # b reached 1 after a and c
+        self.assertEqual(queue.top(), ["a", "c", "b"])
+        self.assertEqual(b.priority, 1)
+        for x in (a, b, c):
+            queue.decrement(x)
+            queue.decrement(x)
+        self.assertEqual(list(queue), [("a", -1), ("b", -1), ("c", -1)])
+        queue.add("d", 5)
+        queue.add("e", 2)
+        self.assertEqual(queue.top(2), ["d", "e"])
+
+    def testMove(self):
+        moved = DSABucketQueue()
+        stepped = DSABucketQueue()
+        pairs = [(moved.add(x, x % 4), stepped.add(x, x % 4))
+                 for x in range(12)]
+        for i in range(60):
+            x, y = pairs[(i * 7) % len(pairs)]
+            delta = (i * 5) % 9 - 4
+            moved.move(x, delta)
+            for _ in range(abs(delta)):
+                if delta > 0:
+                    stepped.increment(y)
+                else:
+                    stepped.decrement(y)
+            self.assertEqual(list(moved), list(stepped))
+        self.assertEqual(moved._lowest._priority, stepped._lowest._priority)
@@ -0,0 +1,370 @@
+"""
+Referencing: The interface of this class is the same as DSALinkedList.py,
+submitted by Jakob Wyatt in prac 3. The chunks are linked in the same way as
+the nodes of that list.
+"""
+
+import unittest
+import pickle
+
+
+class DSADequeChunk:
+    """
+    This class is used to represent a block of items inside the DSADeque
+    class. The items of the chunk are items[start:end], so that there is
+    free space at either end.
+    """
+
+    def __init__(self, size: int, atEnd: bool):
+        self._items = [None] * size
+        self._start = self._end = size if atEnd else 0
+        self._prev = None
+        self._next = None
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+
+class DSADeque:
+    """
+    This class implements a double ended queue with the same interface as
+    DSALinkedList. Items are stored in a doubly linked list of array chunks,
+    rather than in a node per item, so inserting at either end is O(1) and
+    iterating does not follow a pointer per item.
+
+    Chunks grow with the deque, from MIN_CHUNK up to MAX_CHUNK items.
+    Concatenation links the chunks of both deques in O(1) time, or copies a
+    small deque into the free space of the last chunk.
+    """
+
+    MIN_CHUNK = 4
+    MAX_CHUNK = 64
+
+    def __init__(self):
+        self._head = None
+        self._tail = None
+        # Cached count
+        self._count = 0
+
+    def _chunkSize(self) -> int:
+        return min(max(self._count, DSADeque.MIN_CHUNK), DSADeque.MAX_CHUNK)
+
+    def _link(self, chunk: DSADequeChunk, prev: DSADequeChunk,
+              next: DSADequeChunk):
+        chunk._prev = prev
+        chunk._next = next
+        if prev is None:
+            self._head = chunk
+        else:
+            prev._next = chunk
+        if next is None:
+            self._tail = chunk
+        else:
+            next._prev = chunk
+
+    def _unlink(self, chunk: DSADequeChunk):
+        if chunk._prev is None:
+            self._head = chunk._next
+        else:
+            chunk._prev._next = chunk._next
+        if chunk._next is None:
+            self._tail = chunk._prev
+        else:
+            chunk._next._prev = chunk._prev
+
+    def _removed(self, chunk: DSADequeChunk):
+        self._count -= 1
+        if chunk._start == chunk._end:
+            self._unlink(chunk)
+
+    def _find(self, item: object):
+        """
+        Returns the chunk and index of the first occurrence of item, or
+        (None, None) if it is not in the deque.
+        """
+        chunk = self._head
+        while chunk is not None:
+            try:
+                return chunk, chunk._items.index(item, chunk._start,
+                                                 chunk._end)
+            except ValueError:
+                chunk = chunk._next
+        return None, None
+
+    def __iter__(self):
+        def forward_gen(chunk):
+            while chunk is not None:
+                yield from chunk._items[chunk._start:chunk._end]
+                chunk = chunk._next
+        return forward_gen(self._head)
+
+    def __reversed__(self):
+        def reverse_gen(chunk):
+            while chunk is not None:
+                yield from reversed(chunk._items[chunk._start:chunk._end])
+                chunk = chunk._prev
+        return reverse_gen(self._tail)
+
+    def isEmpty(self) -> bool:
+        return self._count == 0
+
+    def insertFirst(self, item: object):
+        head = self._head
+        if head is None:
+            head = self._tail = self._head = DSADequeChunk(
+                DSADeque.MIN_CHUNK, True)
+        elif head._start == 0:
+            head = DSADequeChunk(self._chunkSize(), True)
+            self._link(head, None, self._head)
+        head._start -= 1
+        head._items[head._start] = item
+        self._count += 1
+
+    def insertLast(self, item: object):
+        tail = self._tail
+        if tail is None:
+            tail = self._tail = self._head = DSADequeChunk(
+                DSADeque.MIN_CHUNK, False)
+        elif tail._end == len(tail._items):
+            tail = DSADequeChunk(self._chunkSize(), False)
+            self._link(tail, self._tail, None)
+        tail._items[tail._end] = item
+        tail._end += 1
+        self._count += 1
+
+    def insertBefore(self, item: object, before: object):
+        """
+        Inserts item before the first occurrence of before, or at the end
+        of the deque if before is not found.
+        """
+        chunk, i = self._find(before)
+        if chunk is None:
+            self.insertLast(item)
+            return
+        items = chunk._items
+        if chunk._start > 0:
+            items[chunk._start - 1:i - 1] = items[chunk._start:i]
+            chunk._start -= 1
+            items[i - 1] = item
+        elif chunk._end < len(items):
+            items[i + 1:chunk._end + 1] = items[i:chunk._end]
+            chunk._end += 1
+            items[i] = item
+        else:
+            # Split the full chunk, moving the items before i into a new
+            # chunk along with item
+            split = DSADequeChunk(len(items), False)
+            split._items[:i] = items[:i]
+            split._items[i] = item
+            split._end = i + 1
+            items[:i] = [None] * i
+            chunk._start = i
+            self._link(split, chunk._prev, chunk)
+        self._count += 1
+
+    def peekFirst(self) -> object:
+        if self._head is None:
+            raise ValueError("Deque is empty.")
+        return self._head._items[self._head._start]
+
+    def peekLast(self) -> object:
+        if self._tail is None:
+            raise ValueError("Deque is empty.")
+        return self._tail._items[self._tail._end - 1]
+
+    def removeFirst(self) -> object:
+        head = self._head
+        item = None
+        if head is not None:
+            item = head._items[head._start]
+            head._items[head._start] = None
+            head._start += 1
+            self._removed(head)
+        return item
+
+    def removeLast(self) -> object:
+        tail = self._tail
+        item = None
+        if tail is not None:
+            tail._end -= 1
+            item = tail._items[tail._end]
+            tail._items[tail._end] = None
+            self._removed(tail)
+        return item
+
+    def remove(self, item: object) -> object:
+        """
+        Removes the first occurrence of item, and returns it, or None if it
+        is not in the deque.
+        """
+        chunk, i = self._find(item)
+        if chunk is not None:
+            items = chunk._items
+            item = items[i]
+            # Close the gap from the shorter side
+            if i - chunk._start < chunk._end - i - 1:
+                items[chunk._start + 1:i + 1] = items[chunk._start:i]
+                items[chunk._start] = None
+                chunk._start += 1
+            else:
+                items[i:chunk._end - 1] = items[i + 1:chunk._end]
+                chunk._end -= 1
+                items[chunk._end] = None
+            self._removed(chunk)
+        else:
+            item = None
+        return item
+
+    def find(self, item: object) -> bool:
+        return self._find(item)[0] is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def concat(self, other: 'DSADeque'):
+        """
+        Moves every item of other onto the end of this deque, leaving other
+        empty.
+        """
+        if other is not self and other._head is not None:
+            tail = self._tail
+            if (other._head is other._tail and tail is not None
+               and len(other._head) <= len(tail._items) - tail._end):
+                # other fits in the free space of the last chunk
+                chunk = other._head
+                tail._items[tail._end:tail._end + len(chunk)] = (
+                    chunk._items[chunk._start:chunk._end])
+                tail._end += len(chunk)
+            else:
+                other._head._prev = tail
+                if tail is None:
+                    self._head = other._head
+                else:
+                    tail._next = other._head
+                self._tail = other._tail
+            self._count += other._count
+            other._head = None
+            other._tail = None
+            other._count = 0
+        return self
+
+
+class UnitTestDSADeque(unittest.TestCase):
+    """
+    This class contains unittests for the DSADeque class.
+    """
+
+    def testConstructorIsEmpty(self):
+        dq = DSADeque()
+        self.assertTrue(dq.isEmpty())
+        self.assertRaises(ValueError, dq.peekFirst)
+        self.assertRaises(ValueError, dq.peekLast)
+        self.assertIsNone(dq.removeFirst())
+        self.assertIsNone(dq.removeLast())
+
+    def testSimpleInsertAndPeek(self):
+        dq = DSADeque()
+        dq.insertFirst("abc")
+        self.assertEqual(dq.peekFirst(), "abc")
+        self.assertEqual(dq.peekLast(), "abc")
+        dq.insertFirst("asd")
+        self.assertEqual(dq.peekFirst(), "asd")
+        self.assertEqual(dq.peekLast(), "abc")
+
+    def testIter(self):
+        dq = DSADeque()
+        # Enough items to span several chunks in both directions
+        for x in range(200):
+            if x % 3 == 0:
+                dq.insertFirst(x)
+            else:
+                dq.insertLast(x)
+        expected = ([x for x in reversed(range(200)) if x % 3 == 0]
+                    + [x for x in range(200) if x % 3 != 0])
+        self.assertEqual(list(dq), expected)
+        self.assertEqual(list(reversed(dq)), expected[::-1])
+        self.assertEqual(len(dq), 200)
+
+    def testAdvInsertDelete(self):
+        dq = DSADeque()
+        dq.insertFirst("a")
+        dq.insertBefore("b", "a")
+        dq.insertLast("c")
+        dq.insertBefore("d", "c")
+        dq.insertBefore("e", "z")
+        self.assertEqual(list(dq), ["b", "a", "d", "c", "e"])
+        self.assertEqual(dq.removeFirst(), "b")
+        self.assertEqual(dq.remove("d"), "d")
+        self.assertIsNone(dq.remove("d"))
+        self.assertEqual(dq.removeLast(), "e")
+        self.assertEqual(list(dq), ["a", "c"])
+        self.assertTrue(dq.find("c"))
+        self.assertFalse(dq.find("d"))
+
+    def testMatchesList(self):
+        dq = DSADeque()
+        expected = []
+        for x in range(300):
+            if x % 5 == 0 and expected:
+                before = expected[(x * 7) % len(expected)]
+                dq.insertBefore(x, before)
+                expected.insert(expected.index(before), x)
+            elif x % 7 == 0:
+                dq.insertFirst(x)
+                expected.insert(0, x)
+            else:
+                dq.insertLast(x)
+                expected.append(x)
+            if x % 4 == 0:
+                item = expected[(x * 13) % len(expected)]
+                self.assertEqual(dq.remove(item), item)
+                expected.remove(item)
+        self.assertEqual(list(dq), expected)
+        self.assertEqual(list(reversed(dq)), expected[::-1])
+        self.assertEqual(len(dq), len(expected))
+        while not dq.isEmpty():
+            self.assertEqual(dq.removeLast(), expected.pop())
+            if expected:
+                self.assertEqual(dq.removeFirst(), expected.pop(0))
+        self.assertEqual(len(dq), 0)
+        self.assertEqual(list(dq), [])
+
+    def testSerialization(self):
+        cucumber = DSADeque()
+        cucumber.insertFirst("abc")
+        cucumber.insertFirst("jkl")
+        cucumber.insertFirst("xyz")
+        gherkin = pickle.loads(pickle.dumps(cucumber))
+        self.assertEqual(list(gherkin), list(cucumber))
+
+    def testConcat(self):
+        l1 = DSADeque()
+        l2 = DSADeque()
+        l2.insertLast(1)
+        l2.insertLast(2)
+        l2.insertLast(3)
+        l2.insertLast(4)
+        l1.insertFirst(-1)
+        l1.insertLast(0)
+        self.assertEqual(list(l1.concat(l2)), list(range(-1, 5)))
+        self.assertEqual(len(l1), 6)
+        self.assertEqual(len(l2), 0)
+        l3 = DSADeque()
+        l4 = DSADeque()
+        l4.insertLast(1)
+        self.assertEqual(list(l3.concat(l4)), [1])
+        self.assertEqual(len(l3), 1)
+        # Small deques are copied into free space
+        l3.concat(l1)
+        l5 = DSADeque()
+        l5.insertFirst(9)
+        l3.concat(l5)
+        l3.insertLast(10)
+        self.assertEqual(list(l3), [1] + list(range(-1, 5)) + [9, 10])
+        self.assertEqual(list(reversed(l3)),
+                         [10, 9] + list(range(4, -2, -1)) + [1])
+        self.assertEqual(list(l3.concat(DSADeque())), list(l3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,7 +9,9 @@ import typing
 
 import numpy as np
 
+from ADT.DSABucketQueue import DSABucketQueue
 from ADT.DSAHashTable import DSAHashTable
+from ADT.DSASmallTable import DSASmallTable
 
 
 class DSADirectedGraphVertex:
@@ -20,14 +22,35 @@ class DSADirectedGraphVertex:
     "predecessor" so that it can remain use agnostic, and can be carried over
     to other projects that may require a graph implementation.
     This is a container class intended for use within the DSADirectedGraph
-    class.
+    class. If the vertex belongs to a graph, changes to its edges are
+    recorded in the epoch of that graph.
+    After the graph is forked, the edge tables of the vertex may be shared
+    with the fork, so they are copied before they are next changed.
+    Edge tables start as a DSASmallTable, and are promoted to a DSAHashTable
+    when they fill up. A promoted table is made small again before the next
+    insert once half of its keys are removed, and when it is copied.
     """
 
-    def __init__(self, label: object, value: object):
+    def __init__(self, label: object, value: object,
+                 graph: 'DSADirectedGraph' = None, *,
+                 successor: 'DSAHashTable' = None,
+                 predecessor: 'DSAHashTable' = None):
         self._label = label
         self._value = value
-        self._successor = DSAHashTable()
-        self._predecessor = DSAHashTable()
+        self._graph = graph
+        self._successor = (DSASmallTable() if successor is None
+                           else successor)
+        self._predecessor = (DSASmallTable() if predecessor is None
+                             else predecessor)
+        # Number of forks of the graph when the edge tables were created
+        self._forks = 0 if graph is None else graph._forks
+        self._outDegree = len(self._successor)
+        self._inDegree = len(self._predecessor)
+        # Object wrapping this vertex, kept by the owner of the graph so
+        # that a single wrapper is created per vertex
+        self.handle = None
+        # Entry in the in degree ranking of the graph
+        self._rank = None
 
     @property
     def label(self) -> object:
@@ -41,25 +64,54 @@ class DSADirectedGraphVertex:
     def successor(self) -> 'DSAHashTable':
         return self._successor
 
+    @property
+    def outDegree(self) -> int:
+        return self._outDegree
+
     def addSuccessor(self, vertex: 'DSADirectedGraphVertex') -> None:
+        """
+        Does not check for duplicates.
+        """
+        self._unshare()
+        self._successor = DSADirectedGraphVertex._grown(self._successor)
         self._successor.put(vertex.label, vertex)
+        self._outDegree += 1
 
     def removeSuccessor(self, vertex: 'DSADirectedGraphVertex') -> None:
+        self._unshare()
         self._successor.remove(vertex.label)
+        self._outDegree -= 1
 
     @property
     def predecessor(self) -> 'DSAHashTable':
         return self._predecessor
 
+    @property
+    def inDegree(self) -> int:
+        return self._inDegree
+
     def addPredecessor(self, vertex: 'DSADirectedGraphVertex') -> None:
+        """
+        Does not check for duplicates.
+        """
+        self._unshare()
+        self._predecessor = DSADirectedGraphVertex._grown(self._predecessor)
         self._predecessor.put(vertex.label, vertex)
+        self._inDegree += 1
+        if self._rank is not None:
+            self._graph._ranking.increment(self._rank)
 
     def removePredecessor(self, vertex: 'DSADirectedGraphVertex') -> None:
+        self._unshare()
         self._predecessor.remove(vertex.label)
+        self._inDegree -= 1
+        if self._rank is not None:
+            self._graph._ranking.decrement(self._rank)
 
     def addEdge(self, vertex: 'DSADirectedGraphVertex') -> None:
         self.addSuccessor(vertex)
         vertex.addPredecessor(self)
+        self.touch()
 
     def hasEdge(self, label: str) -> bool:
         return self.successor.hasKey(label)
@@ -68,6 +120,37 @@ class DSADirectedGraphVertex:
         vertex = self.successor.get(label)
         self.removeSuccessor(vertex)
         vertex.removePredecessor(self)
+        self.touch()
+
+    def touch(self) -> None:
+        """
+        Records that this vertex, or its value, has changed.
+        """
+        if self._graph is not None:
+            self._graph.touch()
+
+    def _unshare(self) -> None:
+        """
+        Copies the edge tables if the graph has been forked since they were
+        created. The copies have the same layout, and so the same iteration
+        order, as the originals.
+        """
+        if self._graph is not None and self._forks != self._graph._forks:
+            self._successor = DSASmallTable.fromLayout(
+                *self._successor.layout())
+            self._predecessor = DSASmallTable.fromLayout(
+                *self._predecessor.layout())
+            self._forks = self._graph._forks
+
+    @staticmethod
+    def _grown(table):
+        # Promotes small tables that have no room for another edge, and
+        # demotes large tables that have few edges left
+        if isinstance(table, DSASmallTable):
+            table = table.grown()
+        elif len(table) <= DSASmallTable.MAX_SIZE // 2:
+            table = DSASmallTable.fromLayout(*table.layout())
+        return table
 
     def __str__(self) -> str:
         return ("{label},{value}:{adj}"
@@ -82,6 +165,44 @@ class DSADirectedGraphVertex:
         return self.label == other.label
 
 
+class DSAForkedTable:
+    """
+    This class is a read only view of an edge table of another graph,
+    which is used by a fork of that graph until the table is changed.
+    Verticies of the other graph are translated into the matching verticies
+    of the fork as they are read.
+    """
+
+    def __init__(self, table: 'DSAHashTable', translate):
+        self._table = table
+        self._translate = translate
+
+    def get(self, key) -> 'DSADirectedGraphVertex':
+        return self._translate(self._table.get(key))
+
+    def hasKey(self, key) -> bool:
+        return self._table.hasKey(key)
+
+    def itemAt(self, index: int) -> tuple:
+        k, v = self._table.itemAt(index)
+        return (k, self._translate(v))
+
+    def layout(self):
+        capacity, entries, removed = self._table.layout()
+        return (capacity, [(i, k, self._translate(v)) for i, k, v in entries],
+                removed)
+
+    def loadFactor(self) -> float:
+        return self._table.loadFactor()
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self):
+        translate = self._translate
+        return ((k, translate(v)) for k, v in self._table)
+
+
 class DSADirectedGraph:
     """
     This class is an ADT of a directed graph, and contains functionality
@@ -89,16 +210,106 @@ class DSADirectedGraph:
 
     It is currently implemented using the DSAHashTable data structure,
     however it has been implemented using a DSALinkedList in the past.
+
+    The graph keeps a mutation epoch, which is incremented whenever a vertex
+    or edge is added or removed, or :func:`touch` is called. Derived values
+    can be cached against the epoch, and are valid for as long as the epoch
+    does not change.
     """
 
     def __init__(self):
         self._verticies = DSAHashTable()
+        self._epoch = 0
+        self._displayCache = (-1, None)
+        # Number of times this graph has been forked
+        self._forks = 0
+        # Translates verticies of the parent into verticies of this fork
+        self._forked = None
+        # Verticies by in degree
+        self._ranking = DSABucketQueue()
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def touch(self) -> None:
+        self._epoch += 1
+
+    @property
+    def verticies(self) -> 'DSAHashTable':
+        """
+        The table from label to vertex.
+        """
+        return self._verticies
+
+    def fork(self, copyValue=lambda value: value) -> 'DSADirectedGraph':
+        """
+        Creates a copy of the graph, where the value of each vertex is
+        copyValue(value). The edge tables of each vertex are shared by both
+        graphs until either graph changes them, so forking is O(V), and each
+        graph only copies the tables it changes. Tables and verticies are
+        iterated in the same order in both graphs.
+        """
+        self._forks += 1
+        fork = DSADirectedGraph()
+        # (vertex, copy) keyed by the identity of vertex
+        copies = {}
+
+        def translate(vertex):
+            entry = copies.get(id(vertex))
+            if entry is None or entry[0] is not vertex:
+                copy = DSADirectedGraphVertex(
+                    vertex.label, copyValue(vertex.value), fork,
+                    successor=DSAForkedTable(vertex.successor, translate),
+                    predecessor=DSAForkedTable(vertex.predecessor, translate))
+                copy._forks = -1
+                entry = (vertex, copy)
+                copies[id(vertex)] = entry
+            return entry[1]
+        capacity, entries, removed = self._verticies.layout()
+        fork._verticies = DSAHashTable.fromLayout(
+            capacity, [(i, k, translate(v)) for i, k, v in entries], removed)
+        fork._forked = translate
+        for vertex, _ in self._ranking:
+            fork._rankVertex(translate(vertex))
+        return fork
+
+    def forked(self, vertex: 'DSADirectedGraphVertex'
+               ) -> 'DSADirectedGraphVertex':
+        """
+        Returns the vertex of this fork that is a copy of vertex, a vertex
+        of the graph this was forked from.
+        """
+        if self._forked is None:
+            raise ValueError("Graph is not a fork.")
+        return self._forked(vertex)
+
+    def restore(self, verticies: 'DSAHashTable', epoch: int,
+                ranking=None) -> None:
+        """
+        Replaces every vertex of the graph with verticies, a table from
+        label to vertex, where each vertex was created with this graph.
+        If ranking lists every vertex as returned by :func:`ranking`, ties
+        are also restored in the same order.
+        This restores a saved graph exactly, including the iteration order
+        of its tables.
+        """
+        self._verticies = verticies
+        self._epoch = epoch
+        self._ranking = DSABucketQueue()
+        if ranking is None:
+            ranking = (v for _, v in verticies)
+        for vertex in ranking:
+            self._rankVertex(vertex)
 
     def addVertex(self, label: object, value: object) -> None:
         """
         Does not check for duplicates.
         """
-        self._verticies.put(label, DSADirectedGraphVertex(label, value))
+        vertex = DSADirectedGraphVertex(label, value, self)
+        self._verticies.put(label, vertex)
+        self._rankVertex(vertex)
+        self.touch()
 
     def removeVertex(self, label: object) -> None:
         vertex = self.getVertex(label)
@@ -107,16 +318,93 @@ class DSADirectedGraph:
         for _, v in vertex.successor:
             v.removePredecessor(vertex)
         self._verticies.remove(vertex.label)
+        self._unrankVertex(vertex)
+        self.touch()
+
+    def addVertices(self, verticies) -> None:
+        """
+        Adds every (label, value) in verticies, resizing the vertex table
+        at most once. Does not check for duplicates.
+        """
+        verticies = list(verticies)
+        self._verticies.reserve(len(verticies))
+        for label, value in verticies:
+            vertex = DSADirectedGraphVertex(label, value, self)
+            self._verticies.put(label, vertex)
+            self._rankVertex(vertex)
+        self.touch()
+
+    def removeVertices(self, labels) -> None:
+        """
+        Removes every vertex in labels. The epoch is only changed once.
+        """
+        try:
+            for label in labels:
+                vertex = self.getVertex(label)
+                for _, v in vertex.predecessor:
+                    v.removeSuccessor(vertex)
+                for _, v in vertex.successor:
+                    v.removePredecessor(vertex)
+                self._verticies.remove(vertex.label)
+                self._unrankVertex(vertex)
+        finally:
+            self.touch()
 
     def addEdge(self, label1: object, label2: object) -> None:
         self.getVertex(label1).addEdge(self.getVertex(label2))
 
+    def addEdges(self, edges) -> typing.List[bool]:
+        """
+        Adds every (label1, label2) edge in edges that does not already
+        exist. The epoch is only changed once.
+
+        Returns:
+            For each edge, whether it was added.
+        """
+        added = []
+        try:
+            for label1, label2 in edges:
+                vertex = self.getVertex(label1)
+                if vertex.hasEdge(label2):
+                    added.append(False)
+                else:
+                    other = self.getVertex(label2)
+                    vertex.addSuccessor(other)
+                    other.addPredecessor(vertex)
+                    added.append(True)
+        finally:
+            self.touch()
+        return added
+
     def hasEdge(self, label1: object, label2: object) -> bool:
         return self.getVertex(label1).hasEdge(label2)
 
     def removeEdge(self, label1: object, label2: object) -> None:
         self.getVertex(label1).removeEdge(label2)
 
+    def removeEdges(self, edges) -> typing.List[bool]:
+        """
+        Removes every (label1, label2) edge in edges that exists.
+        The epoch is only changed once.
+
+        Returns:
+            For each edge, whether it was removed.
+        """
+        removed = []
+        try:
+            for label1, label2 in edges:
+                vertex = self.getVertex(label1)
+                if vertex.hasEdge(label2):
+                    other = vertex.successor.get(label2)
+                    vertex.removeSuccessor(other)
+                    other.removePredecessor(vertex)
+                    removed.append(True)
+                else:
+                    removed.append(False)
+        finally:
+            self.touch()
+        return removed
+
     def hasVertex(self, label: object) -> bool:
         return self._verticies.hasKey(label)
 
@@ -124,7 +412,7 @@ class DSADirectedGraph:
         return len(self._verticies)
 
     def getEdgeCount(self) -> int:
-        return sum(len(v.successor) for _, v in self._verticies)
+        return sum(v.outDegree for _, v in self._verticies)
 
     def __iter__(self):
         return self._verticies.__iter__()
@@ -141,6 +429,21 @@ class DSADirectedGraph:
     def isSuccessor(self, label1: object, label2: object) -> bool:
         return self.getVertex(label1).successor.hasKey(label2)
 
+    def ranking(self, k: int = None) -> typing.List['DSADirectedGraphVertex']:
+        """
+        Returns the k verticies with the most predecessors, or every vertex
+        if k is None, in O(k) time. Verticies with the same number of
+        predecessors are in the order they reached that number.
+        """
+        return self._ranking.top(k)
+
+    def _rankVertex(self, vertex: 'DSADirectedGraphVertex') -> None:
+        vertex._rank = self._ranking.add(vertex, vertex.inDegree)
+
+    def _unrankVertex(self, vertex: 'DSADirectedGraphVertex') -> None:
+        self._ranking.remove(vertex._rank)
+        vertex._rank = None
+
     def displayAsList(self) -> str:
         return "".join(f"{v}\n" for _, v in self._verticies)
 
@@ -175,8 +478,12 @@ class DSADirectedGraph:
         return mat
 
     def display(self) -> str:
-        return ("digraph {\nrankdir=BT\nconcentrate=true\n"
-                + "".join([v.gv() for _, v in self._verticies]) + "}\n")
+        epoch, dot = self._displayCache
+        if epoch != self._epoch:
+            dot = ("digraph {\nrankdir=BT\nconcentrate=true\n"
+                   + "".join([v.gv() for _, v in self._verticies]) + "}\n")
+            self._displayCache = (self._epoch, dot)
+        return dot
 
     def render(self, *, type='svg', id=''):
         """
@@ -211,8 +518,8 @@ class DSADirectedGraph:
     def readGraphFile(filename: str) -> 'DSADirectedGraph':
         graph = DSADirectedGraph()
         with open(filename, "r") as f:
-            for l in f:
-                l1, l2 = l.rstrip("\n").split(" ")
+            for line in f:
+                l1, l2 = line.rstrip("\n").split(" ")
                 if not graph.hasVertex(l1):
                     graph.addVertex(l1, None)
                 if not graph.hasVertex(l2):
@@ -254,7 +561,7 @@ class UnitTestDSADirectedGraph(unittest.TestCase):
         self.assertFalse(graph.isSuccessor("world", "hello"))
         graph.addEdge("hello", "yeah")
         graph.addEdge("world", "hello")
-        for x1, x2 in zip(graph.getSuccessor("hello"), ["yeah", "world"]):
+        for x1, x2 in zip(graph.getSuccessor("hello"), ["world", "yeah"]):
             self.assertEqual(x1[0], x2)
         for x1, x2 in zip(graph.getPredecessor("hello"), ["world"]):
             self.assertEqual(x1[0], x2)
@@ -298,6 +605,131 @@ class UnitTestDSADirectedGraph(unittest.TestCase):
         graph.addEdge("yeah", "world")
         self.assertEqual(graph.getEdgeCount(), 3)
 
+    def testDegree(self):
+        graph = DSADirectedGraph()
+        graph.addVertices((x, None) for x in "abcd")
+        graph.addEdges([("a", "b"), ("a", "c"), ("b", "c"), ("d", "c")])
+        a = graph.getVertex("a")
+        c = graph.getVertex("c")
+        self.assertEqual((a.outDegree, a.inDegree), (2, 0))
+        self.assertEqual((c.outDegree, c.inDegree), (0, 3))
+        graph.removeEdges([("a", "c"), ("a", "c")])
+        graph.addEdge("c", "a")
+        self.assertEqual((a.outDegree, a.inDegree), (1, 1))
+        fork = graph.fork()
+        graph.removeVertex("b")
+        self.assertEqual((a.outDegree, c.inDegree), (0, 1))
+        self.assertEqual(fork.getVertex("c").inDegree, 2)
+        fork.removeVertices(["d"])
+        self.assertEqual(fork.getVertex("c").inDegree, 1)
+        for graph in (graph, fork):
+            for _, v in graph:
+                self.assertEqual(v.outDegree, len(v.successor))
+                self.assertEqual(v.inDegree, len(v.predecessor))
+
+    def testEdgeTables(self):
+        graph = DSADirectedGraph()
+        graph.addVertices((x, None) for x in range(20))
+        a = graph.getVertex(0)
+        for _ in range(3 * DSASmallTable.MAX_SIZE):
+            graph.addEdge(0, 1)
+            graph.removeEdge(0, 1)
+        self.assertIsInstance(a.successor, DSASmallTable)
+        self.assertIsInstance(graph.getVertex(1).predecessor, DSASmallTable)
+        for x in range(1, 20):
+            graph.addEdge(0, x)
+        self.assertIsInstance(a.successor, DSAHashTable)
+        for x in range(1, 17):
+            graph.removeEdge(0, x)
+        graph.addEdge(0, 1)
+        self.assertIsInstance(a.successor, DSASmallTable)
+        self.assertEqual([k for k, _ in a.successor], [17, 18, 19, 1])
+
+    def testRanking(self):
+        graph = DSADirectedGraph()
+        graph.addVertices((x, None) for x in "abcd")
+        graph.addEdges([("a", "c"), ("b", "c"), ("a", "d"), ("c", "b")])
+        self.assertEqual([v.label for v in graph.ranking()],
+                         ["c", "d", "b", "a"])
+        self.assertEqual([v.label for v in graph.ranking(2)], ["c", "d"])
+        fork = graph.fork()
+        graph.removeVertex("c")
+        graph.addEdge("d", "a")
+        self.assertEqual([v.label for v in graph.ranking()],
+                         ["d", "a", "b"])
+        self.assertEqual([v.label for v in fork.ranking()],
+                         ["c", "d", "b", "a"])
+        fork.removeEdge("a", "c")
+        fork.removeEdge("b", "c")
+        self.assertEqual([v.label for v in fork.ranking()],
+                         ["d", "b", "a", "c"])
+
+    def testEpoch(self):
+        graph = DSADirectedGraph()
+        epoch = graph.epoch
+        graph.addVertex("a", None)
+        graph.addVertex("b", None)
+        self.assertGreater(graph.epoch, epoch)
+        dot = graph.display()
+        self.assertIs(dot, graph.display())
+        epoch = graph.epoch
+        graph.getVertex("a").addEdge(graph.getVertex("b"))
+        self.assertGreater(graph.epoch, epoch)
+        self.assertIsNot(dot, graph.display())
+        epoch = graph.epoch
+        graph.removeVertex("b")
+        self.assertGreater(graph.epoch, epoch)
+
+    def testBulk(self):
+        graph = DSADirectedGraph()
+        graph.addVertices([(x, None) for x in "abcd"])
+        self.assertEqual(graph.getVertexCount(), 4)
+        epoch = graph.epoch
+        self.assertEqual(graph.addEdges([("a", "b"), ("a", "c"), ("a", "b"),
+                                         ("d", "a")]),
+                         [True, True, False, True])
+        self.assertEqual(graph.epoch, epoch + 1)
+        self.assertEqual(graph.getEdgeCount(), 3)
+        self.assertEqual(graph.removeEdges([("a", "b"), ("a", "b")]),
+                         [True, False])
+        self.assertFalse(graph.isSuccessor("a", "b"))
+        self.assertRaises(ValueError, graph.addEdges, [("b", "a"),
+                                                       ("b", "e")])
+        self.assertTrue(graph.isSuccessor("b", "a"))
+        graph.removeVertices(["a", "b"])
+        self.assertEqual(graph.getVertexCount(), 2)
+        self.assertEqual(graph.getEdgeCount(), 0)
+
+    def testFork(self):
+        graph = DSADirectedGraph()
+        graph.addVertices([(x, [x]) for x in "abcd"])
+        graph.addEdges([("a", "b"), ("b", "c"), ("c", "a"), ("d", "a")])
+        fork = graph.fork(list)
+        self.assertEqual(fork.displayExploded(), graph.displayExploded())
+        a = fork.getVertex("a")
+        self.assertIs(fork.forked(graph.getVertex("a")), a)
+        self.assertIsNot(a.value, graph.getVertex("a").value)
+        self.assertIs(a.successor.get("b"), fork.getVertex("b"))
+        self.assertRaises(ValueError, graph.forked, a)
+        # Tables are shared until they are changed
+        self.assertIsInstance(a.successor, DSAForkedTable)
+        # Changes are only seen by the graph that made them
+        fork.addEdge("a", "d")
+        fork.removeEdge("b", "c")
+        graph.addEdge("b", "d")
+        fork.removeVertex("c")
+        self.assertEqual(graph.getEdgeCount(), 5)
+        self.assertTrue(graph.isSuccessor("b", "c"))
+        self.assertFalse(graph.isSuccessor("a", "d"))
+        self.assertEqual(fork.getEdgeCount(), 3)
+        self.assertFalse(fork.isSuccessor("b", "d"))
+        self.assertEqual([k for k, _ in fork.getPredecessor("a")], ["d"])
+        self.assertIsInstance(a.successor, DSASmallTable)
+        second = fork.fork()
+        second.addEdge("b", "a")
+        self.assertFalse(fork.isSuccessor("b", "a"))
+        self.assertEqual(second.getEdgeCount(), 4)
+
     def testReadGraphFile(self):
         import os
         dirname = os.path.dirname(__file__)
@@ -5,10 +5,10 @@ submitted by Jakob Wyatt in prac 6.
 
 import unittest
 from enum import Enum
+from functools import lru_cache
+from itertools import islice
 from math import ceil
 
-import numpy as np
-
 
 class DSAHashEntry:
     """
@@ -57,16 +57,44 @@ class DSAHashTable:
     """
     This class is an impementation of an automatically resizing hash table,
     with O(1) amortized insert, delete, and find operations.
+
+    The entries of the table are kept in a dense array in insertion order,
+    and the hash array is a sparse index holding the position of each entry
+    in the dense array. Iteration only visits the dense array, so it takes
+    O(count) time, and visits keys in the order they were inserted.
+
+    Removed entries are left as tombstones, both in the hash array, where
+    they are probed past by every lookup that reaches them, and in the
+    dense array, where they are skipped by iteration. Once more than
+    maxTombstoneFactor of the table is tombstones, the table is rehashed in
+    place to clear them, which also compacts the dense array, so that
+    repeated inserts and removes do not lengthen probe chains without bound.
     """
 
+    # Hash array values that are not positions in the dense array
+    _EMPTY = -1
+    _REMOVED = -2
+    # Miller-Rabin bases that are sufficient for every x < 3.3 * 10^24
+    _witnesses = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
     # autoResize allows creation of a "dumb" non-resizing table
     def __init__(self, size=100, *, minLoadFactor=0,
-                 maxLoadFactor=0.5, resizeFactor=2, _autoResize=True):
-        self._hashArray = np.empty(DSAHashTable._nextPrime(size), dtype=object)
-        for i in range(len(self._hashArray)):
-            self._hashArray[i] = DSAHashEntry()
+                 maxLoadFactor=0.5, resizeFactor=2, maxTombstoneFactor=0.25,
+                 _autoResize=True):
+        self._hashArray = ([DSAHashTable._EMPTY]
+                           * DSAHashTable._nextPrime(size))
+        # Entries in insertion order, including removed entries
+        self._entries = []
+        # Positions of the entries that are not removed, built by itemAt
+        # when there are removed entries, or None if not built yet
+        self._live = None
         self._count = 0
+        # Number of removed entries
+        self._tombstones = 0
         self._autoResize = _autoResize
+        if maxTombstoneFactor <= 0 or maxTombstoneFactor > 1:
+            raise ValueError("Invalid max tombstone factor.")
+        self._maxTombstoneFactor = maxTombstoneFactor
 
         # Validating minLoadFactor and maxLoadFactor is difficult,
         # and amounts to verifying that the statement
@@ -97,45 +125,163 @@ class DSAHashTable:
         self._resizeFactor = resizeFactor
 
     def put(self, key, value: object) -> None:
-        candidate = self._find(key)
-        if candidate is None or candidate.state != DSAHashEntry.status.FULL:
+        slot = self._findSlot(key)
+        if slot is None and self._tombstones != 0:
+            # Every slot is full or removed
+            self._resize(len(self._hashArray))
+            slot = self._findSlot(key)
+        position = (DSAHashTable._EMPTY if slot is None
+                    else self._hashArray[slot])
+        if position < 0:
             # Inserting into table
             self._count += 1
             if self._autoResize:
                 if self._resizeIfNeeded():
-                    candidate = self._find(key)
-            candidate.state = DSAHashEntry.status.FULL
-            candidate.key = key
-        candidate.value = value
+                    slot = self._findSlot(key)
+            if slot is None:
+                self._count -= 1
+                raise ValueError("Table is full.")
+            if self._live is not None:
+                self._live.append(len(self._entries))
+            self._hashArray[slot] = len(self._entries)
+            self._entries.append(DSAHashEntry(key, value,
+                                              DSAHashEntry.status.FULL))
+        else:
+            self._entries[position].value = value
 
     def get(self, key) -> DSAHashEntry:
         candidate = self._find(key)
-        if candidate is None or candidate.state != DSAHashEntry.status.FULL:
+        if candidate is None:
             raise ValueError("Key not found.")
         return candidate.value
 
     def hasKey(self, key) -> bool:
-        candidate = self._find(key)
-        return (candidate is not None
-                and candidate.state == DSAHashEntry.status.FULL)
+        return self._find(key) is not None
+
+    def itemAt(self, index: int) -> tuple:
+        """
+        Returns the (key, value) pair at position index of the iteration
+        order. This takes O(1) time, apart from the first call after a key
+        is removed, which lists the positions of the remaining entries in
+        O(count) time. The table itself is not changed.
+        """
+        if self._tombstones == 0:
+            candidate = self._entries[index]
+        else:
+            if self._live is None:
+                self._live = [i for i, x in enumerate(self._entries)
+                              if x.state == DSAHashEntry.status.FULL]
+            candidate = self._entries[self._live[index]]
+        return (candidate.key, candidate.value)
 
     def remove(self, key) -> object:
-        candidate = self._find(key)
-        if candidate is None or candidate.state != DSAHashEntry.status.FULL:
+        slot = self._findSlot(key)
+        if slot is None or self._hashArray[slot] < 0:
             raise ValueError("Key not found.")
         self._count -= 1
         if self._autoResize:
             if self._resizeIfNeeded():
-                candidate = self._find(key)
+                slot = self._findSlot(key)
+        candidate = self._entries[self._hashArray[slot]]
+        self._live = None
+        self._hashArray[slot] = DSAHashTable._REMOVED
         candidate.state = DSAHashEntry.status.USED
         candidate.key = None
         value = candidate.value
         candidate.value = None
+        self._tombstones += 1
+        if (self._autoResize and self.tombstoneFactor()
+           > self._maxTombstoneFactor):
+            self._resize(len(self._hashArray))
         return value
 
+    def reserve(self, count: int) -> None:
+        """
+        Resizes the table once, so that count more keys can be inserted
+        without any further resizing. Tables with a minimum load factor are
+        not resized, as they would shrink again on the next insert.
+        """
+        required = ceil((len(self) + count) / self._maxLoadFactor)
+        if (self._autoResize and self._minLoadFactor == 0
+           and required > len(self._hashArray)):
+            self._resize(required)
+
+    def compact(self, shrink: bool = False) -> None:
+        """
+        Rehashes the table in place, clearing every tombstone. If shrink is
+        true, the table is also shrunk to leave room for its keys to grow
+        by resizeFactor before it is next resized.
+        """
+        size = len(self._hashArray)
+        if shrink:
+            size = min(size, ceil(max(len(self), 1) * self._resizeFactor
+                                  / self._maxLoadFactor))
+        self._resize(size)
+
     def loadFactor(self) -> float:
         return len(self) / len(self._hashArray)
 
+    def tombstoneFactor(self) -> float:
+        return self._tombstones / len(self._hashArray)
+
+    def probeLength(self) -> (float, int):
+        """
+        Returns the average and maximum number of slots that are probed to
+        find each key in the table, which is 1 if there are no collisions.
+        """
+        total = 0
+        longest = 0
+        for i, position in enumerate(self._hashArray):
+            if position >= 0:
+                key = self._entries[position].key
+                j = DSAHashTable._hash(key, len(self._hashArray))
+                step = DSAHashTable._stepHash(key, len(self._hashArray))
+                probes = 1
+                while j != i:
+                    j = (j + step) % len(self._hashArray)
+                    probes += 1
+                total += probes
+                longest = max(longest, probes)
+        return (total / len(self) if len(self) != 0 else 0.0), longest
+
+    def layout(self):
+        """
+        Returns the capacity of the table, the (slot, key, value) of every
+        entry in iteration order, and the slots of removed entries. A table
+        created from these by :func:`fromLayout` iterates and probes exactly
+        like this table.
+        """
+        slots = [None] * len(self._entries)
+        removed = []
+        for i, position in enumerate(self._hashArray):
+            if position >= 0:
+                slots[position] = i
+            elif position == DSAHashTable._REMOVED:
+                removed.append(i)
+        entries = [(slot, x.key, x.value)
+                   for slot, x in zip(slots, self._entries)
+                   if x.state == DSAHashEntry.status.FULL]
+        return len(self._hashArray), entries, removed
+
+    @staticmethod
+    def fromLayout(capacity: int, entries, removed) -> 'DSAHashTable':
+        """
+        Creates a table with default load factors from the result of
+        :func:`layout`.
+        """
+        table = DSAHashTable(capacity)
+        if len(table._hashArray) != capacity:
+            raise ValueError("Capacity must be prime.")
+        for i, key, value in entries:
+            table._hashArray[i] = len(table._entries)
+            table._entries.append(DSAHashEntry(key, value,
+                                               DSAHashEntry.status.FULL))
+        table._count = len(table._entries)
+        for i in removed:
+            table._hashArray[i] = DSAHashTable._REMOVED
+        table._tombstones = len(removed)
+        return table
+
     def export(self) -> str:
         return "".join([f"{k},{v}\n" for (k, v) in self])
 
@@ -152,22 +298,34 @@ class DSAHashTable:
     def __len__(self):
         return self._count
 
-    # Return None if there is no available space for the key
+    # Return None if the key is not in the table
     def _find(self, key) -> DSAHashEntry:
-        i = DSAHashTable._hash(key, len(self._hashArray))
-        stepHash = DSAHashTable._stepHash(key, len(self._hashArray))
-        candidate = self._hashArray[i]
+        slot = self._findSlot(key)
+        if slot is None or self._hashArray[slot] < 0:
+            return None
+        return self._entries[self._hashArray[slot]]
+
+    # Return the slot of the key, or the empty slot where it would be
+    # inserted, or None if there is no available space for the key
+    def _findSlot(self, key) -> int:
+        hashArray = self._hashArray
+        entries = self._entries
+        size = len(hashArray)
+        i = DSAHashTable._hash(key, size)
+        stepHash = DSAHashTable._stepHash(key, size)
+        position = hashArray[i]
         jumps = 0
-        while (candidate.key != key
-               and candidate.state != DSAHashEntry.status.EMPTY
-               and jumps < len(self._hashArray)):
+        while (position != DSAHashTable._EMPTY
+               and (position == DSAHashTable._REMOVED
+                    or entries[position].key != key)
+               and jumps < size):
             jumps += 1
-            i = (i + stepHash) % len(self._hashArray)
-            candidate = self._hashArray[i]
+            i = (i + stepHash) % size
+            position = hashArray[i]
 
-        if jumps == len(self._hashArray):
-            candidate = None
-        return candidate
+        if jumps == size:
+            i = None
+        return i
 
     def _resizeIfNeeded(self) -> bool:
         resized = False
@@ -181,17 +339,27 @@ class DSAHashTable:
         return resized
 
     def _resize(self, size):
+        # Entries are moved rather than copied, so that iterators over the
+        # old dense array still see later removals
         newTable = DSAHashTable(size, _autoResize=False)
-        for k, v in self:
-            newTable.put(k, v)
+        for x in self._entries:
+            if x.state == DSAHashEntry.status.FULL:
+                slot = newTable._findSlot(x.key)
+                newTable._hashArray[slot] = len(newTable._entries)
+                newTable._entries.append(x)
         self._hashArray = newTable._hashArray
+        self._entries = newTable._entries
+        self._live = None
+        self._tombstones = 0
 
     def __iter__(self):
-        def hashIter(hashArray):
-            for x in hashArray:
+        # Iterates over the entries that existed when iteration started,
+        # so that keys can be removed while iterating
+        def hashIter(entries):
+            for x in entries:
                 if x.state == DSAHashEntry.status.FULL:
                     yield (x.key, x.value)
-        return hashIter(self._hashArray)
+        return hashIter(islice(self._entries, len(self._entries)))
 
     @staticmethod
     def _hash(key, len: int) -> int:
@@ -233,22 +401,40 @@ class DSAHashTable:
         return hash
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def _nextPrime(x: int) -> int:
-        if x < 3:
-            x = 2
-        else:
-            # Can be made more efficient
-            x = x - 1 if x % 2 == 0 else x - 2
-            isPrime = False
-            while not isPrime:
-                i = 3
-                x += 2
-                isPrime = True
-                while i ** 2 <= x and isPrime:
-                    if x % i == 0:
-                        isPrime = False
-                    i += 2
-        return x
+        # Tables are created with the same few sizes over and over, so the
+        # primes found for recent sizes are remembered
+        prime = 2 if x < 3 else x + (x % 2 == 0)
+        while not DSAHashTable._isPrime(prime):
+            prime += 2
+        return prime
+
+    @staticmethod
+    def _isPrime(x: int) -> bool:
+        """
+        Deterministic Miller-Rabin test, which is exact for x < 3.3 * 10^24.
+        """
+        if x < 2:
+            return False
+        for p in DSAHashTable._witnesses:
+            if x % p == 0:
+                return x == p
+        d = x - 1
+        s = 0
+        while d % 2 == 0:
+            d //= 2
+            s += 1
+        for a in DSAHashTable._witnesses:
+            y = pow(a, d, x)
+            if y != 1 and y != x - 1:
+                for _ in range(s - 1):
+                    y = y * y % x
+                    if y == x - 1:
+                        break
+                else:
+                    return False
+        return True
 
 
 class UnitTestDSAHashTable(unittest.TestCase):
@@ -267,6 +453,18 @@ class UnitTestDSAHashTable(unittest.TestCase):
         self.assertEqual(5, DSAHashTable._nextPrime(4))
         self.assertEqual(5, DSAHashTable._nextPrime(5))
         self.assertEqual(163, DSAHashTable._nextPrime(158))
+        # Agrees with trial division
+        for x in range(2000):
+            prime = max(x, 2)
+            while any(prime % i == 0 for i in range(2, int(prime ** 0.5) + 1)):
+                prime += 1
+            self.assertEqual(prime, DSAHashTable._nextPrime(x))
+            self.assertEqual(prime, DSAHashTable._nextPrime(prime))
+        self.assertEqual(2 ** 61 - 1, DSAHashTable._nextPrime(2 ** 61 - 20))
+        # Only recent sizes are remembered
+        info = DSAHashTable._nextPrime.cache_info()
+        self.assertEqual(info.currsize, info.maxsize)
+        self.assertFalse(DSAHashTable._isPrime(3215031751))
 
     def TputGetResize(self, *, rf, lb, ub):
         table = DSAHashTable(1, minLoadFactor=lb,
@@ -311,6 +509,95 @@ class UnitTestDSAHashTable(unittest.TestCase):
         table.put(4, 4)
         self.assertEqual(1.0, table.loadFactor())
 
+    def testReserve(self):
+        table = DSAHashTable(4)
+        table.reserve(1000)
+        size = len(table._hashArray)
+        self.assertGreaterEqual(size, 2000)
+        for x in range(1000):
+            table.put(x, x)
+        self.assertEqual(size, len(table._hashArray))
+        for x in range(1000):
+            self.assertEqual(table.get(x), x)
+
+    def testLayout(self):
+        table = DSAHashTable(4)
+        for x in range(20):
+            table.put(str(x), x)
+        for x in range(0, 20, 3):
+            table.remove(str(x))
+        copy = DSAHashTable.fromLayout(*table.layout())
+        self.assertEqual(list(copy), list(table))
+        self.assertEqual(len(copy), len(table))
+        for x in range(20, 40):
+            table.put(str(x), x)
+            copy.put(str(x), x)
+        self.assertEqual(list(copy), list(table))
+        self.assertRaises(ValueError, DSAHashTable.fromLayout, 100, [], [])
+
+    def testTombstones(self):
+        table = DSAHashTable(50)
+        capacity = len(table._hashArray)
+        # Churn through many more keys than the table holds
+        for x in range(2000):
+            table.put(x, x)
+            if x >= 10:
+                table.remove(x - 10)
+            self.assertLessEqual(table.tombstoneFactor(), 0.25)
+        self.assertEqual(len(table._hashArray), capacity)
+        self.assertEqual(sorted(k for k, _ in table), list(range(1990, 2000)))
+        average, longest = table.probeLength()
+        self.assertGreaterEqual(average, 1)
+        self.assertLessEqual(average, longest)
+        copy = DSAHashTable.fromLayout(*table.layout())
+        self.assertEqual(copy.tombstoneFactor(), table.tombstoneFactor())
+        table.compact()
+        self.assertEqual(table.tombstoneFactor(), 0)
+        self.assertEqual(len(table._hashArray), capacity)
+        table.compact(shrink=True)
+        self.assertLess(len(table._hashArray), capacity)
+        for x in range(1990, 2000):
+            self.assertEqual(table.get(x), x)
+        self.assertEqual(DSAHashTable().probeLength(), (0.0, 0))
+        # A full table without any empty slots still accepts new keys
+        table = DSAHashTable(5, maxLoadFactor=1, maxTombstoneFactor=1)
+        for x in range(5):
+            table.put(x, x)
+        table.remove(0)
+        table.put(5, 5)
+        self.assertEqual(sorted(k for k, _ in table), [1, 2, 3, 4, 5])
+        self.assertRaises(ValueError, DSAHashTable, maxTombstoneFactor=0)
+
+    def testIteration(self):
+        table = DSAHashTable(1000)
+        keys = [(x * 37) % 300 for x in range(300)]
+        for x in keys:
+            table.put(x, str(x))
+        for x in range(0, 300, 6):
+            table.remove(x)
+        table.put(6, "6")
+        # Keys are visited in the order they were inserted
+        full = [(x, str(x)) for x in keys if x % 6 != 0] + [(6, "6")]
+        self.assertEqual(list(table), full)
+        copy = DSAHashTable.fromLayout(*table.layout())
+        self.assertEqual(list(copy), full)
+        self.assertEqual(copy.tombstoneFactor(), table.tombstoneFactor())
+        layout = table.layout()
+        for i, item in enumerate(full):
+            self.assertEqual(table.itemAt(i), item)
+        self.assertEqual(table.itemAt(-1), full[-1])
+        # Reading by position does not rehash the table
+        self.assertEqual(table.layout(), layout)
+        table.put(12, "12")
+        self.assertEqual(table.itemAt(-1), (12, "12"))
+        table.remove(full[0][0])
+        self.assertEqual(table.itemAt(0), full[1])
+        # Keys can be removed while iterating, even if the table is
+        # rehashed part way through
+        for k, _ in table:
+            table.remove(k)
+        self.assertEqual(list(table), [])
+
     def testHashTableParams(self):
         ub = 0.5
         lb = 0
@@ -115,6 +115,21 @@ class DSAHeap:
             self._trickleDown(0)
         self._count = size
 
+    @staticmethod
+    def fromEntries(values: List[Tuple[object, object]],
+                    size: int = 100) -> 'DSAHeap':
+        """
+        Creates a heap whose array holds the (priority, value) pairs of
+        values in order, as generated by iterating over a heap.
+        The heap property is not restored.
+        """
+        heap = DSAHeap(max(size, len(values), 1))
+        for i, (priority, value) in enumerate(values):
+            heap._heap[i].priority = priority
+            heap._heap[i].value = value
+        heap._count = len(values)
+        return heap
+
     @staticmethod
     def heapSort(values: List[Tuple[object, object]]):
         heap = DSAHeap(len(values))
@@ -204,6 +219,18 @@ class UnitTestDSAHeap(unittest.TestCase):
             for x1, x2 in zip(sorted(student), DSAHeap.heapSort(student)):
                 self.assertEqual(x1[0], x2[0])
 
+    def testFromEntries(self):
+        heap = DSAHeap(2)
+        for x in [3, 9, 1, 7, 5]:
+            heap.add(x, str(x))
+        heap.remove()
+        copy = DSAHeap.fromEntries([(x.priority, x.value) for x in heap])
+        self.assertEqual([(x.priority, x.value) for x in copy],
+                         [(x.priority, x.value) for x in heap])
+        copy.add(4, "4")
+        self.assertEqual(list(copy.sort()),
+                         [(7, "7"), (5, "5"), (4, "4"), (3, "3"), (1, "1")])
+
     def testHeapify(self):
         from functools import total_ordering
         @total_ordering
@@ -122,6 +122,8 @@ class DSALinkedList:
     def concat(self, l: 'DSALinkedList'):
         if self._tail is not None:
             self._tail._next = l._head
+        else:
+            self._head = l._head
         if l._head is not None:
             l._head._prev = self._tail
         if l._tail is not None:
@@ -209,6 +211,11 @@ class UnitTestDSALinkedList(unittest.TestCase):
         l1.insertLast(0)
         for x1, x2 in zip(l1.concat(l2), range(-1, 5)):
             self.assertEqual(x1, x2)
+        l3 = DSALinkedList()
+        l4 = DSALinkedList()
+        l4.insertLast(1)
+        self.assertEqual(list(l3.concat(l4)), [1])
+        self.assertEqual(len(l3), 1)
 
 
 if __name__ == "__main__":
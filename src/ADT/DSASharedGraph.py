@@ -0,0 +1,373 @@
+"""
+Referencing: This file is original work, and builds on the
+DSADirectedGraph class submitted in this assignment.
+"""
+
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ADT.DSADirectedGraph import DSADirectedGraph
+from ADT.DSAHashTable import DSAHashTable
+
+
+class DSASharedGraph:
+    """
+    This class is a frozen, array based representation of a
+    DSADirectedGraph that is stored in a single block of shared memory.
+
+    The graph is published once by the owning process, and can then be
+    attached to by name from any other process without copying or
+    unpickling. Verticies are stored in sorted label order, and edges are
+    stored in compressed sparse row (CSR) format in both the successor and
+    predecessor direction.
+
+    The frozen arrays are never written to. Edges that are added or removed
+    after publishing are stored in small hash tables local to each process,
+    so every process sees the shared graph plus its own changes.
+
+    The layout of the shared block is as follows (all int64 except labels):
+    header[4] = (version, vertex count, edge count, label bytes),
+    succPtr[n + 1], succIdx[m], predPtr[n + 1], predIdx[m],
+    labelPtr[n + 1], labels[label bytes] (uint8).
+    """
+
+    VERSION = 1
+    _HEADER = 4
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        header = np.ndarray(DSASharedGraph._HEADER, dtype=np.int64,
+                            buffer=shm.buf)
+        version, n, m, labelBytes = (int(x) for x in header)
+        if version != DSASharedGraph.VERSION:
+            raise ValueError("Unsupported shared graph version.")
+        self._n = n
+        self._m = m
+
+        offset = header.nbytes
+
+        def view(count, dtype):
+            nonlocal offset
+            arr = np.ndarray(count, dtype=dtype, buffer=shm.buf,
+                             offset=offset)
+            offset += arr.nbytes
+            return arr
+
+        self._succPtr = view(n + 1, np.int64)
+        self._succIdx = view(m, np.int64)
+        self._predPtr = view(n + 1, np.int64)
+        self._predIdx = view(m, np.int64)
+        self._labelPtr = view(n + 1, np.int64)
+        self._labels = view(labelBytes, np.uint8)
+
+        # Local copy on write deltas, label -> DSAHashTable of labels
+        self._addedSucc = DSAHashTable()
+        self._addedPred = DSAHashTable()
+        self._removedSucc = DSAHashTable()
+        self._removedPred = DSAHashTable()
+        self._addedCount = 0
+        self._removedCount = 0
+
+    @staticmethod
+    def publish(graph: 'DSADirectedGraph') -> 'DSASharedGraph':
+        """
+        Copies the structure of a graph into a new shared memory block.
+        The returned object owns the block, and unlinks it when closed.
+        Vertex values are not shared.
+        """
+        labels = sorted((str(k) for k, _ in graph),
+                        key=lambda x: x.encode())
+        n = len(labels)
+        index = DSAHashTable(n)
+        for i, label in enumerate(labels):
+            index.put(label, i)
+
+        succ = [sorted(index.get(k) for k, _ in graph.getSuccessor(label))
+                for label in labels]
+        pred = [sorted(index.get(k) for k, _ in graph.getPredecessor(label))
+                for label in labels]
+        m = sum(len(x) for x in succ)
+        encoded = [label.encode() for label in labels]
+
+        def csr(rows):
+            ptr = np.zeros(n + 1, dtype=np.int64)
+            ptr[1:] = np.cumsum([len(x) for x in rows])
+            idx = np.fromiter((j for row in rows for j in row),
+                              dtype=np.int64, count=int(ptr[-1]))
+            return ptr, idx
+
+        succPtr, succIdx = csr(succ)
+        predPtr, predIdx = csr(pred)
+        labelPtr = np.zeros(n + 1, dtype=np.int64)
+        labelPtr[1:] = np.cumsum([len(x) for x in encoded])
+        labelBytes = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        header = np.array([DSASharedGraph.VERSION, n, m, len(labelBytes)],
+                          dtype=np.int64)
+
+        parts = [header, succPtr, succIdx, predPtr, predIdx,
+                 labelPtr, labelBytes]
+        # Shared memory blocks cannot be empty
+        size = max(1, sum(x.nbytes for x in parts))
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        offset = 0
+        for x in parts:
+            shm.buf[offset:offset + x.nbytes] = x.tobytes()
+            offset += x.nbytes
+        return DSASharedGraph(shm, True)
+
+    @staticmethod
+    def attach(name: str) -> 'DSASharedGraph':
+        """
+        Attaches to a graph published by another process.
+        No data is copied.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 always registers the block with the resource
+            # tracker, which would unlink it when this process exits.
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return DSASharedGraph(shm, False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self) -> None:
+        """
+        Releases this process' view of the graph. The owner also
+        destroys the shared block.
+        """
+        # Views must be released before the buffer can be closed
+        self._succPtr = self._succIdx = None
+        self._predPtr = self._predIdx = None
+        self._labelPtr = self._labels = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Index <-> label translation
+
+    def label(self, i: int) -> str:
+        return (self._labels[self._labelPtr[i]:self._labelPtr[i + 1]]
+                .tobytes().decode())
+
+    def index(self, label: str) -> int:
+        """
+        Binary search over the sorted labels, O(log(n)).
+        """
+        key = label.encode()
+        lo = 0
+        hi = self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (self._labels[self._labelPtr[mid]:self._labelPtr[mid + 1]]
+               .tobytes() < key):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._n or self.label(lo) != label:
+            raise ValueError("Vertex not found.")
+        return lo
+
+    def hasVertex(self, label: str) -> bool:
+        try:
+            self.index(label)
+            found = True
+        except ValueError:
+            found = False
+        return found
+
+    def getVertexCount(self) -> int:
+        return self._n
+
+    def getEdgeCount(self) -> int:
+        return self._m + self._addedCount - self._removedCount
+
+    def successorCSR(self):
+        """
+        Returns the frozen (ptr, idx) successor arrays. Local changes are
+        not included.
+        """
+        return self._succPtr, self._succIdx
+
+    def predecessorCSR(self):
+        """
+        Returns the frozen (ptr, idx) predecessor arrays. Local changes are
+        not included.
+        """
+        return self._predPtr, self._predIdx
+
+    # Edges
+
+    def _frozenEdge(self, i: int, j: int) -> bool:
+        row = self._succIdx[self._succPtr[i]:self._succPtr[i + 1]]
+        k = np.searchsorted(row, j)
+        return k < len(row) and row[k] == j
+
+    @staticmethod
+    def _deltaHas(delta: 'DSAHashTable', label1: str, label2: str) -> bool:
+        return delta.hasKey(label1) and delta.get(label1).hasKey(label2)
+
+    @staticmethod
+    def _deltaPut(delta: 'DSAHashTable', label1: str, label2: str) -> None:
+        if not delta.hasKey(label1):
+            delta.put(label1, DSAHashTable(4))
+        delta.get(label1).put(label2, None)
+
+    @staticmethod
+    def _deltaRemove(delta: 'DSAHashTable', label1: str,
+                     label2: str) -> None:
+        delta.get(label1).remove(label2)
+
+    def hasEdge(self, label1: str, label2: str) -> bool:
+        if DSASharedGraph._deltaHas(self._addedSucc, label1, label2):
+            ret = True
+        elif DSASharedGraph._deltaHas(self._removedSucc, label1, label2):
+            ret = False
+        else:
+            ret = self._frozenEdge(self.index(label1), self.index(label2))
+        return ret
+
+    def isSuccessor(self, label1: str, label2: str) -> bool:
+        return self.hasEdge(label1, label2)
+
+    def addEdge(self, label1: str, label2: str) -> None:
+        if self.hasEdge(label1, label2):
+            raise ValueError("Edge already exists.")
+        if DSASharedGraph._deltaHas(self._removedSucc, label1, label2):
+            DSASharedGraph._deltaRemove(self._removedSucc, label1, label2)
+            DSASharedGraph._deltaRemove(self._removedPred, label2, label1)
+            self._removedCount -= 1
+        else:
+            DSASharedGraph._deltaPut(self._addedSucc, label1, label2)
+            DSASharedGraph._deltaPut(self._addedPred, label2, label1)
+            self._addedCount += 1
+
+    def removeEdge(self, label1: str, label2: str) -> None:
+        if not self.hasEdge(label1, label2):
+            raise ValueError("Edge does not exist.")
+        if DSASharedGraph._deltaHas(self._addedSucc, label1, label2):
+            DSASharedGraph._deltaRemove(self._addedSucc, label1, label2)
+            DSASharedGraph._deltaRemove(self._addedPred, label2, label1)
+            self._addedCount -= 1
+        else:
+            DSASharedGraph._deltaPut(self._removedSucc, label1, label2)
+            DSASharedGraph._deltaPut(self._removedPred, label2, label1)
+            self._removedCount += 1
+
+    def _neighbours(self, label, ptr, idx, added, removed):
+        i = self.index(label)
+        removedRow = removed.get(label) if removed.hasKey(label) else None
+        for j in idx[ptr[i]:ptr[i + 1]]:
+            other = self.label(j)
+            if removedRow is None or not removedRow.hasKey(other):
+                yield other
+        if added.hasKey(label):
+            for other, _ in added.get(label):
+                yield other
+
+    def successors(self, label: str):
+        """
+        Generates the labels of all successors of a vertex.
+        """
+        return self._neighbours(label, self._succPtr, self._succIdx,
+                                self._addedSucc, self._removedSucc)
+
+    def predecessors(self, label: str):
+        """
+        Generates the labels of all predecessors of a vertex.
+        """
+        return self._neighbours(label, self._predPtr, self._predIdx,
+                                self._addedPred, self._removedPred)
+
+    def __iter__(self):
+        return (self.label(i) for i in range(self._n))
+
+
+def _childHasEdge(name, label1, label2, queue):
+    # Runs in a separate process
+    graph = DSASharedGraph.attach(name)
+    graph.addEdge(label1, label2)
+    queue.put((graph.hasEdge(label1, label2),
+               graph.hasEdge(label2, label1),
+               sorted(graph.successors(label1))))
+    graph.close()
+
+
+class UnitTestDSASharedGraph(unittest.TestCase):
+    """
+    This class contains unittests for the DSASharedGraph class.
+    """
+
+    def makeGraph(self):
+        graph = DSADirectedGraph()
+        for x in ["b", "a", "c", "d"]:
+            graph.addVertex(x, None)
+        graph.addEdge("a", "b")
+        graph.addEdge("a", "c")
+        graph.addEdge("c", "a")
+        graph.addEdge("d", "a")
+        return graph
+
+    def testPublish(self):
+        with DSASharedGraph.publish(self.makeGraph()) as shared:
+            self.assertEqual(shared.getVertexCount(), 4)
+            self.assertEqual(shared.getEdgeCount(), 4)
+            self.assertEqual(list(shared), ["a", "b", "c", "d"])
+            self.assertTrue(shared.hasVertex("d"))
+            self.assertFalse(shared.hasVertex("e"))
+            self.assertTrue(shared.hasEdge("a", "b"))
+            self.assertFalse(shared.hasEdge("b", "a"))
+            self.assertEqual(sorted(shared.predecessors("a")), ["c", "d"])
+            self.assertEqual(sorted(shared.successors("a")), ["b", "c"])
+
+    def testDeltas(self):
+        with DSASharedGraph.publish(self.makeGraph()) as shared:
+            shared.addEdge("b", "a")
+            shared.removeEdge("a", "c")
+            self.assertRaises(ValueError, shared.removeEdge, "a", "c")
+            self.assertRaises(ValueError, shared.addEdge, "b", "a")
+            self.assertTrue(shared.hasEdge("b", "a"))
+            self.assertFalse(shared.hasEdge("a", "c"))
+            self.assertEqual(shared.getEdgeCount(), 4)
+            self.assertEqual(sorted(shared.predecessors("a")),
+                             ["b", "c", "d"])
+            self.assertEqual(list(shared.successors("a")), ["b"])
+            shared.addEdge("a", "c")
+            shared.removeEdge("b", "a")
+            self.assertEqual(shared.getEdgeCount(), 4)
+            self.assertEqual(sorted(shared.successors("a")), ["b", "c"])
+
+    def testAttach(self):
+        import multiprocessing
+        with DSASharedGraph.publish(self.makeGraph()) as shared:
+            queue = multiprocessing.Queue()
+            child = multiprocessing.Process(target=_childHasEdge,
+                                            args=(shared.name, "a", "d",
+                                                  queue))
+            child.start()
+            result = queue.get(timeout=30)
+            child.join()
+            self.assertEqual(result, (True, True, ["b", "c", "d"]))
+            # Changes made by the child are local to the child
+            self.assertFalse(shared.hasEdge("a", "d"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,254 @@
+"""
+Referencing: The slot of each key is found with the probing used by
+DSAHashTable.py, submitted by Jakob Wyatt in prac 6.
+"""
+
+import unittest
+
+from ADT.DSAHashTable import DSAHashTable
+
+
+class DSASmallTable:
+    """
+    This class is a table of a few keys, stored inline as short lists that
+    are searched linearly, instead of as a full array of hash entries.
+    It is used for the edges of verticies, as most verticies only have a
+    handful of edges.
+
+    Keys are kept in insertion order, so the table iterates in the same
+    order as a DSAHashTable, and each key is given the slot that a
+    DSAHashTable of the same capacity would have placed it in, so that
+    :func:`promote` turns it into one with an identical layout. Once
+    MAX_SIZE slots are used, :func:`grown` reclaims the slots of removed
+    keys before the next insert, and only promotes the table if MAX_SIZE
+    keys are left.
+    """
+
+    # Number of full or removed slots before a table is compacted, or
+    # promoted if every slot is full
+    MAX_SIZE = 8
+
+    def __init__(self, size=100):
+        self._capacity = DSAHashTable._nextPrime(size)
+        # Keys in insertion order, along with their slots and values
+        self._slots = []
+        self._keys = []
+        self._values = []
+        # Slots of removed keys
+        self._removed = []
+        # Number of keys ever removed, checked by iterators
+        self._removals = 0
+
+    def put(self, key, value: object) -> None:
+        if key in self._keys:
+            self._values[self._keys.index(key)] = value
+        else:
+            if len(self._slots) + len(self._removed) >= self.MAX_SIZE:
+                raise ValueError("Table is full.")
+            capacity = self._capacity
+            slot = DSAHashTable._hash(key, capacity)
+            step = DSAHashTable._stepHash(key, capacity)
+            while slot in self._slots or slot in self._removed:
+                slot = (slot + step) % capacity
+            self._slots.append(slot)
+            self._keys.append(key)
+            self._values.append(value)
+
+    def get(self, key) -> object:
+        if key not in self._keys:
+            raise ValueError("Key not found.")
+        return self._values[self._keys.index(key)]
+
+    def hasKey(self, key) -> bool:
+        return key in self._keys
+
+    def itemAt(self, index: int) -> tuple:
+        return (self._keys[index], self._values[index])
+
+    def remove(self, key) -> object:
+        if key not in self._keys:
+            raise ValueError("Key not found.")
+        i = self._keys.index(key)
+        self._removed.append(self._slots.pop(i))
+        self._removals += 1
+        del self._keys[i]
+        return self._values.pop(i)
+
+    def grown(self):
+        """
+        Returns this table if another key can be inserted into it, after
+        reclaiming the slots of removed keys if needed, and otherwise a
+        DSAHashTable with the same layout.
+        """
+        if len(self._slots) + len(self._removed) < self.MAX_SIZE:
+            return self
+        if len(self._slots) < self.MAX_SIZE:
+            self._compact()
+            return self
+        return self.promote()
+
+    def promote(self) -> 'DSAHashTable':
+        return DSAHashTable.fromLayout(*self.layout())
+
+    def layout(self):
+        """
+        Returns the same layout as a DSAHashTable holding the same keys.
+        """
+        return (self._capacity,
+                list(zip(self._slots, self._keys, self._values)),
+                sorted(self._removed))
+
+    @staticmethod
+    def fromLayout(capacity: int, entries, removed):
+        """
+        Creates a DSASmallTable from the result of :func:`layout`, or a
+        DSAHashTable if the layout has too many keys, or if the capacity
+        is so small that a DSAHashTable would be resized or rehashed before
+        MAX_SIZE slots are used. If the keys fit but the removed slots do
+        not, the keys are given new slots, keeping their order.
+        """
+        if (len(entries) > DSASmallTable.MAX_SIZE
+           or capacity * 0.25 < DSASmallTable.MAX_SIZE):
+            return DSAHashTable.fromLayout(capacity, entries, removed)
+        table = DSASmallTable(capacity)
+        if table._capacity != capacity:
+            raise ValueError("Capacity must be prime.")
+        for slot, key, value in entries:
+            table._slots.append(slot)
+            table._keys.append(key)
+            table._values.append(value)
+        table._removed = list(removed)
+        if len(entries) + len(removed) > DSASmallTable.MAX_SIZE:
+            table._compact()
+        return table
+
+    def loadFactor(self) -> float:
+        return len(self._slots) / self._capacity
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        # Keys removed while iterating are skipped, as in DSAHashTable
+        def smallIter(keys, values):
+            removals = self._removals
+            for k, v in zip(keys, values):
+                if removals == self._removals or k in self._keys:
+                    yield (k, v)
+        return smallIter(tuple(self._keys), tuple(self._values))
+
+    # Private methods
+
+    def _compact(self):
+        """
+        Gives every key the slot it would have if the removed keys had never
+        been inserted, freeing the slots of the removed keys.
+        """
+        keys, values = self._keys, self._values
+        self._slots, self._keys, self._values = [], [], []
+        self._removed = []
+        for k, v in zip(keys, values):
+            self.put(k, v)
+
+
+class UnitTestDSASmallTable(unittest.TestCase):
+    """
+    This class contains unittests for the DSASmallTable class.
+    """
+
+    def testMatchesHashTable(self):
+        small = DSASmallTable()
+        table = DSAHashTable()
+        for x in ["a", "b", "c", "d", "e", 5, 6]:
+            small.put(x, str(x))
+            table.put(x, str(x))
+        for x in ["b", 5]:
+            self.assertEqual(small.remove(x), table.remove(x))
+        small.put("a", "z")
+        table.put("a", "z")
+        self.assertEqual(list(small), list(table))
+        self.assertEqual(small.layout(), table.layout())
+        self.assertEqual(len(small), 5)
+        self.assertEqual(small.itemAt(1), table.itemAt(1))
+        self.assertEqual(small.get("a"), "z")
+        self.assertTrue(small.hasKey("c"))
+        self.assertFalse(small.hasKey("b"))
+        self.assertRaises(ValueError, small.get, "b")
+        self.assertRaises(ValueError, small.remove, "b")
+        self.assertEqual(small.loadFactor(), table.loadFactor())
+
+    def testPromote(self):
+        small = DSASmallTable()
+        for x in range(DSASmallTable.MAX_SIZE):
+            self.assertIs(small.grown(), small)
+            small.put(x, x)
+        small.remove(3)
+        self.assertRaises(ValueError, small.put, 9, 9)
+        # The removed slot is reclaimed rather than promoting the table
+        self.assertIs(small.grown(), small)
+        small.put(9, 9)
+        table = small.grown()
+        self.assertIsInstance(table, DSAHashTable)
+        self.assertEqual(table.layout(), small.layout())
+        self.assertEqual(list(table), list(small))
+        table.put(10, 10)
+        self.assertEqual(table.get(10), 10)
+
+    def testReclaim(self):
+        small = DSASmallTable()
+        table = DSAHashTable()
+        for x in "ab":
+            small.put(x, x)
+            table.put(x, x)
+        for x in range(3 * DSASmallTable.MAX_SIZE):
+            self.assertIs(small.grown(), small)
+            small.put(x, x)
+            small.remove(x)
+        self.assertEqual(len(small), 2)
+        self.assertEqual(list(small), list(table))
+        # Reclaimed slots are the slots of a table that never held the
+        # removed keys
+        small._compact()
+        self.assertEqual(small.layout(), table.layout())
+        # Hash tables with many removed keys can be made small again
+        large = DSAHashTable()
+        for x in ["a", "b"] + list(range(2 * DSASmallTable.MAX_SIZE)):
+            large.put(x, x)
+        for x in range(2 * DSASmallTable.MAX_SIZE):
+            large.remove(x)
+        copy = DSASmallTable.fromLayout(*large.layout())
+        self.assertIsInstance(copy, DSASmallTable)
+        self.assertEqual(copy.layout(), table.layout())
+
+    def testFromLayout(self):
+        small = DSASmallTable()
+        for x in "abc":
+            small.put(x, x)
+        small.remove("b")
+        copy = DSASmallTable.fromLayout(*small.layout())
+        self.assertIsInstance(copy, DSASmallTable)
+        self.assertEqual(list(copy), list(small))
+        copy.put("d", "d")
+        small.put("d", "d")
+        self.assertEqual(copy.layout(), small.layout())
+        table = DSAHashTable()
+        for x in range(20):
+            table.put(x, x)
+        self.assertIsInstance(DSASmallTable.fromLayout(*table.layout()),
+                              DSAHashTable)
+        self.assertIsInstance(DSASmallTable.fromLayout(5, [], []),
+                              DSAHashTable)
+        self.assertRaises(ValueError, DSASmallTable.fromLayout, 100, [], [])
+
+    def testRemoveWhileIterating(self):
+        small = DSASmallTable()
+        for x in "abcd":
+            small.put(x, x)
+        for k, _ in small:
+            small.remove(k)
+        self.assertEqual(len(small), 0)
+        self.assertEqual(list(small), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,337 @@
+import os
+from collections import namedtuple
+
+import numpy as np
+import numpy.random
+
+from ADT.DSABucketQueue import DSABucketQueue
+from ADT.DSADeque import DSADeque
+from ADT.DSADirectedGraph import DSADirectedGraph, DSADirectedGraphVertex
+from ADT.DSAHashTable import DSAHashTable
+from ADT.DSAHeap import DSAHeap
+from ADT.DSASmallTable import DSASmallTable
+from SocialNetworkCore import SocialNetwork
+from SocialNetworkPost import SocialNetworkPost
+from SocialNetworkTimeline import SocialNetworkTimeline
+from SocialNetworkUser import SocialNetworkUser
+
+# How far a simulation has run through its events. digest identifies the
+# events, event is the index of the next event to execute, and running is
+# whether post is still propagating.
+SimProgress = namedtuple('SimProgress', ('mode stats interval digest event '
+                                         'post timestep running'))
+
+
+class SocialNetworkCheckpoint:
+    """
+    This class is a snapshot of a simulation in progress: the network,
+    every post and its likes, the progress of the simulation through its
+    events, and the state of the random number generator. A checkpoint can
+    be written to a compact binary file, and restored later to continue the
+    simulation exactly where it stopped.
+
+    The layout of every hash table and heap is saved along with its
+    contents, as the order in which users are visited during propagation
+    (and so the outcome of every random sample) depends on it. The like
+    index of every timeline is saved in order too, so that posts with the
+    same number of likes are restored in the order they reached it.
+    Users that have been removed, but are still referenced by a post, are
+    saved as well. As this needs the private state of the network and its
+    posts, this class must be updated whenever that state changes.
+
+    The file format is the magic number and an int64 version, followed by a
+    fixed sequence of arrays, each stored as an int64 element count
+    followed by its data. A string table is stored as int64 offsets and
+    uint8 utf-8 data. Users and posts are referred to by their index.
+    """
+
+    MAGIC = b"SNCP"
+    VERSION = 2
+    # Element type of each array, in the order they are stored
+    _ARRAYS = (
+        np.int64, np.uint8,     # User names
+        np.int64, np.uint8,     # Post content
+        np.int64, np.uint8,     # Mode, event digest and statistics
+        np.int64,               # Interval, event, post, timestep, running
+        np.int64,               # Hash tables (capacity, entries, removed)
+        np.int64,               # Hash table entries (slot, user)
+        np.int64,               # Hash table removed slots
+        np.int64, np.int64,     # Post count and posts of each user
+        np.int64,               # Posts of each user by likes
+        np.float64,             # Clickbait, like and follow probabilities
+        np.int64, np.int64,     # Recent and old like counts, and likers
+        np.int64, np.int64,     # Post heap and user ranking orders
+        np.int64, np.float64,   # Current post and epoch, probabilities
+        np.uint32, np.int64,    # Random state: key, position and has gauss
+        np.float64)             # Random state: cached gaussian
+
+    def __init__(self, network: 'SocialNetwork', progress: 'SimProgress',
+                 rng: tuple):
+        self.network = network
+        self.progress = progress
+        self.rng = rng
+
+    @staticmethod
+    def capture(network: 'SocialNetwork',
+                progress: 'SimProgress') -> 'SocialNetworkCheckpoint':
+        """
+        Creates a checkpoint of network with the current random state.
+        The network is not copied, so the checkpoint must be saved before
+        the network changes.
+        """
+        return SocialNetworkCheckpoint(network, progress,
+                                       numpy.random.get_state())
+
+    def restoreRandomState(self):
+        numpy.random.set_state(self.rng)
+
+    def tobytes(self) -> bytes:
+        network = self.network
+        vertices, posts = SocialNetworkCheckpoint._collect(network)
+        vertexIds = {id(v): i for i, v in enumerate(vertices)}
+        postIds = {id(x): i for i, x in enumerate(posts)}
+
+        tables = []
+        entries = []
+        removed = []
+        for table in SocialNetworkCheckpoint._tables(network._network,
+                                                     vertices):
+            capacity, full, empty = table.layout()
+            tables.extend([capacity, len(full), len(empty)])
+            for slot, _, vertex in full:
+                entries.extend([slot, vertexIds[id(vertex)]])
+            removed.extend(empty)
+
+        userPosts = [[postIds[id(x)] for x in v.value] for v in vertices]
+        byLikes = [postIds[id(x)] for v in vertices
+                   for x in v.value.mostLiked(len(v.value))]
+        likes = []
+        likers = []
+        for x in posts:
+            likes.extend([len(x._recentlyLiked), len(x._liked)])
+            likers.extend(vertexIds[id(user._vertex)] for user in x.liked())
+        current = (-1 if network._currentPost is None
+                   else postIds[id(network._currentPost)])
+
+        progress = self.progress
+        _, key, position, hasGauss, gauss = self.rng
+        arrays = [
+            *SocialNetworkCheckpoint._packStrings(v.label for v in vertices),
+            *SocialNetworkCheckpoint._packStrings(x.content for x in posts),
+            *SocialNetworkCheckpoint._packStrings([progress.mode,
+                                                   progress.digest,
+                                                   *progress.stats]),
+            [progress.interval, progress.event, progress.post,
+             progress.timestep, int(progress.running)],
+            tables, entries, removed,
+            [len(x) for x in userPosts], [i for x in userPosts for i in x],
+            byLikes,
+            [[x.clickbaitFactor, x._probLike, x._probFollow] for x in posts],
+            likes, likers,
+            [postIds[id(x.priority)] for x in network._posts],
+            [vertexIds[id(v)] for v in network._network.ranking()],
+            [current, network.epoch],
+            [network._probLike, network._probFollow],
+            key, [position, hasGauss], [gauss]]
+        data = [SocialNetworkCheckpoint.MAGIC,
+                np.array([SocialNetworkCheckpoint.VERSION],
+                         dtype=np.int64).tobytes()]
+        for dtype, x in zip(SocialNetworkCheckpoint._ARRAYS, arrays):
+            x = np.asarray(x, dtype=dtype)
+            data.append(np.array([x.size], dtype=np.int64).tobytes())
+            data.append(x.tobytes())
+        return b"".join(data)
+
+    @staticmethod
+    def frombytes(data: bytes) -> 'SocialNetworkCheckpoint':
+        magic = SocialNetworkCheckpoint.MAGIC
+        if data[:len(magic)] != magic:
+            raise ValueError("Not a checkpoint file.")
+        offset = len(magic)
+        version = int(np.frombuffer(data, dtype=np.int64, count=1,
+                                    offset=offset)[0])
+        if version != SocialNetworkCheckpoint.VERSION:
+            raise ValueError("Unsupported checkpoint file version.")
+        offset += 8
+        arrays = []
+        try:
+            for dtype in SocialNetworkCheckpoint._ARRAYS:
+                count = int(np.frombuffer(data, dtype=np.int64, count=1,
+                                          offset=offset)[0])
+                offset += 8
+                x = np.frombuffer(data, dtype=dtype, count=count,
+                                  offset=offset)
+                offset += x.nbytes
+                arrays.append(x)
+        except ValueError as e:
+            raise ValueError("Checkpoint file is truncated.") from e
+        (nameOffsets, nameData, contentOffsets, contentData, metaOffsets,
+         metaData, progress, tables, entries, removed, postCounts,
+         userPosts, byLikes, postData, likes, likers, postHeap, ranking, state,
+         probs, key, position, gauss) = arrays
+        names = SocialNetworkCheckpoint._unpackStrings(nameOffsets, nameData)
+        contents = SocialNetworkCheckpoint._unpackStrings(contentOffsets,
+                                                          contentData)
+        meta = SocialNetworkCheckpoint._unpackStrings(metaOffsets, metaData)
+        interval, event, post, timestep, running = progress.tolist()
+        progress = SimProgress(meta[0], tuple(meta[2:]), interval, meta[1],
+                               event, post, timestep, bool(running))
+
+        network = SocialNetwork()
+        graph = DSADirectedGraph()
+        # Entries refer to users that may not exist yet, so every table is
+        # created before the users are filled in.
+        layouts = []
+        entryIndex = 0
+        removedIndex = 0
+        for capacity, full, empty in tables.reshape(-1, 3).tolist():
+            slots = entries[2 * entryIndex:2 * (entryIndex + full)]
+            slots = slots.reshape(-1, 2).tolist()
+            # Edge tables are small unless they were saved with many slots
+            fromLayout = (DSASmallTable.fromLayout if layouts
+                          else DSAHashTable.fromLayout)
+            table = fromLayout(
+                capacity, [(slot, names[i], None) for slot, i in slots],
+                removed[removedIndex:removedIndex + empty].tolist())
+            layouts.append((table, slots))
+            entryIndex += full
+            removedIndex += empty
+        vertices = [DSADirectedGraphVertex(name, SocialNetworkTimeline(),
+                                           graph,
+                                           successor=layouts[2 * i + 1][0],
+                                           predecessor=layouts[2 * i + 2][0])
+                    for i, name in enumerate(names)]
+        for table, slots in layouts:
+            for _, i in slots:
+                table.put(names[i], vertices[i])
+        graph.restore(layouts[0][0], int(state[1]),
+                      [vertices[i] for i in ranking.tolist()])
+
+        users = [SocialNetworkUser(v) for v in vertices]
+        posts = []
+        likerIndex = 0
+        for content, (clickbait, probLike, probFollow), (recent, old) in zip(
+                contents, postData.reshape(-1, 3).tolist(),
+                likes.reshape(-1, 2).tolist()):
+            liked = [users[i] for i in
+                     likers[likerIndex:likerIndex + recent + old].tolist()]
+            likerIndex += recent + old
+            # The poster is the last liker, so both lists are replaced
+            x = SocialNetworkPost(None, content, clickbait, probLike,
+                                  probFollow)
+            x._recentlyLiked = DSADeque()
+            x._liked = DSADeque()
+            for user in liked[:recent]:
+                x._recentlyLiked.insertLast(user)
+            for user in liked[recent:]:
+                x._liked.insertLast(user)
+            # Removed users keep their likes, but not their index of likes
+            for user in reversed(liked):
+                if (graph.hasVertex(user.name())
+                        and graph.getVertex(user.name()) is user._vertex):
+                    user.addLike(x)
+            posts.append(x)
+        postIndex = 0
+        for vertex, count in zip(vertices, postCounts.tolist()):
+            # Posts are saved from newest to oldest
+            for i in reversed(userPosts[postIndex:postIndex + count].tolist()):
+                vertex.value.add(posts[i])
+            # Ties in the like index are in the order they were reached,
+            # which is rebuilt by adding from most to least liked
+            timeline = vertex.value
+            timeline._byLikes = DSABucketQueue()
+            for i in byLikes[postIndex:postIndex + count].tolist():
+                timeline._entries[id(posts[i])] = timeline._byLikes.add(
+                    posts[i], posts[i].likeCount())
+            postIndex += count
+
+        network._network = graph
+        network._posts = DSAHeap.fromEntries([(posts[i], None)
+                                              for i in postHeap.tolist()])
+        current = int(state[0])
+        network._currentPost = None if current == -1 else posts[current]
+        network._probLike, network._probFollow = probs.tolist()
+        rng = ("MT19937", key.copy(), int(position[0]), int(position[1]),
+               float(gauss[0]))
+        return SocialNetworkCheckpoint(network, progress, rng)
+
+    def save(self, filename: str):
+        """
+        Writes the checkpoint to filename. The file is replaced in a single
+        step, so an interrupted save leaves the previous checkpoint intact.
+        """
+        with open(filename + ".tmp", "wb") as f:
+            f.write(self.tobytes())
+        os.replace(filename + ".tmp", filename)
+
+    @staticmethod
+    def load(filename: str) -> 'SocialNetworkCheckpoint':
+        with open(filename, "rb") as f:
+            return SocialNetworkCheckpoint.frombytes(f.read())
+
+    # Private methods
+
+    @staticmethod
+    def _collect(network: 'SocialNetwork'):
+        """
+        Returns every vertex and post that can be reached from the network.
+        Users come first, in iteration order, followed by removed users.
+        """
+        vertices = []
+        posts = []
+        vertexIds = {}
+        postIds = {}
+
+        def addVertex(vertex):
+            if id(vertex) not in vertexIds:
+                vertexIds[id(vertex)] = len(vertices)
+                vertices.append(vertex)
+
+        def addPost(post):
+            if id(post) not in postIds:
+                postIds[id(post)] = len(posts)
+                posts.append(post)
+
+        for _, v in network._network:
+            addVertex(v)
+        for x in network._posts:
+            addPost(x.priority)
+        i = j = 0
+        while i < len(vertices) or j < len(posts):
+            if i < len(vertices):
+                for _, v in vertices[i].successor:
+                    addVertex(v)
+                for _, v in vertices[i].predecessor:
+                    addVertex(v)
+                for x in vertices[i].value:
+                    addPost(x)
+                i += 1
+            else:
+                for user in posts[j].liked():
+                    addVertex(user._vertex)
+                j += 1
+        return vertices, posts
+
+    @staticmethod
+    def _tables(graph: 'DSADirectedGraph', vertices):
+        """
+        Generates the vertex table of graph, then the successor and
+        predecessor tables of each vertex.
+        """
+        yield graph.verticies
+        for v in vertices:
+            yield v.successor
+            yield v.predecessor
+
+    @staticmethod
+    def _packStrings(strings):
+        encoded = [x.encode() for x in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(x) for x in encoded])
+        return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    @staticmethod
+    def _unpackStrings(offsets, data):
+        data = data.tobytes()
+        return [data[offsets[i]:offsets[i + 1]].decode()
+                for i in range(len(offsets) - 1)]
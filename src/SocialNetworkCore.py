@@ -1,12 +1,18 @@
+from contextlib import contextmanager
 from typing import List
 
+import numpy as np
+
 from ADT.DSADirectedGraph import *
 from ADT.DSAHeap import *
 from ADT.DSAHashTable import *
 from ADT.DSALinkedList import *
+from ADT.DSASharedGraph import DSASharedGraph
 
+from SocialNetworkInfluence import Influence, SocialNetworkInfluence
+from SocialNetworkTimeline import SocialNetworkTimeline
 from SocialNetworkUser import SocialNetworkUser
-from SocialNetworkPost import SocialNetworkPost
+from SocialNetworkPost import SocialNetworkPost, PostSummary
 
 
 class SocialNetwork:
@@ -16,6 +22,10 @@ class SocialNetwork:
     simulation mode. By doing this, the underlying data structures used to
     store the network an be changed without needing to also change the user
     interface code.
+
+    Statistics and other derived values are cached against the mutation
+    epoch of the network, which changes whenever a user, follow, post or
+    like changes. Repeated queries on an unchanged network are O(1).
     """
 
     # Error messages
@@ -29,10 +39,11 @@ class SocialNetwork:
             self.probLike = probLike
             self.probFollow = probFollow
         self._network = DSADirectedGraph()
-        self._mostFollowed = DSAHeap()
         self._currentPost = None
         # Post likes
         self._posts = DSAHeap()
+        # Derived values, name -> (epoch, value)
+        self._cache = DSAHashTable()
 
     @property
     def probLike(self) -> float:
@@ -59,6 +70,7 @@ class SocialNetwork:
         self._network = DSADirectedGraph()
         self._posts = DSAHeap()
         self._currentPost = None
+        self._cache = DSAHashTable()
         for x in file:
             formatted = x.rstrip('\n').split(':')
             if len(formatted) == 1:
@@ -98,7 +110,7 @@ class SocialNetwork:
         return ret
 
     def like(self, user: str):
-        if len(self._posts) != 0:
+        if self._currentPost is not None:
             try:
                 u = self.findUser(user)
                 self._currentPost.like(u)
@@ -108,7 +120,7 @@ class SocialNetwork:
             raise ValueError("There are no posts to like.")
 
     def unlike(self, user: str):
-        if len(self._posts) != 0:
+        if self._currentPost is not None:
             try:
                 u = self.findUser(user)
             except ValueError as e:
@@ -124,15 +136,100 @@ class SocialNetwork:
         if self._network.hasVertex(user):
             raise ValueError(f"{user} already exists.")
         # Value is cached posts
-        self._network.addVertex(user, DSALinkedList())
-        self._mostFollowed.add(self.findUser(user), None)
+        self._network.addVertex(user, SocialNetworkTimeline())
 
     def removeUser(self, user: str):
+        """
+        Removes a user and their follows. Their likes are kept by the posts
+        they liked, but are no longer indexed against the user.
+        """
         try:
-            self._mostFollowed.removeArbitrary(self.findUser(user))
+            removed = self.findUser(user)
             self._network.removeVertex(user)
         except ValueError as e:
             raise ValueError(SocialNetwork.USER_NOT_EXIST) from e
+        removed.clearLikes()
+
+    def addUsers(self, users) -> list:
+        """
+        Adds every user in users, resizing the network at most once.
+
+        Returns:
+            For each user, None if they were added, or the ValueError that
+            :func:`addUser` would have raised.
+        """
+        users = list(users)
+        errors = []
+        added = DSAHashTable()
+        for user in users:
+            error = None
+            if ":" in user:
+                error = ValueError("Invalid username.")
+            elif self._network.hasVertex(user) or added.hasKey(user):
+                error = ValueError(f"{user} already exists.")
+            else:
+                added.put(user, None)
+            errors.append(error)
+        labels = [user for user, error in zip(users, errors) if error is None]
+        self._network.addVertices((x, SocialNetworkTimeline())
+                                  for x in labels)
+        return errors
+
+    def removeUsers(self, users) -> list:
+        """
+        Removes every user in users, changing the epoch of the network once.
+
+        Returns:
+            For each user, None if they were removed, or the ValueError that
+            :func:`removeUser` would have raised.
+        """
+        users = list(users)
+        errors = []
+        removed = DSAHashTable()
+        for user in users:
+            error = None
+            if not self._network.hasVertex(user) or removed.hasKey(user):
+                error = ValueError(SocialNetwork.USER_NOT_EXIST)
+            else:
+                removed.put(user, None)
+                self.findUser(user).clearLikes()
+            errors.append(error)
+        self._network.removeVertices(
+            [user for user, error in zip(users, errors) if error is None])
+        return errors
+
+    def followAll(self, follows) -> List[bool]:
+        """
+        Applies :func:`follow` to every (follower, followed) pair in follows,
+        changing the epoch of the network once. If a pair is invalid, the
+        pairs before it are still followed before the ValueError is raised.
+
+        Returns:
+            For each pair, whether a new follow was made.
+        """
+        follows = list(follows)
+        valid, error = self._validFollows(follows)
+        added = self._network.addEdges(follows[:valid])
+        if error is not None:
+            raise error
+        return added
+
+    def unfollowAll(self, follows) -> List[bool]:
+        """
+        Applies :func:`unfollow` to every (follower, followed) pair in
+        follows, changing the epoch of the network once. If a pair is
+        invalid, the pairs before it are still unfollowed before the
+        ValueError is raised.
+
+        Returns:
+            For each pair, whether a follow was removed.
+        """
+        follows = list(follows)
+        valid, error = self._validFollows(follows, allowSelf=True)
+        removed = self._network.removeEdges(follows[:valid])
+        if error is not None:
+            raise error
+        return removed
 
     def findUser(self, userName: str) -> 'SocialNetworkUser':
         user = None
@@ -142,6 +239,12 @@ class SocialNetwork:
             raise ValueError(SocialNetwork.USER_NOT_EXIST) from e
         return user
 
+    def users(self):
+        """
+        Generates every user in the network, in no particular order.
+        """
+        return (SocialNetworkUser(v) for _, v in self._network)
+
     def display(self):
         self._network.render()
 
@@ -151,10 +254,27 @@ class SocialNetwork:
         else:
             raise ValueError("Network cannot be updated.")
 
+    def propagateToCompletion(self) -> 'PostSummary':
+        """
+        Runs the current post until it is done in a single call.
+        This is equivalent to calling :func:`update` until :func:`done`,
+        but no statistics are generated between timesteps.
+
+        Returns:
+            The final likers of the post, the users that followed the
+            original poster, and the number of timesteps.
+        """
+        if self._canUpdate():
+            summary = self._currentPost.propagate()
+        else:
+            raise ValueError("Network cannot be updated.")
+        return summary
+
     def save(self) -> str:
-        return self._network.displayExploded()
+        return self._cached("save", self._network.displayExploded)
 
-    def addPost(self, userName: str, content: str, clickbaitFactor: float = 1):
+    def addPost(self, userName: str, content: str,
+                clickbaitFactor: float = 1) -> 'SocialNetworkPost':
         try:
             user = self.findUser(userName)
             self._currentPost = SocialNetworkPost(user, content,
@@ -165,9 +285,61 @@ class SocialNetwork:
             user.addPost(self._currentPost)
         except ValueError as e:
             raise ValueError("Could not create post.") from e
+        return self._currentPost
+
+    def removePost(self, post: 'SocialNetworkPost'):
+        """
+        Removes a finished post from the network and from its poster, so
+        that it is no longer kept in memory or counted in statistics. If it
+        is the current post, there is no current post until the next one is
+        added.
+        """
+        if not post.done():
+            raise ValueError("Post has not finished propagating.")
+        try:
+            self._posts.removeArbitrary(post)
+        except ValueError as e:
+            raise ValueError("Post does not exist.") from e
+        post.user().posts.remove(post)
+        for x in post.liked():
+            x.removeLike(post)
+        if post is self._currentPost:
+            self._currentPost = None
+        self._network.touch()
+
+    def fork(self) -> 'SocialNetwork':
+        """
+        Creates a branch of the network with the same users, follows and
+        probabilities, but without any posts. The follows of each user are
+        shared with this network until either network changes them, so a
+        fork is created in O(V) time, and only stores the follows it
+        changes. Users are visited in the same order in both networks, so
+        a post propagates the same way in each for the same random state.
+        """
+        fork = SocialNetwork()
+        fork._probLike = self._probLike
+        fork._probFollow = self._probFollow
+        fork._network = self._network.fork(lambda _: SocialNetworkTimeline())
+        return fork
+
+    def publish(self) -> 'DSASharedGraph':
+        """
+        Publishes a frozen copy of the network structure in shared memory,
+        so that worker processes can attach to it by name instead of
+        receiving a pickled copy. Follows made by a worker are kept local
+        to that worker. The caller is responsible for closing the result.
+        """
+        return DSASharedGraph.publish(self._network)
 
     def done(self) -> bool:
-        return len(self._posts) == 0 or self._currentPost.done()
+        return self._currentPost is None or self._currentPost.done()
+
+    @property
+    def epoch(self) -> int:
+        """
+        Changes whenever the network, or any post on the network, changes.
+        """
+        return self._network.epoch
 
     # Statistics methods
 
@@ -183,30 +355,20 @@ class SocialNetwork:
     def optionalStats(self) -> str:
         """Outputs optional statistics about the network.
         """
-        followAv, followSd = self.followsAvSd()
-        return (f"Likes per person per post: {self.likesScaled()}\n"
-                f"Follower Average: {followAv}\nFollower s.d: {followSd}\n"
-                f"Clustering Coefficient: {self.clusteringCoefficient()}")
+        def optionalStats():
+            followAv, followSd = self.followsAvSd()
+            return (f"Likes per person per post: {self.likesScaled()}\n"
+                    f"Follower Average: {followAv}\n"
+                    f"Follower s.d: {followSd}\n"
+                    f"Clustering Coefficient: "
+                    f"{self.clusteringCoefficient()}")
+        return self._cached("optionalStats", optionalStats)
 
     def likesScaled(self) -> float:
-        # Likes per person per post
-        averageLikes = 0
-        if len(self._posts) * self._network.getVertexCount() != 0:
-            totalLikes = sum([sum(1 for _ in x.priority.liked())
-                             for x in self._posts])
-            averageLikes = totalLikes / (len(self._posts) *
-                                         self._network.getVertexCount())
-        return averageLikes
+        return self._cached("likesScaled", self._likesScaled)
 
     def followsAvSd(self) -> (float, float):
-        import statistics
-        followNums = [len(v.successor) for _, v in self._network]
-        avFoll = 0
-        sdFoll = 0
-        if len(followNums) != 0:
-            avFoll = sum(followNums) / len(followNums)
-            sdFoll = statistics.pstdev(followNums)
-        return avFoll, sdFoll
+        return self._cached("followsAvSd", self._followsAvSd)
 
     def clusteringCoefficient(self) -> float:
         """
@@ -235,6 +397,109 @@ class SocialNetwork:
         store edges and verticies. When a linked list is used instead, this
         execution time jumps to O(n^4).
         """
+        return self._cached("clusteringCoefficient",
+                            self._clusteringCoefficient)
+
+    def popularPosts(self) -> List['SocialNetworkPost']:
+        def popularPosts():
+            self._posts._heapify()
+            return [x[0] for x in self._posts.sort()]
+        return self._cached("popularPosts", popularPosts)
+
+    def popularUsers(self, k: int = None) -> List['SocialNetworkUser']:
+        """
+        Returns the k users with the most followers, or every user if k is
+        None. The ranking is kept up to date as users follow each other, so
+        this takes O(k) time.
+        """
+        def popularUsers():
+            return [SocialNetworkUser(v) for v in self._network.ranking()]
+        if k is not None:
+            return [SocialNetworkUser(v) for v in self._network.ranking(k)]
+        return self._cached("popularUsers", popularUsers)
+
+    def expectedLikes(self, clickbaitFactor: float = 1, *, samples=100,
+                      processes=None, seed=None) -> List['Influence']:
+        """
+        Estimates the expected number of likes of a post by each user,
+        including the like of the poster, by simulating samples posts from
+        every user on a pool of processes.
+
+        Returns:
+            The (user, reach) of every user, by decreasing reach.
+        """
+        with self._influence(clickbaitFactor, samples, processes,
+                             seed) as influence:
+            return [Influence(self.findUser(x.user), x.reach)
+                    for x in influence.expected()]
+
+    def influencers(self, k: int, clickbaitFactor: float = 1, *,
+                    samples=100, processes=None,
+                    seed=None) -> List['Influence']:
+        """
+        Greedily selects the k users whose posts together are expected to
+        receive the most likes.
+
+        Returns:
+            The (user, reach) of each user in the order chosen, where reach
+            is the number of likes the user adds to the users before them.
+        """
+        with self._influence(clickbaitFactor, samples, processes,
+                             seed) as influence:
+            return [Influence(self.findUser(x.user), x.reach)
+                    for x in influence.greedy(k)]
+
+    # Private methods
+    @contextmanager
+    def _influence(self, clickbaitFactor: float, samples: int,
+                   processes: int, seed: int):
+        if self._probLike == -1.0:
+            raise ValueError("probLike has not been set.")
+        if clickbaitFactor < 0:
+            raise ValueError("clickbaitFactor must be positive.")
+        if seed is None:
+            # Drawn from a separate generator, so that estimating influence
+            # does not change the random state of the simulation
+            seed = int(np.random.default_rng().integers(2 ** 31))
+        with self.publish() as shared, SocialNetworkInfluence(
+                shared, min(1, self._probLike * clickbaitFactor),
+                samples=samples, seed=seed,
+                processes=processes) as influence:
+            yield influence
+
+    def _cached(self, name: str, func):
+        """
+        Returns the result of func, which is only called if the network has
+        changed since the last call with the same name.
+        """
+        epoch = self._network.epoch
+        if self._cache.hasKey(name) and self._cache.get(name)[0] == epoch:
+            value = self._cache.get(name)[1]
+        else:
+            value = func()
+            self._cache.put(name, (epoch, value))
+        return value
+
+    def _likesScaled(self) -> float:
+        # Likes per person per post
+        averageLikes = 0
+        if len(self._posts) * self._network.getVertexCount() != 0:
+            totalLikes = sum([x.priority.likeCount() for x in self._posts])
+            averageLikes = totalLikes / (len(self._posts) *
+                                         self._network.getVertexCount())
+        return averageLikes
+
+    def _followsAvSd(self) -> (float, float):
+        import statistics
+        followNums = [v.outDegree for _, v in self._network]
+        avFoll = 0
+        sdFoll = 0
+        if len(followNums) != 0:
+            avFoll = sum(followNums) / len(followNums)
+            sdFoll = statistics.pstdev(followNums)
+        return avFoll, sdFoll
+
+    def _clusteringCoefficient(self) -> float:
         sumLocalClustering = 0
         for k, v in self._network:
             # Find clusting coefficient of node
@@ -263,15 +528,24 @@ class SocialNetwork:
                                                * self._network.getEdgeCount())
         return globalCoef
 
-    def popularPosts(self) -> List['SocialNetworkPost']:
-        self._posts._heapify()
-        return [x[0] for x in self._posts.sort()]
-
-    def popularUsers(self) -> List['SocialNetworkUser']:
-        self._mostFollowed._heapify()
-        return [x[0] for x in self._mostFollowed.sort()]
+    def _validFollows(self, follows, allowSelf=False):
+        """
+        Returns the number of leading valid (follower, followed) pairs,
+        and the ValueError caused by the first invalid pair (or None).
+        """
+        error = None
+        valid = 0
+        while error is None and valid < len(follows):
+            follower, followed = follows[valid]
+            if not (self._network.hasVertex(follower)
+                    and self._network.hasVertex(followed)):
+                error = ValueError(SocialNetwork.USER_NOT_EXIST)
+            elif follower == followed and not allowSelf:
+                error = ValueError("User cannot follow themselves.")
+            else:
+                valid += 1
+        return valid, error
 
-    # Private methods
     def _canUpdate(self) -> bool:
         return (self._probFollow != -1.0
                 and self._probLike != -1.0
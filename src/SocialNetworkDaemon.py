@@ -0,0 +1,277 @@
+import sys
+import asyncio
+
+from ADT.DSAHashTable import DSAHashTable
+from ADT.DSALinkedList import DSALinkedList
+from SocialNetworkCore import SocialNetwork
+from SocialNetworkEvents import SocialNetworkEvents, SocialNetworkEventExecutor
+
+
+class SocialNetworkDaemon:
+    """
+    This class is a long running service that keeps social networks in
+    memory, so that the cost of loading a network is only paid once.
+    Clients connect over a local TCP or Unix socket.
+
+    Every request is a single line of the form <network>:<command>, and
+    every response is a single line starting with OK or ERROR. Responses
+    are sent in the same order as the requests of a connection, and a
+    client may send many requests before reading any responses.
+    Commands are:
+        LOAD:<netfile>:<prob_like>:<prob_foll>  load a network file
+        NEW:<prob_like>:<prob_foll>             create an empty network
+        A/R/F/U/P lines, as in an event file
+        STATS                                   optional statistics
+        USERS                                   users by follower count
+        CLOSE                                   forget the network
+
+    Requests to a network are queued while it is busy, and every request
+    that is queued when it becomes free is run as a single batch in a
+    worker thread. Within a batch, each request is run in order, and each
+    post propagates to completion before the next request runs, so the
+    batch has the same effect as running its requests one at a time.
+    Adjacent identical queries are only calculated once, as nothing can
+    change between them. Only one batch of a network runs at a time.
+    A network is only created once it has been loaded successfully.
+    """
+
+    # Maximum number of requests of a connection awaiting a response
+    MAX_PENDING = 1000
+
+    def __init__(self):
+        self._networks = DSAHashTable()
+        self._server = None
+        self._clients = DSAHashTable()
+        self._connections = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, *,
+                    path: str = None):
+        """
+        Starts listening on a TCP port of host, or on the Unix socket at
+        path if it is given. Port 0 picks a free port.
+        """
+        if path is None:
+            self._server = await asyncio.start_server(self._serve, host,
+                                                      port)
+        else:
+            self._server = await asyncio.start_unix_server(self._serve, path)
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()
+
+    async def serve(self):
+        """
+        Serves clients until cancelled.
+        """
+        await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stops listening, and disconnects all clients.
+        """
+        self._server.close()
+        for _, client in list(self._clients):
+            client.cancel()
+        while len(self._clients) != 0:
+            await asyncio.sleep(0)
+        await self._server.wait_closed()
+
+    async def request(self, line: str) -> str:
+        """
+        Runs a single request, and returns its response.
+        """
+        name, _, command = line.partition(':')
+        tokens = command.split(':')
+        response = None
+        if tokens[0] in ("LOAD", "NEW"):
+            if self._networks.hasKey(name):
+                response = f"ERROR {name} already exists."
+            else:
+                response = await self._create(name, tokens)
+        elif tokens[0] == "CLOSE" and len(tokens) == 1:
+            if self._networks.hasKey(name):
+                self._networks.remove(name)
+                response = "OK"
+        if response is None and not self._networks.hasKey(name):
+            response = "ERROR Network does not exist."
+        if response is None:
+            resident = self._networks.get(name)
+            future = asyncio.get_running_loop().create_future()
+            resident.pending.insertLast((command, future))
+            if not resident.busy:
+                resident.busy = True
+                asyncio.ensure_future(self._drain(resident))
+            response = await future
+        return response
+
+    # Private methods
+
+    async def _serve(self, reader, writer):
+        responses = asyncio.Queue(SocialNetworkDaemon.MAX_PENDING)
+
+        async def respond():
+            future = await responses.get()
+            while future is not None:
+                writer.write((await future + "\n").encode())
+                await writer.drain()
+                future = await responses.get()
+
+        responder = asyncio.ensure_future(respond())
+        client = self._connections
+        self._connections += 1
+        self._clients.put(client, asyncio.current_task())
+        try:
+            line = await reader.readline()
+            while line and not responder.done():
+                request = line.decode().rstrip("\r\n")
+                await responses.put(asyncio.ensure_future(
+                    self.request(request)))
+                line = await reader.readline()
+            if not responder.done():
+                await responses.put(None)
+            await responder
+        except (ConnectionError, asyncio.CancelledError):
+            # The client disconnected, or the daemon is closing
+            pass
+        finally:
+            self._clients.remove(client)
+            responder.cancel()
+            writer.close()
+
+    async def _create(self, name: str, tokens: list) -> str:
+        # The network is busy until it is loaded, so that requests to it
+        # wait for the load, and a second load of the name is refused
+        resident = _Resident()
+        resident.busy = True
+        self._networks.put(name, resident)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, SocialNetworkDaemon._load, resident.network, tokens)
+            response = "OK"
+        except Exception as ex:
+            response = f"ERROR {ex}"
+        if response == "OK":
+            asyncio.ensure_future(self._drain(resident))
+        else:
+            if (self._networks.hasKey(name)
+                    and self._networks.get(name) is resident):
+                self._networks.remove(name)
+            for _, future in resident.pending:
+                if not future.done():
+                    future.set_result("ERROR Network does not exist.")
+            resident.pending = DSALinkedList()
+        return response
+
+    async def _drain(self, resident: '_Resident'):
+        loop = asyncio.get_running_loop()
+        while not resident.pending.isEmpty():
+            batch = list(resident.pending)
+            resident.pending = DSALinkedList()
+            try:
+                responses = await loop.run_in_executor(
+                    None, SocialNetworkDaemon._run, resident.network,
+                    [command for command, _ in batch])
+            except Exception as ex:
+                responses = [f"ERROR {ex}"] * len(batch)
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+        resident.busy = False
+
+    @staticmethod
+    def _run(network: 'SocialNetwork', commands: list) -> list:
+        """
+        Runs a batch of commands on a network in order, and returns the
+        response to each command. A command that fails does not stop the
+        rest of the batch.
+        """
+        responses = ["OK"] * len(commands)
+        events = SocialNetworkEvents()
+
+        def report(event, message):
+            responses[event[1] - 1] = f"ERROR {message}"
+        executor = SocialNetworkEventExecutor(network, events, report)
+        for i, command in enumerate(commands):
+            try:
+                if command in ("STATS", "USERS"):
+                    if i > 0 and commands[i - 1] == command:
+                        responses[i] = responses[i - 1]
+                    else:
+                        responses[i] = SocialNetworkDaemon._query(network,
+                                                                  command)
+                else:
+                    event = events.append(command, i + 1)
+                    if event[0] != SocialNetworkEvents.POST:
+                        executor.apply(event)
+                    elif executor.createPost(event) is not None:
+                        result = network.propagateToCompletion()
+                        responses[i] = (f"OK likes:{len(result.likers)} "
+                                        f"follows:{len(result.follows)} "
+                                        f"timesteps:{result.timesteps}")
+            except ValueError as ex:
+                # Remove the line number added by the event compiler
+                prefix = f"Line {i + 1}: "
+                message = str(ex)
+                if message.startswith(prefix):
+                    message = message[len(prefix):]
+                responses[i] = f"ERROR {message}"
+            except Exception as ex:
+                responses[i] = f"ERROR {ex}"
+        return responses
+
+    @staticmethod
+    def _load(network: 'SocialNetwork', tokens: list):
+        if tokens[0] == "LOAD" and len(tokens) == 4:
+            probLike, probFollow = float(tokens[2]), float(tokens[3])
+            try:
+                with open(tokens[1], 'r') as f:
+                    network.loadNetwork(f)
+            except OSError as e:
+                raise ValueError(f"Could not read {tokens[1]}.") from e
+        elif tokens[0] == "NEW" and len(tokens) == 3:
+            probLike, probFollow = float(tokens[1]), float(tokens[2])
+        else:
+            raise ValueError("Invalid command.")
+        network.probLike = probLike
+        network.probFollow = probFollow
+
+    @staticmethod
+    def _query(network: 'SocialNetwork', query: str) -> str:
+        if query == "STATS":
+            followAv, followSd = network.followsAvSd()
+            response = (f"OK likes:{network.likesScaled()} "
+                        f"favg:{followAv} fsd:{followSd} "
+                        f"clustering:{network.clusteringCoefficient()}")
+        else:
+            response = "OK " + ",".join(x.name()
+                                        for x in network.popularUsers())
+        return response
+
+
+class _Resident:
+    """
+    A network kept in memory by the daemon, and its queued requests.
+    """
+
+    def __init__(self):
+        self.network = SocialNetwork()
+        self.pending = DSALinkedList()
+        self.busy = False
+
+
+if __name__ == "__main__":
+    # Usage: SocialNetworkDaemon.py [port | unix socket path]
+    async def main():
+        daemon = SocialNetworkDaemon()
+        if len(sys.argv) > 1 and not sys.argv[1].isdigit():
+            await daemon.start(path=sys.argv[1])
+        else:
+            await daemon.start(port=int(sys.argv[1])
+                               if len(sys.argv) > 1 else 0)
+        print(f"Listening on {daemon.address}")
+        await daemon.serve()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("")
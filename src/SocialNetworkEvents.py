@@ -0,0 +1,394 @@
+import numpy as np
+
+from ADT.DSAHashTable import DSAHashTable
+
+
+class SocialNetworkEvents:
+    """
+    This class is a compiled event file. Each line of the event file is
+    validated and parsed once, into a compact array of fixed size records
+    that contain an op code, the line number, integer ids for the usernames
+    involved and the clickbait factor. Usernames and post content are
+    stored once each in a symbol table. The compiled events can be written
+    to and read from a binary file, so that an event file that is run many
+    times only needs to be parsed once.
+
+    Records are (op, line, a, b, clickbait), where a and b depend on op:
+        ADD/REMOVE:      a = user
+        FOLLOW/UNFOLLOW: a = followed user, b = follower
+        POST:            a = user, b = content
+        TIME:            clickbait = time
+    """
+
+    # Op codes
+    ADD = 0
+    REMOVE = 1
+    FOLLOW = 2
+    UNFOLLOW = 3
+    POST = 4
+    TIME = 5
+
+    DTYPE = np.dtype([('op', np.uint8), ('line', np.uint32),
+                      ('a', np.int32), ('b', np.int32),
+                      ('clickbait', np.float64)])
+    MAGIC = b"SNEV"
+    VERSION = 1
+
+    def __init__(self):
+        self._ops = np.zeros(16, dtype=SocialNetworkEvents.DTYPE)
+        self._count = 0
+        self._names = []
+        self._nameIds = DSAHashTable()
+        self._contents = []
+
+    @staticmethod
+    def compile(lines) -> 'SocialNetworkEvents':
+        """
+        Compiles the lines of an event file. Raises a ValueError containing
+        the line number of the first invalid line.
+        """
+        events = SocialNetworkEvents()
+        for i, x in enumerate(lines):
+            events.append(x.rstrip('\n'), i + 1)
+        return events
+
+    def append(self, line: str, lineNumber: int) -> tuple:
+        """
+        Compiles a single line, and adds it to the end of the events.
+
+        Returns:
+            The compiled record.
+        """
+        tokens = line.split(':')
+        ops = {"A": SocialNetworkEvents.ADD, "R": SocialNetworkEvents.REMOVE,
+               "F": SocialNetworkEvents.FOLLOW,
+               "U": SocialNetworkEvents.UNFOLLOW,
+               "P": SocialNetworkEvents.POST, "T": SocialNetworkEvents.TIME}
+        op = ops.get(tokens[0])
+        a = b = 0
+        clickbait = 1.0
+        if op in (SocialNetworkEvents.ADD, SocialNetworkEvents.REMOVE):
+            valid = len(tokens) == 2
+            if valid:
+                a = self._nameId(tokens[1])
+        elif op in (SocialNetworkEvents.FOLLOW, SocialNetworkEvents.UNFOLLOW):
+            valid = len(tokens) == 3
+            if valid:
+                a = self._nameId(tokens[1])
+                b = self._nameId(tokens[2])
+        elif op == SocialNetworkEvents.POST:
+            valid = len(tokens) in (3, 4)
+            if valid:
+                a = self._nameId(tokens[1])
+                b = len(self._contents)
+                self._contents.append(tokens[2])
+                if len(tokens) == 4:
+                    clickbait = self._number(tokens[3], lineNumber,
+                                             "clickbait factor")
+        elif op == SocialNetworkEvents.TIME:
+            valid = len(tokens) == 2
+            if valid:
+                clickbait = self._number(tokens[1], lineNumber, "time")
+        else:
+            valid = False
+        if not valid:
+            raise ValueError(f"Line {lineNumber}: Invalid file format.")
+
+        self._reserve(1)
+        record = (op, lineNumber, a, b, clickbait)
+        self._ops[self._count] = record
+        self._count += 1
+        return record
+
+    def extend(self, other: 'SocialNetworkEvents'):
+        """
+        Adds every event of other to the end of these events.
+        """
+        nameMap = np.array([self._nameId(x) for x in other._names],
+                           dtype=np.int32)
+        ops = other._ops[:other._count].copy()
+        named = ops['op'] != SocialNetworkEvents.TIME
+        ops['a'][named] = nameMap[ops['a'][named]]
+        paired = ((ops['op'] == SocialNetworkEvents.FOLLOW)
+                  | (ops['op'] == SocialNetworkEvents.UNFOLLOW))
+        ops['b'][paired] = nameMap[ops['b'][paired]]
+        ops['b'][ops['op'] == SocialNetworkEvents.POST] += len(self._contents)
+        self._contents.extend(other._contents)
+        self._reserve(len(ops))
+        self._ops[self._count:self._count + len(ops)] = ops
+        self._count += len(ops)
+
+    def clear(self):
+        """
+        Removes every event. Names keep their ids, so that user lookups
+        cached by a :class:`SocialNetworkEventExecutor` stay valid.
+        """
+        self._count = 0
+        self._contents = []
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, start: int = 0):
+        """
+        Generates (op, line, a, b, clickbait) for every event, starting at
+        the event with index start.
+        """
+        return iter(self._ops[start:self._count].tolist())
+
+    def batches(self, start: int = 0):
+        """
+        Generates every post event, with each maximal run of other events
+        between posts generated as a single list of events, starting at the
+        event with index start.
+        """
+        batch = []
+        for event in self.records(start):
+            if event[0] == SocialNetworkEvents.POST:
+                if len(batch) != 0:
+                    yield batch
+                    batch = []
+                yield event
+            else:
+                batch.append(event)
+        if len(batch) != 0:
+            yield batch
+
+    def name(self, nameId: int) -> str:
+        return self._names[nameId]
+
+    def content(self, contentId: int) -> str:
+        return self._contents[contentId]
+
+    def nameCount(self) -> int:
+        return len(self._names)
+
+    def tobytes(self) -> bytes:
+        """
+        Serializes the events into the format:
+        magic, int64 header (version, event count, name count,
+        content count), name table, content table, event records.
+        Each string table is stored as int64 offsets followed by utf-8 data.
+        """
+        header = np.array([SocialNetworkEvents.VERSION, self._count,
+                           len(self._names), len(self._contents)],
+                          dtype=np.int64)
+        return (SocialNetworkEvents.MAGIC + header.tobytes()
+                + SocialNetworkEvents._packStrings(self._names)
+                + SocialNetworkEvents._packStrings(self._contents)
+                + self._ops[:self._count].tobytes())
+
+    @staticmethod
+    def frombytes(data: bytes) -> 'SocialNetworkEvents':
+        magic = SocialNetworkEvents.MAGIC
+        if data[:len(magic)] != magic:
+            raise ValueError("Not a compiled event file.")
+        header = np.frombuffer(data, dtype=np.int64, count=4,
+                               offset=len(magic))
+        version, count, nameCount, contentCount = (int(x) for x in header)
+        if version != SocialNetworkEvents.VERSION:
+            raise ValueError("Unsupported compiled event file version.")
+        offset = len(magic) + header.nbytes
+        events = SocialNetworkEvents()
+        names, offset = SocialNetworkEvents._unpackStrings(data, offset,
+                                                           nameCount)
+        events._contents, offset = (SocialNetworkEvents.
+                                    _unpackStrings(data, offset,
+                                                   contentCount))
+        for x in names:
+            events._nameId(x)
+        events._ops = np.frombuffer(data, dtype=SocialNetworkEvents.DTYPE,
+                                    count=count, offset=offset).copy()
+        events._count = count
+        return events
+
+    def save(self, filename: str):
+        with open(filename, "wb") as f:
+            f.write(self.tobytes())
+
+    @staticmethod
+    def load(filename: str) -> 'SocialNetworkEvents':
+        with open(filename, "rb") as f:
+            return SocialNetworkEvents.frombytes(f.read())
+
+    # Private methods
+
+    def _reserve(self, count: int):
+        if self._count + count > len(self._ops):
+            ops = np.zeros(max(2 * len(self._ops), self._count + count),
+                           dtype=SocialNetworkEvents.DTYPE)
+            ops[:self._count] = self._ops[:self._count]
+            self._ops = ops
+
+    def _nameId(self, name: str) -> int:
+        if self._nameIds.hasKey(name):
+            nameId = self._nameIds.get(name)
+        else:
+            nameId = len(self._names)
+            self._names.append(name)
+            self._nameIds.put(name, nameId)
+        return nameId
+
+    @staticmethod
+    def _number(token: str, lineNumber: int, what: str) -> float:
+        try:
+            value = float(token)
+        except ValueError as e:
+            raise ValueError(f"Line {lineNumber}: Invalid {what}.") from e
+        return value
+
+    @staticmethod
+    def _packStrings(strings) -> bytes:
+        encoded = [x.encode() for x in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(x) for x in encoded])
+        return offsets.tobytes() + b"".join(encoded)
+
+    @staticmethod
+    def _unpackStrings(data: bytes, offset: int, count: int):
+        offsets = np.frombuffer(data, dtype=np.int64, count=count + 1,
+                                offset=offset)
+        offset += offsets.nbytes
+        strings = [data[offset + offsets[i]:offset + offsets[i + 1]]
+                   .decode() for i in range(count)]
+        return strings, offset + int(offsets[-1])
+
+
+class SocialNetworkEventExecutor:
+    """
+    This class applies compiled events to a SocialNetwork.
+    The user referred to by each name id is looked up once, and then reused
+    until that name is added or removed by an event.
+    Post events are not handled here, as each simulation mode creates posts
+    differently, but :func:`createPost` can be used to create them.
+
+    Events that have no effect are passed to report(event, message),
+    which prints the message by default.
+    """
+
+    def __init__(self, network: 'SocialNetwork',
+                 events: 'SocialNetworkEvents', report=None):
+        self._network = network
+        self._events = events
+        self._users = [None] * events.nameCount()
+        self._report = (SocialNetworkEventExecutor._print if report is None
+                        else report)
+
+    def user(self, nameId: int) -> 'SocialNetworkUser':
+        self._grow(nameId)
+        user = self._users[nameId]
+        if user is None:
+            user = self._network.findUser(self._events.name(nameId))
+            self._users[nameId] = user
+        return user
+
+    def apply(self, event: tuple):
+        """
+        Applies an add, remove, follow or unfollow event to the network.
+        Time events are ignored.
+        """
+        op, line, a, b, _ = event
+        name = self._events.name
+        if op == SocialNetworkEvents.FOLLOW:
+            if not self.user(b).follow(self.user(a)):
+                self._report(event, f"{name(b)} already follows {name(a)}.")
+        elif op == SocialNetworkEvents.UNFOLLOW:
+            if not self.user(b).unfollow(self.user(a)):
+                self._report(event, f"{name(b)} already follows {name(a)}.")
+        elif op == SocialNetworkEvents.ADD:
+            try:
+                self._network.addUser(name(a))
+            except ValueError as ex:
+                self._report(event, str(ex))
+        elif op == SocialNetworkEvents.REMOVE:
+            self._forget(a)
+            try:
+                self._network.removeUser(name(a))
+            except ValueError as ex:
+                self._report(event, str(ex))
+        elif op != SocialNetworkEvents.TIME:
+            raise ValueError(f"Line {line}: Cannot apply event.")
+
+    def applyAll(self, events):
+        """
+        Applies a sequence of add, remove, follow and unfollow events.
+        Each maximal run of the same kind of event is applied through a
+        single bulk operation on the network, which has the same effect and
+        output as applying the events one at a time.
+        """
+        events = list(events)
+        start = 0
+        while start < len(events):
+            end = start + 1
+            while end < len(events) and events[end][0] == events[start][0]:
+                end += 1
+            self._applyRun(events[start][0], events[start:end])
+            start = end
+
+    def createPost(self, event: tuple, addPost=None):
+        """
+        Creates the post described by a post event, using addPost
+        (default :func:`SocialNetwork.addPost`).
+
+        Returns:
+            The result of addPost, or None if the post could not be created.
+        """
+        op, line, a, b, clickbait = event
+        addPost = self._network.addPost if addPost is None else addPost
+        result = None
+        try:
+            result = addPost(self._events.name(a), self._events.content(b),
+                             clickbait)
+        except ValueError:
+            self._report(event, "Could not create post.")
+        return result
+
+    # Private methods
+
+    @staticmethod
+    def _print(event: tuple, message: str):
+        if event[0] in (SocialNetworkEvents.FOLLOW,
+                        SocialNetworkEvents.UNFOLLOW):
+            print(message)
+        else:
+            print(f"Line {event[1]}: {message}")
+
+    def _grow(self, nameId: int):
+        if nameId >= len(self._users):
+            # Events have been appended since this executor was created
+            self._users.extend([None] * (nameId + 1 - len(self._users)))
+
+    def _forget(self, nameId: int):
+        self._grow(nameId)
+        self._users[nameId] = None
+
+    def _applyRun(self, op: int, events: list):
+        name = self._events.name
+        network = self._network
+        if op in (SocialNetworkEvents.FOLLOW, SocialNetworkEvents.UNFOLLOW):
+            pairs = [(name(b), name(a)) for _, _, a, b, _ in events]
+            if op == SocialNetworkEvents.FOLLOW:
+                changed = network.followAll(pairs)
+            else:
+                changed = network.unfollowAll(pairs)
+            for event, (follower, followed), x in zip(events, pairs, changed):
+                if not x:
+                    self._report(event, f"{follower} already follows "
+                                        f"{followed}.")
+        elif op in (SocialNetworkEvents.ADD, SocialNetworkEvents.REMOVE):
+            users = [name(a) for _, _, a, _, _ in events]
+            if op == SocialNetworkEvents.ADD:
+                errors = network.addUsers(users)
+            else:
+                for _, _, a, _, _ in events:
+                    self._forget(a)
+                errors = network.removeUsers(users)
+            for event, error in zip(events, errors):
+                if error is not None:
+                    self._report(event, str(error))
+        else:
+            for event in events:
+                self.apply(event)
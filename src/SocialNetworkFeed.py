@@ -0,0 +1,318 @@
+import numpy as np
+import numpy.random
+
+from ADT.DSADeque import DSADeque
+from ADT.DSAHashTable import DSAHashTable
+from ADT.DSALinkedList import DSALinkedList
+from SocialNetworkPost import PostSummary
+
+
+class SocialNetworkFeed:
+    """
+    This class propagates many posts through a SocialNetwork at the same
+    time. Every call to :func:`update` advances all live posts by a single
+    timestep, using the same algorithm as
+    :func:`SocialNetworkPost.update`.
+
+    Rather than iterating over each post and each liker in Python, the
+    network is snapshotted into compressed sparse row (CSR) arrays of user
+    indices, and the state of every live post is stored sparsely: the
+    frontier is a list of (post, user) pairs for the users that liked a post
+    in the last timestep, and every (post, user) like is kept in a
+    :class:`_KeySet`. A timestep then consists of a handful of numpy
+    operations over all exposures of all posts, so its cost scales with the
+    size of the frontier and its exposures, rather than with the number of
+    posts or users.
+
+    Follows made during propagation are applied to the network immediately,
+    and are added to the snapshot as extra edges. Any other change to the
+    network made while the feed is live must be followed by a call to
+    :func:`invalidate`, so that the snapshot is rebuilt.
+    """
+
+    def __init__(self, network: 'SocialNetwork'):
+        self._network = network
+        self._stale = True
+        self._pending = DSALinkedList()
+        self._nextId = 0
+        # Snapshot of the network
+        self._labels = []
+        self._users = []
+        self._index = DSAHashTable()
+        self._ptr = np.zeros(1, dtype=np.int64)
+        self._idx = np.zeros(0, dtype=np.int64)
+        self._extraSrc = np.zeros(0, dtype=np.int64)
+        self._extraDst = np.zeros(0, dtype=np.int64)
+        # One entry/row per live post
+        self._posts = []
+        self._ids = []
+        self._follows = []
+        self._posters = np.zeros(0, dtype=np.int64)
+        self._probLike = np.zeros(0)
+        self._timesteps = np.zeros(0, dtype=np.int64)
+        # (row, user) of every frontier user
+        self._frontierRows = np.zeros(0, dtype=np.int64)
+        self._frontierUsers = np.zeros(0, dtype=np.int64)
+        # id * users + user of every like, keyed by post id rather than
+        # row, so that keys do not change as rows are removed
+        self._liked = _KeySet()
+
+    def addPost(self, userName: str, content: str,
+                clickbaitFactor: float = 1) -> int:
+        """
+        Creates a post on the network, which starts propagating on the next
+        call to :func:`update`.
+
+        Returns:
+            The id of the post within this feed. Ids are given out in
+            increasing order starting from 0.
+        """
+        post = self._network.addPost(userName, content, clickbaitFactor)
+        postId = self._nextId
+        self._nextId += 1
+        self._pending.insertLast((postId, post))
+        return postId
+
+    def invalidate(self):
+        """
+        Marks the snapshot of the network as out of date. Must be called
+        after the network is changed outside of this class.
+        """
+        self._stale = True
+
+    def done(self) -> bool:
+        return len(self._posts) == 0 and self._pending.isEmpty()
+
+    def __len__(self) -> int:
+        return len(self._posts) + len(self._pending)
+
+    def update(self) -> DSALinkedList:
+        """
+        Advances every live post by one timestep.
+
+        Returns:
+            (id, post, summary) for every post that finished during this
+            timestep.
+        """
+        if self._stale:
+            self._refresh()
+        if not self._pending.isEmpty():
+            self._addPending()
+
+        n = len(self._labels)
+        rows, users = self._frontierRows, self._frontierUsers
+        # Flatten the followers of every frontier user of every post
+        starts = self._ptr[users]
+        degrees = self._ptr[users + 1] - starts
+        followers = SocialNetworkFeed._expand(self._idx, starts, degrees)
+        exposedRows = np.repeat(rows, degrees)
+        if len(self._extraSrc) != 0:
+            order = np.argsort(self._extraSrc, kind="stable")
+            src = self._extraSrc[order]
+            starts = np.searchsorted(src, users)
+            degrees = np.searchsorted(src, users, side="right") - starts
+            extra = SocialNetworkFeed._expand(self._extraDst[order], starts,
+                                              degrees)
+            exposedRows = np.concatenate([exposedRows,
+                                          np.repeat(rows, degrees)])
+            followers = np.concatenate([followers, extra])
+
+        # Count exposures per (post, user), and sample each unliked pair once
+        keys, counts = np.unique(exposedRows * n + followers,
+                                 return_counts=True)
+        keyRows, keyUsers = np.divmod(keys, n)
+        ids = np.array(self._ids, dtype=np.int64)
+        unliked = ~self._liked.contains(ids[keyRows] * n + keyUsers)
+        keyRows = keyRows[unliked]
+        keyUsers = keyUsers[unliked]
+        counts = counts[unliked]
+        probLike = 1 - (1 - self._probLike[keyRows]) ** counts
+        likes = numpy.random.random_sample(len(keyRows)) < probLike
+        keyRows = keyRows[likes]
+        keyUsers = keyUsers[likes]
+        follows = (numpy.random.random_sample(len(keyRows))
+                   < self._network.probFollow)
+
+        self._frontierRows = keyRows
+        self._frontierUsers = keyUsers
+        self._liked.add(ids[keyRows] * n + keyUsers)
+        self._timesteps += 1
+
+        newLikes = [DSADeque() for _ in self._posts]
+        for r, u, f in zip(keyRows, keyUsers, follows):
+            user = self._users[u]
+            newLikes[r].insertFirst(user)
+            if f:
+                self._follow(r, u, user)
+        for post, likes in zip(self._posts, newLikes):
+            post.addTimestep(likes)
+
+        return self._removeFinished()
+
+    # Private methods
+
+    @staticmethod
+    def _expand(idx, starts, degrees):
+        """
+        Returns idx[starts[i]:starts[i] + degrees[i]] for every i,
+        concatenated.
+        """
+        ends = np.cumsum(degrees)
+        offsets = np.arange(ends[-1] if len(ends) else 0)
+        return idx[np.repeat(starts - (ends - degrees), degrees) + offsets]
+
+    def _follow(self, row: int, userIdx: int, user: 'SocialNetworkUser'):
+        poster = self._posters[row]
+        if poster != -1 and poster != userIdx:
+            if self._network.follow(user.name(), self._labels[poster]):
+                self._follows[row].insertLast(user)
+                self._extraSrc = np.append(self._extraSrc, poster)
+                self._extraDst = np.append(self._extraDst, userIdx)
+                # Rebuild once the extra edges are no longer cheap to scan
+                if len(self._extraSrc) > 64 + len(self._idx) // 4:
+                    self._stale = True
+
+    def _removeFinished(self) -> DSALinkedList:
+        finished = DSALinkedList()
+        live = np.zeros(len(self._posts), dtype=bool)
+        live[self._frontierRows] = True
+        for i in np.nonzero(~live)[0]:
+            finished.insertLast((self._ids[i], self._posts[i],
+                                 PostSummary(list(self._posts[i].liked()),
+                                             self._follows[i],
+                                             int(self._timesteps[i]))))
+        if len(finished) != 0:
+            keep = np.nonzero(live)[0]
+            self._posts = [self._posts[i] for i in keep]
+            self._ids = [self._ids[i] for i in keep]
+            self._follows = [self._follows[i] for i in keep]
+            self._posters = self._posters[keep]
+            self._probLike = self._probLike[keep]
+            self._timesteps = self._timesteps[keep]
+            self._frontierRows = (np.cumsum(live) - 1)[self._frontierRows]
+            # Forget the likes of finished posts once they are most of
+            # the likes kept
+            if len(self._liked) > 2 * sum(x.likeCount() for x in self._posts):
+                self._rekey(np.arange(len(self._labels), dtype=np.int64))
+        return finished
+
+    def _rekey(self, remap):
+        """
+        Keeps only the likes of live posts, with each user moved to
+        remap[user], or dropped if that is -1.
+        """
+        keys = self._liked.keys()
+        ids, users = np.divmod(keys, max(len(remap), 1))
+        users = remap[users]
+        kept = np.isin(ids, self._ids) & (users != -1)
+        self._liked = _KeySet(ids[kept] * len(self._labels) + users[kept])
+
+    def _addPending(self):
+        """
+        Adds a row for every pending post, in a single batch.
+        """
+        n = len(self._labels)
+        count = len(self._pending)
+        first = len(self._posts)
+        posters = np.full(count, -1, dtype=np.int64)
+        probLike = np.zeros(count)
+        liked = []
+        for i in range(count):
+            postId, post = self._pending.removeFirst()
+            for x in post.liked():
+                if self._index.hasKey(x.name()):
+                    liked.append(postId * n + self._index.get(x.name()))
+            if self._index.hasKey(post.user().name()):
+                posters[i] = self._index.get(post.user().name())
+            probLike[i] = post.likeProbability()
+            self._posts.append(post)
+            self._ids.append(postId)
+            self._follows.append(DSADeque())
+        rows = np.nonzero(posters != -1)[0]
+        self._frontierRows = np.concatenate([self._frontierRows,
+                                             rows + first])
+        self._frontierUsers = np.concatenate([self._frontierUsers,
+                                              posters[rows]])
+        self._liked.add(np.unique(np.array(liked, dtype=np.int64)))
+        self._posters = np.concatenate([self._posters, posters])
+        self._probLike = np.concatenate([self._probLike, probLike])
+        self._timesteps = np.concatenate([self._timesteps,
+                                          np.zeros(count, dtype=np.int64)])
+
+    def _refresh(self):
+        """
+        Rebuilds the CSR snapshot of followers, and remaps the state of
+        every live post onto the new user indices.
+        """
+        users = list(self._network.users())
+        labels = [u.name() for u in users]
+        index = DSAHashTable(len(labels))
+        for i, label in enumerate(labels):
+            index.put(label, i)
+        ptr = np.zeros(len(labels) + 1, dtype=np.int64)
+        idx = []
+        for i, u in enumerate(users):
+            followers = [index.get(f.name()) for f in u.followers()]
+            ptr[i + 1] = ptr[i] + len(followers)
+            idx.extend(followers)
+
+        remap = np.array([index.get(label) if index.hasKey(label) else -1
+                          for label in self._labels], dtype=np.int64)
+        frontier = remap[self._frontierUsers]
+        kept = frontier != -1
+        self._frontierRows = self._frontierRows[kept]
+        self._frontierUsers = frontier[kept]
+        posters = self._posters.copy()
+        valid = posters != -1
+        posters[valid] = remap[posters[valid]]
+
+        self._labels = labels
+        self._users = users
+        self._rekey(remap)
+        self._index = index
+        self._ptr = ptr
+        self._idx = np.array(idx, dtype=np.int64)
+        self._extraSrc = np.zeros(0, dtype=np.int64)
+        self._extraDst = np.zeros(0, dtype=np.int64)
+        self._posters = posters
+        self._stale = False
+
+
+class _KeySet:
+    """
+    A set of int64 keys, held as sorted arrays whose sizes at least double
+    from last to first. Adding keys merges the arrays that are no larger
+    than twice the new keys, so each key is merged O(log n) times, and k keys
+    are looked up with k binary searches of each of the O(log n) arrays.
+    """
+
+    def __init__(self, keys=None):
+        self._levels = []
+        if keys is not None:
+            self.add(np.unique(keys))
+
+    def add(self, keys):
+        """
+        Adds keys, which must be distinct and not already in the set.
+        """
+        if len(keys) != 0:
+            level = np.sort(keys)
+            while (len(self._levels) != 0
+                   and len(self._levels[-1]) <= 2 * len(level)):
+                level = np.sort(np.concatenate([self._levels.pop(), level]),
+                                kind="mergesort")
+            self._levels.append(level)
+
+    def contains(self, keys) -> np.ndarray:
+        found = np.zeros(len(keys), dtype=bool)
+        for level in self._levels:
+            i = np.minimum(np.searchsorted(level, keys), len(level) - 1)
+            found |= level[i] == keys
+        return found
+
+    def keys(self) -> np.ndarray:
+        return (np.concatenate(self._levels) if len(self._levels) != 0
+                else np.zeros(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self._levels)
@@ -0,0 +1,207 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ADT.DSAHeap import DSAHeap
+from ADT.DSASharedGraph import DSASharedGraph
+
+# Expected number of likes of a post by user, or the expected number of
+# additional likes when user is added to a set of posters.
+Influence = namedtuple('Influence', 'user reach')
+
+# State of each pool worker, see _initWorker
+_worker = {}
+
+
+class SocialNetworkInfluence:
+    """
+    This class estimates how many likes a post would receive if it was
+    posted by a given user, using Monte Carlo simulation.
+
+    A post propagates along follows as an independent cascade: when a user
+    likes the post, each of their followers is exposed once, and likes the
+    post with probability p = min(1, prob_like * clickbait_factor).
+    Follows made while a post propagates are never exposed to that post,
+    so the number of likes of a post is the number of users that can reach
+    the poster through a 'live edge graph', which contains each follow
+    with probability p.
+
+    A number of live edge graphs are sampled, and reused by every estimate,
+    so candidates are compared on the same samples. Sample i is always
+    generated from the same seed, so the samples can be split between the
+    processes of a pool, with each process sampling and caching only the
+    graphs it is given. Processes attach to the network through a
+    :class:`ADT.DSASharedGraph.DSASharedGraph` rather than a pickled copy.
+    """
+
+    def __init__(self, graph: 'DSASharedGraph', probability: float, *,
+                 samples: int, seed: int, processes: int = None):
+        if samples < 1:
+            raise ValueError("At least one sample is required.")
+        self._graph = graph
+        self._samples = samples
+        self._processes = processes or os.cpu_count() or 1
+        self._pool = None
+        self._sampler = None
+        if self._processes == 1:
+            self._sampler = _LiveEdgeSampler(graph, probability, seed)
+        else:
+            self._pool = ProcessPoolExecutor(
+                self._processes, initializer=_initWorker,
+                initargs=(graph.name, probability, seed))
+        # Contiguous ranges of samples given to each task
+        bounds = np.linspace(0, samples, self._processes + 1).astype(int)
+        self._chunks = [range(lo, hi) for lo, hi in zip(bounds, bounds[1:])
+                        if hi > lo]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def gains(self, candidates, seeds=()) -> np.ndarray:
+        """
+        Estimates the expected number of likes each candidate would add to
+        the likes of posts by every user in seeds. Users are vertex indices
+        of the shared graph.
+        """
+        candidates = list(candidates)
+        seeds = list(seeds)
+        if self._pool is None:
+            total = self._sampler.gains(range(self._samples), candidates,
+                                        seeds)
+        else:
+            total = sum(self._pool.map(_workerGains, self._chunks,
+                                       [candidates] * len(self._chunks),
+                                       [seeds] * len(self._chunks)))
+        return total / self._samples
+
+    def expected(self):
+        """
+        Estimates the expected number of likes of a post by each user,
+        including the like of the poster.
+
+        Returns:
+            The (label, reach) of every user, by decreasing reach.
+        """
+        reach = self.gains(range(self._graph.getVertexCount()))
+        order = sorted(range(len(reach)), key=lambda i: (-reach[i], i))
+        return [Influence(self._graph.label(i), float(reach[i]))
+                for i in order]
+
+    def greedy(self, k: int):
+        """
+        Greedily selects k users whose posts together reach the most users,
+        by repeatedly choosing the user with the largest expected gain.
+        Gains can only shrink as users are chosen, so gains are evaluated
+        lazily (CELF): the best candidate is only re-evaluated against the
+        users chosen so far, and is chosen if it is still the best.
+
+        Returns:
+            The (label, gain) of each chosen user, in the order chosen.
+        """
+        n = self._graph.getVertexCount()
+        if k < 0 or k > n:
+            raise ValueError("k must be between 0 and the number of users.")
+        heap = DSAHeap(max(n, 1))
+        for i, gain in enumerate(self.gains(range(n))):
+            # Ties are broken by the lowest index
+            heap.add((float(gain), -i), 0)
+        chosen = []
+        while len(chosen) < k:
+            (gain, i), evaluated = heap.remove()
+            if evaluated == len(chosen):
+                chosen.append(Influence(-i, gain))
+            else:
+                gain = float(self.gains([-i], [x.user for x in chosen])[0])
+                heap.add((gain, i), len(chosen))
+        return [Influence(self._graph.label(x.user), x.reach)
+                for x in chosen]
+
+
+class _LiveEdgeSampler:
+    """
+    Samples and caches the live edge graphs of a shared graph, and counts
+    the users that can be reached in them.
+    """
+
+    def __init__(self, graph: 'DSASharedGraph', probability: float,
+                 seed: int):
+        self._graph = graph
+        self._probability = probability
+        self._seed = seed
+        self._cache = {}
+        # Exposures travel from each user to their followers
+        ptr, idx = graph.predecessorCSR()
+        self._rows = np.repeat(np.arange(graph.getVertexCount()),
+                               np.diff(ptr))
+
+    def sample(self, i: int):
+        """
+        Returns live edge graph i as (ptr, idx) lists in CSR format.
+        """
+        if i not in self._cache:
+            ptr, idx = self._graph.predecessorCSR()
+            rng = np.random.default_rng([self._seed, i])
+            live = rng.random(len(idx)) < self._probability
+            livePtr = np.zeros(len(ptr), dtype=np.int64)
+            livePtr[1:] = np.cumsum(np.bincount(self._rows[live],
+                                                minlength=len(ptr) - 1))
+            self._cache[i] = (livePtr.tolist(), idx[live].tolist())
+        return self._cache[i]
+
+    def gains(self, samples, candidates, seeds) -> np.ndarray:
+        """
+        Returns the total over samples of the number of users reached by
+        each candidate, that are not reached by any of seeds.
+        """
+        total = np.zeros(len(candidates))
+        n = self._graph.getVertexCount()
+        for i in samples:
+            ptr, idx = self.sample(i)
+            # 0 is unvisited, 1 is reached by seeds, and 2 + j is reached by
+            # candidate j
+            visited = [0] * n
+            _LiveEdgeSampler._reach(ptr, idx, seeds, visited, 1)
+            for j, x in enumerate(candidates):
+                if visited[x] != 1:
+                    total[j] += _LiveEdgeSampler._reach(ptr, idx, [x],
+                                                        visited, 2 + j)
+        return total
+
+    @staticmethod
+    def _reach(ptr, idx, sources, visited, mark) -> int:
+        """
+        Marks every unmarked user reachable from sources through unmarked
+        users, and returns the number of users marked.
+        """
+        stack = [x for x in sources if visited[x] < mark]
+        for x in stack:
+            visited[x] = mark
+        count = 0
+        while len(stack) != 0:
+            x = stack.pop()
+            count += 1
+            for y in idx[ptr[x]:ptr[x + 1]]:
+                if visited[y] != 1 and visited[y] != mark:
+                    visited[y] = mark
+                    stack.append(y)
+        return count
+
+
+def _initWorker(name: str, probability: float, seed: int):
+    # Runs in each pool process
+    _worker["sampler"] = _LiveEdgeSampler(DSASharedGraph.attach(name),
+                                          probability, seed)
+
+
+def _workerGains(samples, candidates, seeds):
+    # Runs in each pool process
+    return _worker["sampler"].gains(samples, candidates, seeds)
@@ -23,6 +23,8 @@ class interactive(cmd.Cmd):
 
     intro = "Type help or ? to list commands.\n"
     prompt = "(social-sim) "
+    # Number of posts shown per page
+    PAGE_SIZE = 10
 
     def __init__(self):
         super(interactive, self).__init__()
@@ -40,16 +42,22 @@ class interactive(cmd.Cmd):
             print(str(vEx))
 
     def do_find_user(self, arg):
-        """Find a user and display their posts, followers, and following:
-        find_user <name>
+        """Find a user and display a page of their posts from newest to
+        oldest, the posts they have liked, followers, and following:
+        find_user <name>:<(optional) page>
         """
         try:
-            user = self._network.findUser(arg)
+            name, start = interactive._page(arg)
+            user = self._network.findUser(name)
             print("#posts")
-            for x in user.posts:
+            for x in user.posts.latest(interactive.PAGE_SIZE, start):
                 print(f"content: {x.content}")
                 print("liked:")
                 [print(y.name()) for y in x.liked()]
+            print("#liked")
+            for x in user.likedPosts():
+                print(f"user: {x.user().name()}")
+                print(f"content: {x.content}")
             print("#followers")
             [print(x.name()) for x in user.followers()]
             print("#following")
@@ -148,15 +156,26 @@ class interactive(cmd.Cmd):
         print(self._network.optionalStats())
 
     def do_posts(self, arg):
-        'Display posts in order of popularity: posts'
-        [print(f"user: {x.user().name()}\n"
-               f"content: {x.content}\n"
-               f"likes: {sum(1 for _ in x.liked())}\n"
-               ) for x in self._network.popularPosts()]
+        """Display posts in order of popularity, or a page of the posts of
+        a single user: posts <(optional) name>:<(optional) page>
+        """
+        try:
+            if arg == "":
+                posts = self._network.popularPosts()
+            else:
+                name, start = interactive._page(arg)
+                posts = self._network.findUser(name).posts.mostLiked(
+                    interactive.PAGE_SIZE, start)
+            [print(f"user: {x.user().name()}\n"
+                   f"content: {x.content}\n"
+                   f"likes: {x.likeCount()}\n"
+                   ) for x in posts]
+        except ValueError as ex:
+            print(str(ex))
 
     def do_users(self, arg):
         'Display users in order of popularity: users'
-        [print(f"user: {x.name()}\nfollowers: {len(x.followers())}\n")
+        [print(f"user: {x.name()}\nfollowers: {x.followerCount()}\n")
          for x in self._network.popularUsers()]
 
     def do_update(self, arg):
@@ -174,6 +193,25 @@ class interactive(cmd.Cmd):
         except IOError as ioex:
             print(f"File could not be read: {os.strerror(ioex.errno)}")
 
+    @staticmethod
+    def _page(arg: str) -> (str, int):
+        """
+        Splits <name>:<page> into the name, and the index of the first post
+        on the page. Pages start from 1.
+        """
+        args = arg.split(':')
+        page = 1
+        if len(args) == 2:
+            try:
+                page = int(args[1])
+            except ValueError as e:
+                raise ValueError("Invalid page.") from e
+        elif len(args) != 1:
+            raise ValueError("Invalid usage.")
+        if page < 1:
+            raise ValueError("Pages start from 1.")
+        return args[0], (page - 1) * interactive.PAGE_SIZE
+
     def do_exit(self, arg):
         'Exit the program: exit'
         return True
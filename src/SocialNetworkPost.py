@@ -1,8 +1,14 @@
 from functools import total_ordering
+from collections import namedtuple
+from bisect import bisect_right
 
 import numpy.random
 
-from ADT.DSALinkedList import DSALinkedList
+from ADT.DSADeque import DSADeque
+from ADT.DSAHashTable import DSAHashTable
+
+# Result of running a post to completion
+PostSummary = namedtuple('PostSummary', 'likers follows timesteps')
 
 
 @total_ordering
@@ -16,11 +22,17 @@ class SocialNetworkPost:
     algorithm is implemented in this method.
     """
 
+    # Like probabilities below this are sampled by skipping straight to the
+    # successful exposures, rather than sampling every exposure.
+    SKIP_SAMPLING_THRESHOLD = 0.1
+
     def __init__(self, user: 'SocialNetworkUser', content: str,
                  clickbaitFactor: float, probLike: float, probFollow: float):
-        self._recentlyLiked = DSALinkedList()
-        self._liked = DSALinkedList()
+        self._recentlyLiked = DSADeque()
+        self._liked = DSADeque()
         self._recentlyLiked.insertFirst(user)
+        if user is not None:
+            user.addLike(self)
         self._content = content
         self._probLike = probLike
         self._probFollow = probFollow
@@ -36,6 +48,12 @@ class SocialNetworkPost:
             raise ValueError("clickbaitFactor must be positive.")
         self._clickbaitFactor = clickbaitFactor
 
+    def likeProbability(self) -> float:
+        """
+        The probability that a single exposure to the post results in a like.
+        """
+        return min(1, self._probLike * self.clickbaitFactor)
+
     def user(self) -> 'SocialNetworkUser':
         if len(self._liked) == 0:
             user = self._recentlyLiked.peekLast()
@@ -47,13 +65,23 @@ class SocialNetworkPost:
         if self._recentlyLiked.find(user) or self._liked.find(user):
             raise ValueError("User has already liked post.")
         self._recentlyLiked.insertFirst(user)
+        user.addLike(self)
+        self.user().posts.likesChanged(self, 1)
+        self.user().touch()
 
     def unlike(self, user: 'SocialNetworkUser'):
         ret = self._liked.remove(user)
         if ret is None:
             ret = self._recentlyLiked.remove(user)
+        if ret is not None:
+            user.removeLike(self)
+            self.user().posts.likesChanged(self, -1)
+            self.user().touch()
         return ret
 
+    def likeCount(self) -> int:
+        return len(self._recentlyLiked) + len(self._liked)
+
     @property
     def content(self) -> str:
         return self._content
@@ -68,7 +96,7 @@ class SocialNetworkPost:
                 + '\n'.join([x.name() for x in self.liked()])
                 + '\n')
 
-    def update(self) -> str:
+    def update(self) -> DSADeque:
         """
         The update algorithm works as follows:
         Check that there exists some users that have liked the post in the
@@ -87,25 +115,136 @@ class SocialNetworkPost:
         they may potentially be exposed to it later via a different friend.
         This behaviour is intentional, as it incentivises
         a highly connected network.
+
+        A user that follows k of the previous timestep's likers is exposed
+        k times. Rather than sampling each exposure, exposures are first
+        counted per user, and each user is sampled once with probability
+        1 - (1 - p)^k, which is the probability that at least one of the k
+        exposures results in a like. Users that have already liked the post
+        are not sampled, and only new likers may follow the original poster.
+
+        When the like probability is small, almost every sample fails.
+        In this case the followers of every recent liker are instead treated
+        as one flattened sequence of exposures, and the gaps between
+        successful exposures are sampled from a geometric distribution.
+        This makes the cost of a timestep proportional to the number of likes
+        rather than the number of exposures. A user with at least one
+        successful exposure likes the post, which has the same probability as
+        above.
+
+        Returns:
+            The users that started following the original poster
+            during this timestep.
+        """
+        return self._step(self._likedSet())
+
+    def propagate(self) -> PostSummary:
+        """
+        Runs :func:`update` until the post is done, without producing any
+        intermediate output. The set of users that have liked the post is
+        built once and carried between timesteps, rather than being rebuilt
+        every timestep.
+
+        Returns:
+            The final likers, the users that followed the original poster,
+            and the number of timesteps taken.
+        """
+        liked = self._likedSet()
+        follows = DSADeque()
+        timesteps = 0
+        while not self.done():
+            follows.concat(self._step(liked))
+            timesteps += 1
+        return PostSummary(list(self.liked()), follows, timesteps)
+
+    def _likedSet(self) -> DSAHashTable:
+        liked = DSAHashTable()
+        for x in self.liked():
+            liked.put(x.name(), None)
+        return liked
+
+    def _step(self, liked: DSAHashTable) -> DSADeque:
+        """
+        Runs a single timestep. liked contains the names of all users that
+        have liked the post, and is updated with the new likes.
+        """
+        follows = DSADeque()
+        poster = self.user()
+        probLike = self.likeProbability()
+        if probLike < SocialNetworkPost.SKIP_SAMPLING_THRESHOLD:
+            newLikes = self._sampleSkip(probLike, liked)
+        else:
+            newLikes = self._sampleExposures(probLike, liked)
+        for user in reversed(newLikes):
+            # Does the user follow the original poster?
+            if numpy.random.binomial(1, self._probFollow) == 1:
+                try:
+                    if user.follow(poster):
+                        follows.insertLast(user)
+                except ValueError:
+                    pass
+        self.addTimestep(newLikes)
+        return follows
+
+    def addTimestep(self, newLikes: DSADeque):
+        """
+        Moves the post forward by one timestep, where newLikes contains the
+        users that liked the post during that timestep. This is used by
+        :func:`update`, and by engines that sample likes themselves.
         """
-        newLikes = DSALinkedList()
-        for x in self._recentlyLiked:
-            for user in x.followers():
-                # Does the user like the post?
-                if numpy.random.binomial(1, min(1, self._probLike *
-                                                self.clickbaitFactor)) == 1:
-                    if (not self._liked.find(user)
-                       and not self._recentlyLiked.find(user)
-                       and not newLikes.find(user)):
-                        newLikes.insertFirst(user)
-                    # Does the user follow the original poster?
-                    if numpy.random.binomial(1, self._probFollow) == 1:
-                        try:
-                            user.follow(self.user())
-                        except ValueError:
-                            pass
         self._liked = self._recentlyLiked.concat(self._liked)
         self._recentlyLiked = newLikes
+        for user in newLikes:
+            user.addLike(self)
+        self.user().posts.likesChanged(self, len(newLikes))
+        self.user().touch()
+
+    def _sampleExposures(self, probLike: float,
+                         liked: DSAHashTable) -> DSADeque:
+        newLikes = DSADeque()
+        # Count the exposures of each user that has not liked the post,
+        # in order of first exposure.
+        exposures = DSAHashTable()
+        exposed = DSADeque()
+        for x in self._recentlyLiked:
+            for user in x.followers():
+                name = user.name()
+                if exposures.hasKey(name):
+                    exposures.put(name, exposures.get(name) + 1)
+                elif not liked.hasKey(name):
+                    exposures.put(name, 1)
+                    exposed.insertLast(user)
+        for user in exposed:
+            # Does the user like the post?
+            count = exposures.get(user.name())
+            if numpy.random.binomial(1, 1 - (1 - probLike) ** count) == 1:
+                liked.put(user.name(), None)
+                newLikes.insertFirst(user)
+        return newLikes
+
+    def _sampleSkip(self, probLike: float,
+                    liked: DSAHashTable) -> DSADeque:
+        newLikes = DSADeque()
+        if probLike > 0:
+            likers = list(self._recentlyLiked)
+            # ends[i] is the end of likers[i]'s followers in the
+            # flattened exposure sequence
+            ends = []
+            total = 0
+            for x in likers:
+                total += x.followerCount()
+                ends.append(total)
+            position = numpy.random.geometric(probLike) - 1
+            while position < total:
+                i = bisect_right(ends, position)
+                # Only the followers that are hit are visited
+                start = ends[i - 1] if i > 0 else 0
+                user = likers[i].followers()[position - start]
+                if not liked.hasKey(user.name()):
+                    liked.put(user.name(), None)
+                    newLikes.insertFirst(user)
+                position += numpy.random.geometric(probLike)
+        return newLikes
 
     def liked(self):
         def generateLiked(l1, l2):
@@ -119,5 +258,4 @@ class SocialNetworkPost:
         return self is other
 
     def __lt__(self, other):
-        return (len(self._liked) + len(self._recentlyLiked)
-                < len(other._recentlyLiked) + len(other._liked))
+        return self.likeCount() < other.likeCount()
@@ -0,0 +1,144 @@
+import time
+from collections import namedtuple
+
+from ADT.DSAHeap import DSAHeap
+from ADT.DSALinkedList import DSALinkedList
+from SocialNetworkEvents import SocialNetworkEvents, SocialNetworkEventExecutor
+
+# Outcome of a post. start and end are simulated times.
+ScheduledPost = namedtuple('ScheduledPost', ('post user content likes '
+                                             'follows start end'))
+# Returned by SocialNetworkScheduler.run
+SchedulerStats = namedtuple('SchedulerStats', ('events timesteps time '
+                                               'seconds eventsPerSecond'))
+
+
+class SocialNetworkScheduler:
+    """
+    This class runs a discrete event simulation of a social network.
+
+    Events and post timesteps are stored in a DSAHeap keyed by simulated
+    time, with ties broken by the order in which they were scheduled.
+    This allows any number of posts to be in flight at once, with the
+    follow/unfollow/add/remove events of the event file being applied
+    between their timesteps. As the next item is always taken from the top
+    of the heap, periods where nothing happens are skipped in O(log(n))
+    rather than being stepped through.
+
+    Event files use the same format as simulation mode, with one addition.
+    A line of the form T:<time> sets the simulated time of all following
+    events, and time may not go backwards. Events before the first T line
+    happen at time 0. A post created at time t has its k'th timestep at
+    time t + k. At any given time, events from the event file are applied
+    before post timesteps.
+    """
+
+    _EVENT = 0
+    _TIMESTEP = 1
+
+    def __init__(self, network: 'SocialNetwork'):
+        self._network = network
+        self._queue = DSAHeap()
+        self._sequence = 0
+        self._time = 0
+        self._postCount = 0
+        self._results = DSALinkedList()
+        self._events = SocialNetworkEvents()
+        self._executor = SocialNetworkEventExecutor(network, self._events)
+
+    @property
+    def time(self) -> float:
+        return self._time
+
+    def schedule(self, when: float, event: str, lineNumber: int = 0):
+        """
+        Schedules a single event line at simulated time when.
+        """
+        if when < self._time:
+            raise ValueError("Events cannot be scheduled in the past.")
+        record = self._events.append(event, lineNumber)
+        self._push(when, (SocialNetworkScheduler._EVENT, record))
+
+    def load(self, events):
+        """
+        Schedules every event of an event file, given either as a
+        :class:`SocialNetworkEvents.SocialNetworkEvents` or as lines.
+        Every event is checked before any event is scheduled.
+        """
+        if not isinstance(events, SocialNetworkEvents):
+            events = SocialNetworkEvents.compile(events)
+        when = self._time
+        for op, line, _, _, newTime in events:
+            if op == SocialNetworkEvents.TIME:
+                if newTime < when:
+                    raise ValueError(f"Line {line}: Time cannot go "
+                                     "backwards.")
+                when = newTime
+        start = len(self._events)
+        self._events.extend(events)
+        when = self._time
+        for record in self._events.records(start):
+            if record[0] == SocialNetworkEvents.TIME:
+                when = record[4]
+            else:
+                self._push(when, (SocialNetworkScheduler._EVENT, record))
+
+    def run(self) -> SchedulerStats:
+        """
+        Processes events until the queue is empty.
+
+        Returns:
+            The number of events and post timesteps processed, the final
+            simulated time, and the wall clock time taken.
+        """
+        start = time.perf_counter()
+        events = 0
+        timesteps = 0
+        while len(self._queue) != 0:
+            (negTime, _), item = self._queue.remove()
+            self._time = -negTime
+            if item[0] == SocialNetworkScheduler._EVENT:
+                self._execute(item[1])
+            else:
+                self._timestep(item[1], item[2])
+                timesteps += 1
+            events += 1
+        seconds = time.perf_counter() - start
+        rate = events / seconds if seconds != 0 else float("inf")
+        return SchedulerStats(events, timesteps, self._time, seconds, rate)
+
+    def results(self):
+        """
+        Generates the outcome of every finished post, in order of creation.
+        """
+        return iter(sorted(self._results))
+
+    # Private methods
+
+    def _push(self, when: float, item: tuple):
+        # DSAHeap is a max heap, so priorities are negated
+        self._queue.add((-when, -self._sequence), item)
+        self._sequence += 1
+
+    def _timestep(self, post: 'SocialNetworkPost', record: list):
+        record[3] += len(post.update())
+        if post.done():
+            self._results.insertLast(
+                ScheduledPost(record[0], record[1], record[2],
+                              sum(1 for _ in post.liked()), record[3],
+                              record[4], self._time))
+        else:
+            self._push(self._time + 1,
+                       (SocialNetworkScheduler._TIMESTEP, post, record))
+
+    def _execute(self, event: tuple):
+        if event[0] != SocialNetworkEvents.POST:
+            self._executor.apply(event)
+        else:
+            post = self._executor.createPost(event)
+            if post is not None:
+                record = [self._postCount, self._events.name(event[2]),
+                          self._events.content(event[3]), 0, self._time]
+                self._push(self._time + 1,
+                           (SocialNetworkScheduler._TIMESTEP, post, record))
+            self._postCount += 1
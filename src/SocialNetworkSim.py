@@ -34,6 +34,24 @@ def make_parser():
     sim_parser.add_argument('prob_foll', type=float,
                             help=('Probability of following the original '
                                   'poster of a liked post'))
+    sim_parser.add_argument('output', nargs='?', default='full',
+                            choices=SocialNetworkSimRunner.MODES,
+                            help=('Log the network at every timestep (full), '
+                                  'or only the outcome of each post '
+                                  '(summary). In concurrent mode, all posts '
+                                  'propagate at the same time. In timed '
+                                  'mode, events are scheduled by the '
+                                  'T:<time> lines of the event file. In '
+                                  'stream mode, events are run as they '
+                                  'are read (eventfile may be - for stdin, '
+                                  'or a named pipe), and the outcome of '
+                                  'each post is printed immediately'))
+    sim_parser.add_argument('checkpoint', nargs='?', default=None,
+                            help=('File that full and summary mode '
+                                  'simulations are periodically saved to. '
+                                  'If it exists, the saved simulation is '
+                                  'resumed, and only the output after the '
+                                  'checkpoint is logged'))
     return parser, int_parser, sim_parser
 
 
@@ -53,7 +71,9 @@ if __name__ == "__main__":
                             SimulationInterface(args.netfile,
                                                 args.eventfile,
                                                 args.prob_like,
-                                                args.prob_foll))
+                                                args.prob_foll,
+                                                mode=args.output,
+                                                checkpoint=args.checkpoint))
                 if filename is not None:
                     print(f"Simulation logged to {filename}")
         except KeyboardInterrupt:
@@ -1,14 +1,28 @@
 import random
 import math
 import itertools
+import hashlib
+import os
+import time
+from collections import namedtuple
 from typing import Callable
 from tempfile import NamedTemporaryFile
 
 import numpy
 
+from ADT.DSADeque import *
 from ADT.DSADirectedGraph import *
-from ADT.DSALinkedList import *
+from SocialNetworkCheckpoint import SocialNetworkCheckpoint, SimProgress
 from SocialNetworkCore import SocialNetwork
+from SocialNetworkEvents import SocialNetworkEvents, SocialNetworkEventExecutor
+from SocialNetworkFeed import SocialNetworkFeed
+from SocialNetworkScheduler import SocialNetworkScheduler
+
+# Logged at each timestep in full mode
+SimStats = namedtuple('SimStats', 'post simstate likes clustering favg fsd')
+# Logged for each post in every other mode
+SummaryStats = namedtuple('SummaryStats', ('post user content likes '
+                                           'follows timesteps'))
 
 
 class SocialNetworkSimRunner:
@@ -19,75 +33,369 @@ class SocialNetworkSimRunner:
     despite not sharing any data or state between them.
     """
 
+    # Simulation modes, see ExecEventFile
+    MODES = ("full", "summary", "concurrent", "timed", "stream")
+    # Statistics that can be logged at each timestep in full mode
+    STATS = ("simstate", "likes", "clustering", "follows")
+    # Maximum number of events held in memory at once in stream mode
+    STREAM_BATCH = 1000
+    # Minimum number of seconds between checkpoints
+    CHECKPOINT_INTERVAL = 60
+
     @staticmethod
-    def SimulationInterface(netfile, eventfile, prob_like, prob_foll):
+    def SimulationInterface(netfile, eventfile, prob_like, prob_foll, *,
+                            mode="full", checkpoint=None):
+        """
+        Runs a simulation and logs it to a temporary file.
+        In full mode the network state is logged at every timestep,
+        otherwise only the final outcome of each post is logged.
+        In stream mode, the outcome of each post is written to stdout as
+        soon as it is known, and no file is created.
+        If a checkpoint file is given, see :func:`Simulation`.
+        """
         filename = None
         try:
-            state = SocialNetworkSimRunner.Simulation(netfile, eventfile,
-                                                      prob_like, prob_foll)
-            with NamedTemporaryFile(delete=False, mode='w') as f:
-                filename = f.name
-                for x in state:
-                    f.write(f"{x.simstate}"
-                            f"Likes per person per post: {x.likes}\n"
-                            f"Follower Average: {x.favg}\n"
-                            f"Follower s.d: {x.fsd}\n"
-                            f"Clustering Coefficient: {x.clustering}\n\n")
+            if mode == "stream":
+                network = SocialNetwork(probLike=prob_like,
+                                        probFollow=prob_foll)
+                network.loadNetwork(netfile)
+                for x in SocialNetworkSimRunner.ExecEventStream(network,
+                                                                eventfile):
+                    print(SocialNetworkSimRunner._Format(x), end='',
+                          flush=True)
+            else:
+                state = SocialNetworkSimRunner.Simulation(
+                    netfile, eventfile, prob_like, prob_foll, mode=mode,
+                    checkpoint=checkpoint)
+                with NamedTemporaryFile(delete=False, mode='w') as f:
+                    filename = f.name
+                    for x in state:
+                        f.write(SocialNetworkSimRunner._Format(x))
         except ValueError as ex:
             print(str(ex))
         return filename
 
     @staticmethod
-    def Simulation(netfile, eventfile, prob_like, prob_foll) -> DSALinkedList:
-        network = SocialNetwork(probLike=prob_like, probFollow=prob_foll)
-        network.loadNetwork(netfile)
-        events = [x.rstrip('\n') for x in eventfile]
-        return SocialNetworkSimRunner.ExecEventFile(network, events)
+    def _Format(x) -> str:
+        if isinstance(x, SummaryStats):
+            formatted = (f"post: {x.post}\n"
+                         f"user: {x.user}\n"
+                         f"content: {x.content}\n"
+                         f"likes: {x.likes}\n"
+                         f"new follows: {x.follows}\n"
+                         f"timesteps: {x.timesteps}\n\n")
+        else:
+            formatted = (f"{x.simstate}"
+                         f"Likes per person per post: {x.likes}\n"
+                         f"Follower Average: {x.favg}\n"
+                         f"Follower s.d: {x.fsd}\n"
+                         f"Clustering Coefficient: "
+                         f"{x.clustering}\n\n")
+        return formatted
 
     @staticmethod
-    def ExecEventFile(network, events) -> DSALinkedList:
-        outcome = ""
-        from collections import namedtuple
-        SimStats = namedtuple('SimStats', ('post simstate likes clustering '
-                                           'favg fsd'))
-        state = DSALinkedList()
-        post = 0
-        for i, x in enumerate(events):
-            tokens = x.split(':')
-            if len(tokens) == 3 and tokens[0] == "F":
-                if not network.follow(tokens[2], tokens[1]):
-                    print(f"{tokens[2]} already follows {tokens[1]}.")
-            elif len(tokens) == 3 and tokens[0] == "U":
-                if not network.unfollow(tokens[2], tokens[1]):
-                    print(f"{tokens[2]} already follows {tokens[1]}.")
-            elif len(tokens) == 2 and tokens[0] == "A":
-                try:
-                    network.addUser(tokens[1])
-                except ValueError as ex:
-                    print(f"Line {i + 1}: " + str(ex))
-            elif len(tokens) == 2 and tokens[0] == "R":
-                try:
-                    network.removeUser(tokens[1])
-                except ValueError as ex:
-                    print(f"Line {i + 1}: " + str(ex))
-            elif len(tokens) == 3 or len(tokens) == 4 and tokens[0] == "P":
-                try:
-                    if len(tokens) == 3:
-                        network.addPost(tokens[1], tokens[2])
-                    else:
-                        network.addPost(tokens[1], tokens[2], float(tokens[3]))
-                except ValueError:
-                    print(f"Line {i + 1}: Could not create post.")
-                while not network.done():
-                    state.insertLast(SimStats(post,
-                                              network.simstate(),
-                                              network.likesScaled(),
-                                              network.clusteringCoefficient(),
-                                              *network.followsAvSd()))
-                    network.update()
+    def Simulation(netfile, eventfile, prob_like, prob_foll, *,
+                   mode="full", stats=STATS, interval=1,
+                   checkpoint=None) -> DSADeque:
+        """
+        Runs a simulation from a network file and an event file.
+        If the checkpoint file exists, the simulation saved in it is resumed
+        instead, and only the statistics logged after the checkpoint are
+        returned. Otherwise, the simulation is checkpointed to that file
+        as it runs.
+        """
+        if isinstance(eventfile, SocialNetworkEvents) or mode == "stream":
+            events = eventfile
+        else:
+            events = SocialNetworkEvents.compile(eventfile)
+        if checkpoint is not None and os.path.exists(checkpoint):
+            state = SocialNetworkSimRunner.Resume(checkpoint, events)
+        else:
+            network = SocialNetwork(probLike=prob_like, probFollow=prob_foll)
+            network.loadNetwork(netfile)
+            state = SocialNetworkSimRunner.ExecEventFile(
+                network, events, mode=mode, stats=stats, interval=interval,
+                checkpoint=checkpoint)
+        return state
+
+    @staticmethod
+    def ExecEventFile(network, events, *, mode="full", stats=STATS,
+                      interval=1, checkpoint=None,
+                      checkpointInterval=CHECKPOINT_INTERVAL
+                      ) -> DSADeque:
+        """
+        Executes each event on the network. events is either a
+        :class:`SocialNetworkEvents.SocialNetworkEvents`, or the lines of an
+        event file, which are compiled (and so fully validated) before any
+        event is executed. T:<time> lines are ignored outside of timed mode.
+
+        In full mode, statistics are logged before every timestep of every
+        post. Only the statistics named in stats (a subset of
+        :attr:`STATS`) are calculated, and the rest are logged as None.
+        If interval is greater than 1, statistics are only calculated and
+        logged for every interval'th timestep of the simulation.
+
+        In summary mode, each post is run to completion without any
+        intermediate statistics, and only the outcome of each post is logged.
+
+        In concurrent mode, posts do not block the following events.
+        Every post is started when it is read, and once all events have been
+        executed, all posts are propagated at the same time using a
+        :class:`SocialNetworkFeed.SocialNetworkFeed`.
+        Only the outcome of each post is logged.
+
+        In timed mode, events are run by a
+        :class:`SocialNetworkScheduler.SocialNetworkScheduler`, which
+        interleaves events with the timesteps of all posts in flight
+        according to the T:<time> lines of the event file.
+        Only the outcome of each post is logged.
+
+        In stream mode, events are run as in summary mode, but are read and
+        executed a chunk at a time by :func:`ExecEventStream`.
+
+        In full and summary mode, the simulation can be saved to the
+        checkpoint file at most once every checkpointInterval seconds,
+        between posts or timesteps, and once all events have been executed.
+        The simulation can then be continued with :func:`Resume`.
+        """
+        if mode not in SocialNetworkSimRunner.MODES:
+            raise ValueError(f"Unknown simulation mode {mode}.")
+        for x in stats:
+            if x not in SocialNetworkSimRunner.STATS:
+                raise ValueError(f"Unknown statistic {x}.")
+        if interval < 1:
+            raise ValueError("Interval must be at least 1.")
+        if checkpoint is not None and mode not in ("full", "summary"):
+            raise ValueError(f"Cannot checkpoint in {mode} mode.")
+        if mode == "timed":
+            return SocialNetworkSimRunner._ExecTimed(network, events)
+        if mode == "stream":
+            results = SocialNetworkSimRunner.ExecEventStream(network, events)
+        else:
+            if not isinstance(events, SocialNetworkEvents):
+                events = SocialNetworkEvents.compile(events)
+            save = None
+            if checkpoint is not None:
+                save = SocialNetworkSimRunner._Checkpointer(
+                    network, events, checkpoint, checkpointInterval)
+            results = SocialNetworkSimRunner._ExecBatches(
+                network, events, events.batches(), mode=mode, stats=stats,
+                interval=interval, save=save)
+        state = DSADeque()
+        for x in results:
+            state.insertLast(x)
+        return state
+
+    @staticmethod
+    def Resume(checkpoint: str, events, *,
+               checkpointInterval=CHECKPOINT_INTERVAL) -> DSADeque:
+        """
+        Continues a simulation saved by :func:`ExecEventFile` from the exact
+        event and timestep it was saved at, with the same random state.
+        events must be the events the simulation was started with.
+        The checkpoint file continues to be updated as the simulation runs.
+
+        Returns:
+            The statistics logged after the checkpoint was saved.
+        """
+        saved = SocialNetworkCheckpoint.load(checkpoint)
+        if not isinstance(events, SocialNetworkEvents):
+            events = SocialNetworkEvents.compile(events)
+        if SocialNetworkSimRunner._Digest(events) != saved.progress.digest:
+            raise ValueError("Checkpoint was not saved with these events.")
+        saved.restoreRandomState()
+        progress = saved.progress
+        results = SocialNetworkSimRunner._ExecBatches(
+            saved.network, events, events.batches(progress.event),
+            mode=progress.mode, stats=progress.stats,
+            interval=progress.interval, start=progress,
+            save=SocialNetworkSimRunner._Checkpointer(
+                saved.network, events, checkpoint, checkpointInterval))
+        state = DSADeque()
+        for x in results:
+            state.insertLast(x)
+        return state
+
+    @staticmethod
+    def _Checkpointer(network, events, filename, seconds):
+        """
+        Returns a function that saves the progress of a simulation to
+        filename if seconds have passed since the last save, or if every
+        event has been executed.
+        """
+        digest = SocialNetworkSimRunner._Digest(events)
+        last = time.monotonic()
+
+        def save(progress):
+            nonlocal last
+            finished = progress.event == len(events) and not progress.running
+            if finished or time.monotonic() - last >= seconds:
+                SocialNetworkCheckpoint.capture(
+                    network, progress._replace(digest=digest)).save(filename)
+                last = time.monotonic()
+        return save
+
+    @staticmethod
+    def _Digest(events) -> str:
+        return hashlib.sha1(events.tobytes()).hexdigest()
+
+    @staticmethod
+    def ExecEventStream(network, lines, *, mode="summary", stats=STATS,
+                        interval=1):
+        """
+        Executes events as they are read from lines, which may be an
+        unbounded stream such as stdin or a named pipe, and generates the
+        logged statistics as soon as they are available.
+        Only full and summary mode can be streamed.
+
+        Lines are compiled and applied in chunks of at most
+        :attr:`STREAM_BATCH` events, and each post is run as soon as it is
+        read. Lines are only read once the previous results have been
+        consumed, so a slow consumer blocks the writer of the stream rather
+        than causing events to build up in memory. As an invalid line is
+        only found when it is read, the events before it will have already
+        been executed. In summary mode, each post is removed from the
+        network once it has been logged, so that memory use does not grow
+        with the number of posts.
+        """
+        if mode not in ("full", "summary"):
+            raise ValueError(f"Cannot stream events in {mode} mode.")
+        if isinstance(lines, SocialNetworkEvents):
+            events = lines
+            batches = lines.batches()
+        else:
+            events = SocialNetworkEvents()
+            batches = SocialNetworkSimRunner._StreamBatches(events, lines)
+        return SocialNetworkSimRunner._ExecBatches(
+            network, events, batches, mode=mode, stats=stats,
+            interval=interval, keepPosts=mode != "summary")
+
+    @staticmethod
+    def _StreamBatches(events, lines):
+        """
+        Compiles lines into events a chunk at a time, and generates the
+        batches of each chunk. Only the name table of events is kept
+        between chunks.
+        """
+        for i, x in enumerate(lines):
+            event = events.append(x.rstrip('\n'), i + 1)
+            if (event[0] == SocialNetworkEvents.POST
+               or len(events) >= SocialNetworkSimRunner.STREAM_BATCH):
+                yield from events.batches()
+                events.clear()
+        yield from events.batches()
+        events.clear()
+
+    @staticmethod
+    def _ExecBatches(network, events, batches, *, mode, stats, interval,
+                     keepPosts=True, start=None, save=None):
+        """
+        Executes batches, which are generated by events. start is the
+        :class:`SocialNetworkCheckpoint.SimProgress` to resume from, and
+        save(progress) is called between batches and timesteps with the
+        progress so far.
+        """
+        summary = mode == "summary"
+        concurrent = mode == "concurrent"
+        cursor, post, timestep = 0, 0, 0
+        feed = SocialNetworkFeed(network) if concurrent else None
+        feedPosts = []
+        executor = SocialNetworkEventExecutor(network, events)
+        if save is None:
+            def save(progress):
+                pass
+
+        def progress(running):
+            return SimProgress(mode, tuple(stats), interval, None, cursor,
+                               post, timestep, running)
+
+        if start is not None:
+            cursor, post, timestep = start.event, start.post, start.timestep
+            if start.running:
+                timestep = yield from SocialNetworkSimRunner._ExecTimesteps(
+                    network, post, timestep, stats=stats, interval=interval,
+                    save=lambda x: save(progress(True)._replace(timestep=x)))
                 post += 1
+        for event in batches:
+            save(progress(False))
+            cursor += len(event) if isinstance(event, list) else 1
+            if isinstance(event, list):
+                executor.applyAll(event)
+                if concurrent:
+                    feed.invalidate()
             else:
-                raise ValueError("Invalid file format.")
+                user = events.name(event[2])
+                content = events.content(event[3])
+                if concurrent:
+                    if executor.createPost(event, feed.addPost) is not None:
+                        feedPosts.append((post, user, content))
+                else:
+                    created = executor.createPost(event)
+                    if created is None:
+                        # Nothing to propagate
+                        pass
+                    elif summary:
+                        result = network.propagateToCompletion()
+                        yield SummaryStats(post, user, content,
+                                           len(result.likers),
+                                           len(result.follows),
+                                           result.timesteps)
+                    else:
+                        timestep = yield from (
+                            SocialNetworkSimRunner._ExecTimesteps(
+                                network, post, timestep, stats=stats,
+                                interval=interval,
+                                save=lambda x: save(
+                                    progress(True)._replace(timestep=x))))
+                    if created is not None and not keepPosts:
+                        network.removePost(created)
+                post += 1
+        save(progress(False))
+        if concurrent:
+            finished = []
+            while not feed.done():
+                for postId, _, result in feed.update():
+                    finished.append(SummaryStats(*feedPosts[postId],
+                                                 len(result.likers),
+                                                 len(result.follows),
+                                                 result.timesteps))
+            yield from sorted(finished)
+
+    @staticmethod
+    def _ExecTimesteps(network, post, timestep, *, stats, interval, save):
+        """
+        Runs the current post to completion in full mode, calling
+        save(timestep) before each timestep.
+
+        Returns:
+            The timestep of the simulation once the post is done.
+        """
+        while not network.done():
+            save(timestep)
+            if timestep % interval == 0:
+                yield SimStats(
+                    post,
+                    network.simstate() if "simstate" in stats else None,
+                    network.likesScaled() if "likes" in stats else None,
+                    network.clusteringCoefficient()
+                    if "clustering" in stats else None,
+                    *(network.followsAvSd() if "follows" in stats
+                      else (None, None)))
+            network.update()
+            timestep += 1
+        return timestep
+
+    @staticmethod
+    def _ExecTimed(network, events) -> DSADeque:
+        scheduler = SocialNetworkScheduler(network)
+        scheduler.load(events)
+        stats = scheduler.run()
+        print(f"Processed {stats.events} events and timesteps in "
+              f"{stats.seconds:.3f}s ({stats.eventsPerSecond:.0f} per second)")
+        state = DSADeque()
+        for x in scheduler.results():
+            state.insertLast(SummaryStats(x.post, x.user, x.content, x.likes,
+                                          x.follows, x.end - x.start))
         return state
 
     @staticmethod
@@ -173,7 +481,7 @@ class SocialNetworkSimRunner:
                 # If an end is reached, or a certain threshold, then a random
                 # node is selected to be connected.
                 threshold = 5
-                walk = DSALinkedList()
+                walk = DSADeque()
                 walk.insertLast(node)
                 exhausted = False
                 done = False
@@ -243,6 +551,9 @@ class SocialNetworkSimRunner:
         follower_sd_mult_av = [0, 0.5]
         clickbait_sd = [0, 1]
         posts = 50
+        # Each post file is only generated and compiled once per
+        # (size, clickbait_sd), and is shared by every run that uses it.
+        events = {}
 
         def runSim(lp, fp, sz, favg, fsd, csd):
             netfile = (SocialNetworkSimRunner.
@@ -250,11 +561,16 @@ class SocialNetworkSimRunner:
                                              follower_av=favg * sz,
                                              follower_sd=fsd * favg * sz,
                                              clustering_func=lambda x: 0))
-            postfile = SocialNetworkSimRunner.GeneratePosts(size=sz,
-                                                            post_num=posts,
-                                                            clickbait_sd=csd)
-            with open(netfile, 'r') as net, open(postfile, 'r') as event:
-                stats = SocialNetworkSimRunner.Simulation(net, event, lp, fp)
+            if (sz, csd) not in events:
+                postfile = (SocialNetworkSimRunner.
+                            GeneratePosts(size=sz, post_num=posts,
+                                          clickbait_sd=csd))
+                with open(postfile, 'r') as event:
+                    events[(sz, csd)] = SocialNetworkEvents.compile(event)
+            with open(netfile, 'r') as net:
+                stats = SocialNetworkSimRunner.Simulation(
+                    net, events[(sz, csd)], lp, fp,
+                    stats=("likes", "clustering", "follows"))
             stream(f"\n\nlike_prob:{lp},follow_prob:{fp},size:{sz},"
                    f"follower_average_mult_sz:{favg},"
                    f"follower_sd_mult_av:{fsd},clickbait_sd:{csd}\n")
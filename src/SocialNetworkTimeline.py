@@ -0,0 +1,65 @@
+from itertools import islice
+from typing import List
+
+from ADT.DSABucketQueue import DSABucketQueue
+from ADT.DSALinkedList import DSALinkedList
+
+
+class SocialNetworkTimeline:
+    """
+    This class holds the posts made by a user, from newest to oldest, along
+    with an index of the same posts by like count.
+
+    Posts are added in O(1) time, and a page of k posts is found in O(k)
+    time after skipping the posts before it, either by age or by likes.
+    The like index is a bucket queue, so it is kept up to date in O(1) time
+    for every like or unlike, and in a single move for every batch of likes,
+    as reported by :func:`likesChanged`.
+    """
+
+    def __init__(self):
+        self._posts = DSALinkedList()
+        self._byLikes = DSABucketQueue()
+        # Entry of each post in the like index, keyed by identity
+        self._entries = {}
+
+    def add(self, post: 'SocialNetworkPost'):
+        self._posts.insertFirst(post)
+        self._entries[id(post)] = self._byLikes.add(post, post.likeCount())
+
+    def remove(self, post: 'SocialNetworkPost') -> 'SocialNetworkPost':
+        entry = self._entries.pop(id(post), None)
+        if entry is None:
+            raise ValueError("Post is not in timeline.")
+        self._byLikes.remove(entry)
+        return self._posts.remove(post)
+
+    def likesChanged(self, post: 'SocialNetworkPost', change: int):
+        """
+        Records that post has gained change likes, or lost -change likes.
+        Posts that are not in the timeline are ignored.
+        """
+        entry = self._entries.get(id(post))
+        if entry is not None:
+            self._byLikes.move(entry, change)
+
+    def latest(self, k: int, start: int = 0) -> List['SocialNetworkPost']:
+        """
+        Returns up to k posts, from newest to oldest, skipping the newest
+        start posts.
+        """
+        return list(islice(self._posts, start, start + k))
+
+    def mostLiked(self, k: int, start: int = 0) -> List['SocialNetworkPost']:
+        """
+        Returns up to k posts, from most to least liked, skipping the most
+        liked start posts. Posts with the same number of likes are in the
+        order they reached that number.
+        """
+        return self._byLikes.top(start + k)[start:]
+
+    def __len__(self):
+        return len(self._posts)
+
+    def __iter__(self):
+        return iter(self._posts)
@@ -1,6 +1,5 @@
 from functools import total_ordering
 from typing import List
-
 from ADT.DSADirectedGraph import *
 from ADT.DSALinkedList import *
 
@@ -22,23 +21,62 @@ class SocialNetworkUser:
     specific functionality. This means that the underlying implementation of
     a user may be changed without breaking any code that uses the
     SocialNetworkUser class.
+
+    A single SocialNetworkUser is created for each vertex, and is returned
+    whenever that vertex is wrapped again, so users can be passed around
+    and compared without creating new objects. The handle also indexes the
+    posts the user has liked, which is kept up to date by SocialNetworkPost.
     """
 
-    def __init__(self, vertex: DSADirectedGraphVertex):
-        self._vertex = vertex
+    def __new__(cls, vertex: DSADirectedGraphVertex):
+        if vertex.handle is None:
+            vertex.handle = super().__new__(cls)
+            vertex.handle._vertex = vertex
+            # Liked posts in the order they were liked, keyed by identity
+            vertex.handle._likes = {}
+        return vertex.handle
 
     @property
-    def posts(self) -> DSALinkedList:
+    def posts(self) -> 'SocialNetworkTimeline':
         return self._vertex.value
 
     def addPost(self, post: 'SocialNetworkPost'):
-        self._vertex.value.insertFirst(post)
+        self._vertex.value.add(post)
+        self.touch()
+
+    def likedPosts(self) -> List['SocialNetworkPost']:
+        """
+        Returns the posts this user has liked, including their own posts,
+        in the order they were liked.
+        """
+        return list(self._likes.values())
+
+    def addLike(self, post: 'SocialNetworkPost'):
+        self._likes[id(post)] = post
+
+    def removeLike(self, post: 'SocialNetworkPost'):
+        self._likes.pop(id(post), None)
 
-    def followers(self) -> List['SocialNetworkUser']:
-        return [SocialNetworkUser(v) for _, v in self._vertex.predecessor]
+    def clearLikes(self):
+        self._likes.clear()
 
-    def following(self) -> List['SocialNetworkUser']:
-        return [SocialNetworkUser(v) for _, v in self._vertex.successor]
+    def touch(self):
+        """
+        Records that this user, or something they own, has changed.
+        """
+        self._vertex.touch()
+
+    def followers(self) -> 'SocialNetworkUserView':
+        return SocialNetworkUserView(self._vertex, True)
+
+    def following(self) -> 'SocialNetworkUserView':
+        return SocialNetworkUserView(self._vertex, False)
+
+    def followerCount(self) -> int:
+        return self._vertex.inDegree
+
+    def followingCount(self) -> int:
+        return self._vertex.outDegree
 
     def follow(self, user: 'SocialNetworkUser') -> bool:
         if self == user:
@@ -63,4 +101,39 @@ class SocialNetworkUser:
         return self._vertex is other._vertex
 
     def __lt__(self, other: 'SocialNetworkUser') -> bool:
-        return len(self.followers()) < len(other.followers())
+        return self._vertex.inDegree < other._vertex.inDegree
+
+
+class SocialNetworkUserView:
+    """
+    A live view of the followers or following of a user, which wraps the
+    edges of the vertex as they are iterated instead of copying them.
+    The view must not be iterated while the user's follows are changed.
+    """
+
+    def __init__(self, vertex: DSADirectedGraphVertex, followers: bool):
+        self._vertex = vertex
+        self._followers = followers
+
+    def _table(self) -> 'DSAHashTable':
+        # The tables of a vertex are replaced when it is unshared by a fork
+        if self._followers:
+            return self._vertex.predecessor
+        return self._vertex.successor
+
+    def __len__(self):
+        return len(self._table())
+
+    def __iter__(self):
+        for _, v in self._table():
+            yield SocialNetworkUser(v)
+
+    def __getitem__(self, index: int) -> 'SocialNetworkUser':
+        """
+        Returns the user at position index of the iteration order in O(1)
+        time.
+        """
+        return SocialNetworkUser(self._table().itemAt(index)[1])
+
+    def __contains__(self, user: 'SocialNetworkUser') -> bool:
+        return self._table().hasKey(user.name())
@@ -1,7 +1,12 @@
 import unittest
 
+from SocialNetworkCheckpoint import SocialNetworkCheckpoint
 from SocialNetworkCore import SocialNetwork
 from SocialNetworkSimRunner import SocialNetworkSimRunner
+from SocialNetworkDaemon import SocialNetworkDaemon
+from SocialNetworkEvents import SocialNetworkEvents
+from SocialNetworkFeed import SocialNetworkFeed
+from SocialNetworkScheduler import SocialNetworkScheduler
 
 
 class UnitTestSocialNetwork(unittest.TestCase):
@@ -79,6 +84,21 @@ class UnitTestSocialNetwork(unittest.TestCase):
         self.assertEqual(len(c.followers()), 1)
         self.assertEqual(len(c.following()), 0)
 
+    def testUserHandles(self):
+        network = SocialNetwork()
+        network.addUser("a")
+        network.addUser("b")
+        a = network.findUser("a")
+        self.assertIs(a, network.findUser("a"))
+        followers = a.followers()
+        network.follow("b", "a")
+        # Views follow later changes to the user
+        self.assertEqual(len(followers), 1)
+        self.assertIn(network.findUser("b"), followers)
+        self.assertNotIn(a, followers)
+        self.assertIs(next(iter(followers)), network.findUser("b"))
+        self.assertIs(next(iter(network.findUser("b").following())), a)
+
     def testNewPost(self):
         network = SocialNetwork()
         network.addUser("Jakob")
@@ -88,6 +108,41 @@ class UnitTestSocialNetwork(unittest.TestCase):
         network.addPost("Jakob", "Generic Meme")
         self.assertEqual(len(jakob.posts), 2)
 
+    def testTimeline(self):
+        network = SocialNetwork(probLike=1, probFollow=0)
+        for x in ["a", "b", "c"]:
+            network.addUser(x)
+        network.follow("b", "a")
+        posts = [network.addPost("a", str(i)) for i in range(5)]
+        timeline = network.findUser("a").posts
+        self.assertEqual([x.content for x in timeline.latest(2)],
+                         ["4", "3"])
+        self.assertEqual([x.content for x in timeline.latest(2, 4)], ["0"])
+        network.like("c")
+        network.propagateToCompletion()
+        network.addPost("b", "other")
+        posts[1].like(network.findUser("c"))
+        self.assertEqual([x.content for x in timeline.mostLiked(3)],
+                         ["4", "1", "0"])
+        posts[4].unlike(network.findUser("b"))
+        self.assertEqual([x.content for x in timeline.mostLiked(2, 1)],
+                         ["4", "0"])
+        network.removePost(posts[4])
+        self.assertEqual([x.content for x in timeline.mostLiked(2)],
+                         ["1", "0"])
+        self.assertEqual(len(timeline), 4)
+        # Ties keep the order they were reached in through a checkpoint
+        posts[0].like(network.findUser("c"))
+        posts[0].unlike(network.findUser("c"))
+        order = [x.content for x in timeline.mostLiked(4)]
+        self.assertEqual(order, ["1", "2", "3", "0"])
+        from SocialNetworkCheckpoint import SimProgress
+        data = SocialNetworkCheckpoint.capture(
+            network, SimProgress("full", (), 1, "", 0, 0, 0, False)).tobytes()
+        restored = SocialNetworkCheckpoint.frombytes(data).network
+        self.assertEqual([x.content for x in
+                          restored.findUser("a").posts.mostLiked(4)], order)
+
     def testLikeUnlike(self):
         network = SocialNetwork()
         network.addUser("Jakob")
@@ -103,6 +158,49 @@ class UnitTestSocialNetwork(unittest.TestCase):
                           ["bad content", "In bali atm", "meme"]):
             self.assertEqual(x2, x1.content)
 
+    def testLikedPosts(self):
+        from SocialNetworkCheckpoint import SimProgress
+        network = SocialNetwork(probLike=1, probFollow=0)
+        for x in ["a", "b", "c", "d"]:
+            network.addUser(x)
+        network.follow("b", "a")
+        network.follow("c", "b")
+        first = network.addPost("a", "first")
+        network.propagateToCompletion()
+        second = network.addPost("b", "second")
+        network.like("a")
+        network.like("d")
+        network.unlike("a")
+        network.propagateToCompletion()
+
+        def liked(user):
+            return [x.content for x in network.findUser(user).likedPosts()]
+        self.assertEqual(liked("a"), ["first"])
+        self.assertEqual(liked("c"), ["first", "second"])
+        self.assertEqual(liked("d"), ["second"])
+        data = SocialNetworkCheckpoint.capture(
+            network, SimProgress("full", (), 1, "", 0, 0, 0, False)).tobytes()
+        restored = SocialNetworkCheckpoint.frombytes(data).network
+        self.assertEqual([x.content for x in
+                          restored.findUser("c").likedPosts()],
+                         ["first", "second"])
+        network.removePost(first)
+        self.assertEqual(liked("c"), ["second"])
+        d = network.findUser("d")
+        network.removeUser("d")
+        self.assertEqual(d.likedPosts(), [])
+        self.assertEqual(second.likeCount(), 3)
+        # Removing the current post leaves nothing to like, even though
+        # other posts remain
+        third = network.addPost("c", "third")
+        network.propagateToCompletion()
+        network.removePost(third)
+        self.assertTrue(network.done())
+        self.assertRaises(ValueError, network.like, "a")
+        self.assertRaises(ValueError, network.update)
+        self.assertEqual(third.likeCount(), 1)
+        self.assertEqual(liked("a"), [])
+
     def d_testLoadSaveNetwork(self):
         network = SocialNetwork()
         network2 = SocialNetwork()
@@ -153,9 +251,529 @@ class UnitTestSocialNetwork(unittest.TestCase):
         network.removeUser("c")
         network.unfollow("d", "b")
         network.follow("b", "d")
-        for x1, x2 in zip(network.popularUsers(), ['d', 'b']):
+        self.assertEqual([x.name() for x in network.popularUsers(1)], ["d"])
+        for x1, x2 in zip(network.popularUsers(), ["d", "b"]):
             self.assertEqual(x1.name(), x2)
 
+    def testEpochCache(self):
+        network = SocialNetwork(probLike=1, probFollow=0)
+        network.addUser("a")
+        network.addUser("b")
+        network.follow("b", "a")
+        stats = network.optionalStats()
+        users = network.popularUsers()
+        self.assertIs(stats, network.optionalStats())
+        self.assertIs(users, network.popularUsers())
+        epoch = network.epoch
+        network.findUser("a").follow(network.findUser("b"))
+        self.assertNotEqual(epoch, network.epoch)
+        self.assertIsNot(users, network.popularUsers())
+        network.addPost("a", "content")
+        likes = network.likesScaled()
+        network.update()
+        self.assertNotEqual(likes, network.likesScaled())
+        epoch = network.epoch
+        network.unlike("b")
+        self.assertNotEqual(epoch, network.epoch)
+
+    def testFork(self):
+        import numpy.random
+        network = SocialNetwork(probLike=0.5, probFollow=0.5)
+        with open("../example/dark_crystal.net", 'r') as f:
+            network.loadNetwork(f)
+        save = network.save()
+        forks = [network.fork(), network.fork()]
+        self.assertEqual(forks[0].save(), save)
+        results = []
+        for x in [network] + forks:
+            numpy.random.seed(5)
+            x.addPost("Jen", "what if")
+            result = x.propagateToCompletion()
+            results.append(([u.name() for u in result.likers],
+                            [u.name() for u in result.follows],
+                            result.timesteps))
+        # Each branch propagates independently, in the same way
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(len(forks[0].popularPosts()), 1)
+        # Changes are only seen by the branch that made them
+        followers = len(network.findUser("Kira").followers())
+        forks[0].addUser("new")
+        forks[0].follow("new", "Kira")
+        forks[1].removeUser("Kira")
+        network.unfollow("Nebrie", "Kira")
+        self.assertEqual(len(network.findUser("Kira").followers()),
+                         followers - 1)
+        self.assertEqual(len(forks[0].findUser("Kira").followers()),
+                         followers + 1)
+        self.assertRaises(ValueError, network.findUser, "new")
+        self.assertRaises(ValueError, forks[1].findUser, "Kira")
+        self.assertEqual(forks[1].popularPosts()[0].content, "what if")
+        self.assertNotIn("new", [x.name() for x in network.popularUsers()])
+        self.assertIn("new", [x.name() for x in forks[0].popularUsers()])
+
+    def testPublish(self):
+        network = SocialNetwork()
+        network.addUser("a")
+        network.addUser("b")
+        network.follow("a", "b")
+        with network.publish() as shared:
+            self.assertEqual(shared.getVertexCount(), 2)
+            self.assertTrue(shared.hasEdge("a", "b"))
+            shared.addEdge("b", "a")
+            self.assertEqual(len(network.findUser("a").followers()), 0)
+
+    def testInfluence(self):
+        network = SocialNetwork(probLike=1, probFollow=0)
+        network.loadNetwork(list("abcdefghz") + [
+            "a:b", "a:c", "b:d", "e:f", "e:g", "e:h", "z:a", "z:f"])
+        reach = network.expectedLikes(samples=5, processes=1)
+        self.assertEqual([(x.user.name(), x.reach) for x in reach[:4]],
+                         [("z", 6), ("a", 4), ("e", 4), ("b", 2)])
+        # a adds nothing once z is chosen
+        chosen = network.influencers(3, samples=5, processes=1)
+        self.assertEqual([(x.user.name(), x.reach) for x in chosen],
+                         [("z", 6), ("e", 3), ("a", 0)])
+        network.probLike = 0
+        self.assertEqual({x.reach for x in network.expectedLikes(
+            samples=5, processes=1)}, {1})
+        self.assertRaises(ValueError, network.influencers, 10)
+        # The same samples are drawn however they are split between workers
+        network.probLike = 0.5
+        self.assertEqual(network.influencers(2, samples=20, processes=1,
+                                             seed=3),
+                         network.influencers(2, samples=20, processes=2,
+                                             seed=3))
+        # Estimates do not use the random state of the simulation
+        import numpy.random
+        numpy.random.seed(1)
+        expected = numpy.random.random_sample()
+        numpy.random.seed(1)
+        network.expectedLikes(samples=5, processes=1)
+        self.assertEqual(numpy.random.random_sample(), expected)
+
+    def testPropagateToCompletion(self):
+        network = SocialNetwork(probLike=1, probFollow=1)
+        for x in ["a", "b", "c", "d"]:
+            network.addUser(x)
+        network.follow("b", "a")
+        network.follow("c", "b")
+        network.addPost("a", "content")
+        summary = network.propagateToCompletion()
+        self.assertTrue(network.done())
+        self.assertEqual(summary.timesteps, 3)
+        self.assertEqual(sorted(x.name() for x in summary.likers),
+                         ["a", "b", "c"])
+        self.assertEqual([x.name() for x in summary.follows], ["c"])
+        self.assertRaises(ValueError, network.propagateToCompletion)
+
+    def testExposureAggregation(self):
+        # d is exposed by both b and c, so should like the post with
+        # probability 1 - (1 - 0.5)^2
+        import numpy.random
+        numpy.random.seed(0)
+        trials = 1000
+        likes = 0
+        for _ in range(trials):
+            network = SocialNetwork(probLike=0.5, probFollow=0)
+            for x in ["a", "b", "c", "d"]:
+                network.addUser(x)
+            network.follow("d", "b")
+            network.follow("d", "c")
+            network.addPost("a", "content")
+            network.like("b")
+            network.like("c")
+            network.update()
+            likes += sum(1 for x in network._currentPost.liked()
+                         if x.name() == "d")
+        self.assertAlmostEqual(likes / trials, 0.75, delta=0.05)
+
+    def testSkipSampling(self):
+        # 400 exposures with probability 0.05 should give 20 likes
+        # on average, whether or not skip sampling is used.
+        import numpy.random
+        from SocialNetworkPost import SocialNetworkPost
+        numpy.random.seed(0)
+
+        network = SocialNetwork(probLike=0.05, probFollow=0)
+        network.addUser("a")
+        for x in range(400):
+            network.addUser(str(x))
+            network.follow(str(x), "a")
+
+        def averageLikes(threshold):
+            SocialNetworkPost.SKIP_SAMPLING_THRESHOLD = threshold
+            total = 0
+            for _ in range(50):
+                network.addPost("a", "content")
+                network.update()
+                total += sum(1 for _ in network._currentPost.liked()) - 1
+            return total / 50
+
+        default = SocialNetworkPost.SKIP_SAMPLING_THRESHOLD
+        try:
+            self.assertAlmostEqual(averageLikes(1), 20, delta=2)
+            self.assertAlmostEqual(averageLikes(0), 20, delta=2)
+        finally:
+            SocialNetworkPost.SKIP_SAMPLING_THRESHOLD = default
+
+    def testFeed(self):
+        network = SocialNetwork(probLike=1, probFollow=1)
+        for x in ["a", "b", "c", "d"]:
+            network.addUser(x)
+        network.follow("b", "a")
+        network.follow("c", "b")
+        network.follow("d", "c")
+        feed = SocialNetworkFeed(network)
+        self.assertEqual(feed.addPost("a", "first"), 0)
+        self.assertEqual(feed.addPost("c", "second"), 1)
+        self.assertRaises(ValueError, feed.addPost, "e", "missing")
+        finished = {}
+        while not feed.done():
+            for postId, post, summary in feed.update():
+                finished[postId] = summary
+        self.assertEqual(finished[0].timesteps, 4)
+        self.assertEqual(sorted(x.name() for x in finished[0].likers),
+                         ["a", "b", "c", "d"])
+        self.assertEqual(sorted(x.name() for x in finished[0].follows),
+                         ["c", "d"])
+        self.assertEqual(finished[1].timesteps, 2)
+        self.assertEqual(sorted(x.name() for x in finished[1].likers),
+                         ["c", "d"])
+        self.assertEqual(len(network.findUser("a").followers()), 3)
+
+    def testScheduler(self):
+        network = SocialNetwork(probLike=1, probFollow=0)
+        for x in ["a", "b", "c", "d"]:
+            network.addUser(x)
+        network.follow("b", "a")
+        network.follow("c", "b")
+        scheduler = SocialNetworkScheduler(network)
+        # d follows b after b likes the post, but before b's followers
+        # are exposed to it.
+        scheduler.load(["P:a:first", "T:2", "F:b:d",
+                        "T:1000000", "P:d:second"])
+        stats = scheduler.run()
+        self.assertEqual(stats.events, 3 + 3 + 1)
+        self.assertEqual(stats.time, 1000001)
+        first, second = scheduler.results()
+        self.assertEqual((first.likes, first.start, first.end), (4, 0, 3))
+        self.assertEqual((second.likes, second.start, second.end),
+                         (1, 1000000, 1000001))
+        self.assertRaises(ValueError, scheduler.load, ["T:1", "T:0"])
+        self.assertRaises(ValueError, scheduler.load, ["X:a"])
+        # Names are only known once the events are loaded
+        network = SocialNetwork(probLike=1, probFollow=0)
+        scheduler = SocialNetworkScheduler(network)
+        scheduler.load(["A:a", "A:b", "F:a:b", "R:a", "R:x", "A:a"])
+        scheduler.run()
+        self.assertEqual(sorted(x.name() for x in network.users()),
+                         ["a", "b"])
+        self.assertEqual(len(network.findUser("b").following()), 0)
+
+    def testSelectedStats(self):
+        with open("../example/doremi.net", 'r') as net, \
+             open("../example/doremi.e2", 'r') as event:
+            full = SocialNetworkSimRunner.Simulation(net, event, 1, 1)
+        with open("../example/doremi.net", 'r') as net, \
+             open("../example/doremi.e2", 'r') as event:
+            likes = SocialNetworkSimRunner.Simulation(net, event, 1, 1,
+                                                      stats=("likes",),
+                                                      interval=2)
+        self.assertEqual(len(likes), (len(full) + 1) // 2)
+        for x1, x2 in zip(list(full)[::2], likes):
+            self.assertEqual(x1.likes, x2.likes)
+            self.assertIsNone(x2.simstate)
+            self.assertIsNone(x2.clustering)
+            self.assertIsNone(x2.favg)
+        self.assertRaises(ValueError, SocialNetworkSimRunner.ExecEventFile,
+                          SocialNetwork(), [], stats=("bogus",))
+
+    def testSummarySimulation(self):
+        with open("../example/doremi.net", 'r') as net, \
+             open("../example/doremi.e2", 'r') as event:
+            full = SocialNetworkSimRunner.Simulation(net, event, 1, 1)
+        with open("../example/doremi.net", 'r') as net, \
+             open("../example/doremi.e2", 'r') as event:
+            summary = SocialNetworkSimRunner.Simulation(net, event, 1, 1,
+                                                        mode="summary")
+        for x in summary:
+            self.assertEqual(x.timesteps,
+                             sum(1 for y in full if y.post == x.post))
+
+    def testCompiledEvents(self):
+        with open("../example/doremi.e2", 'r') as event:
+            events = SocialNetworkEvents.compile(event)
+        with open("../example/doremi.e2", 'r') as event:
+            lines = sum(1 for _ in event)
+        self.assertEqual(len(events), lines)
+        loaded = SocialNetworkEvents.frombytes(events.tobytes())
+        self.assertEqual(list(loaded), list(events))
+        self.assertEqual([loaded.name(i) for i in range(loaded.nameCount())],
+                         [events.name(i) for i in range(events.nameCount())])
+        # The same compiled events can be run many times
+        for _ in range(2):
+            with open("../example/doremi.net", 'r') as net:
+                summary = SocialNetworkSimRunner.Simulation(net, loaded, 1, 1,
+                                                            mode="summary")
+            self.assertEqual(len(summary),
+                             sum(1 for x in loaded
+                                 if x[0] == SocialNetworkEvents.POST))
+
+        with self.assertRaisesRegex(ValueError, "Line 2:"):
+            SocialNetworkEvents.compile(["A:a", "X:a:b"])
+        with self.assertRaisesRegex(ValueError, "Line 3:"):
+            SocialNetworkEvents.compile(["A:a", "P:a:b", "P:a:b:c"])
+        # Nothing is executed if any line is invalid
+        network = SocialNetwork()
+        self.assertRaises(ValueError, SocialNetworkSimRunner.ExecEventFile,
+                          network, ["A:a", "A:b:c"])
+        self.assertRaises(ValueError, network.findUser, "a")
+
+        combined = SocialNetworkEvents.compile(["A:a", "A:b"])
+        combined.extend(SocialNetworkEvents.compile(["F:b:a", "P:a:hi"]))
+        self.assertEqual([x[0] for x in combined],
+                         [SocialNetworkEvents.ADD, SocialNetworkEvents.ADD,
+                          SocialNetworkEvents.FOLLOW,
+                          SocialNetworkEvents.POST])
+        follow, post = list(combined.records(2))
+        self.assertEqual((combined.name(follow[2]), combined.name(follow[3])),
+                         ("b", "a"))
+        self.assertEqual(combined.content(post[3]), "hi")
+
+    def testBulkUpdates(self):
+        network = SocialNetwork()
+        errors = network.addUsers(["a", "b", "c", "a", "d:"])
+        self.assertEqual([str(x) if x else None for x in errors],
+                         [None, None, None, "a already exists.",
+                          "Invalid username."])
+        epoch = network.epoch
+        self.assertEqual(network.followAll([("b", "a"), ("c", "a"),
+                                            ("b", "a")]),
+                         [True, True, False])
+        self.assertEqual(network.epoch, epoch + 1)
+        self.assertRaises(ValueError, network.followAll,
+                          [("c", "b"), ("a", "a"), ("a", "b")])
+        # Pairs before the invalid pair are still applied
+        self.assertTrue(network.unfollow("c", "b"))
+        self.assertFalse(network.unfollow("a", "b"))
+        self.assertEqual(network.unfollowAll([("b", "a"), ("b", "a")]),
+                         [True, False])
+        self.assertRaises(ValueError, network.unfollowAll, [("x", "a")])
+        errors = network.removeUsers(["a", "a"])
+        self.assertEqual([x is None for x in errors], [True, False])
+        self.assertEqual(sorted(x.name() for x in network.popularUsers()),
+                         ["b", "c"])
+
+    def testStreamSimulation(self):
+        with open("../example/doremi.net", 'r') as net, \
+             open("../example/doremi.e2", 'r') as event:
+            summary = SocialNetworkSimRunner.Simulation(net, event, 1, 1,
+                                                        mode="summary")
+        read = []
+
+        def lines():
+            with open("../example/doremi.e2", 'r') as event:
+                for x in event:
+                    read.append(x)
+                    yield x
+        network = SocialNetwork(probLike=1, probFollow=1)
+        with open("../example/doremi.net", 'r') as net:
+            network.loadNetwork(net)
+        stream = SocialNetworkSimRunner.ExecEventStream(network, lines())
+        first = next(stream)
+        # Only the first post has been read
+        self.assertEqual(len(read), 1)
+        self.assertEqual(first, next(iter(summary)))
+        self.assertEqual([first] + list(stream), list(summary))
+        # Finished posts are not kept
+        self.assertEqual(network.popularPosts(), [])
+
+        # Users can be removed by events that are streamed in
+        with open("../example/toy_story.net", 'r') as net, \
+             open("../example/toy_story.e2", 'r') as event:
+            summary = SocialNetworkSimRunner.Simulation(net, event, 1, 1,
+                                                        mode="summary")
+        network = SocialNetwork(probLike=1, probFollow=1)
+        with open("../example/toy_story.net", 'r') as net:
+            network.loadNetwork(net)
+        with open("../example/toy_story.e2", 'r') as event:
+            self.assertIn("R:", event.read())
+            event.seek(0)
+            self.assertEqual(list(SocialNetworkSimRunner.
+                                  ExecEventStream(network, event)),
+                             list(summary))
+        self.assertRaises(ValueError, network.findUser, "Mrs Nesbitt")
+
+        # Long runs of events without posts are applied in chunks
+        network = SocialNetwork(probLike=1, probFollow=1)
+        count = 2 * SocialNetworkSimRunner.STREAM_BATCH + 1
+        lines = (f"A:{i}" for i in range(count))
+        self.assertEqual(list(SocialNetworkSimRunner.
+                              ExecEventStream(network, lines)), [])
+        self.assertEqual(sum(1 for _ in network.users()), count)
+        self.assertRaises(ValueError, SocialNetworkSimRunner.ExecEventStream,
+                          network, [], mode="timed")
+
+    def testConcurrentSimulation(self):
+        for name, eventFile in (("doremi", "doremi.e2"),
+                                ("toy_story", "toy_story.e2"),
+                                ("dark_crystal", "dark_crystal.e1")):
+            network = SocialNetwork(probLike=1, probFollow=0)
+            with open(f"../example/{name}.net", 'r') as net, \
+                 open(f"../example/{eventFile}", 'r') as event:
+                network.loadNetwork(net)
+                events = SocialNetworkEvents.compile(event)
+            results = list(SocialNetworkSimRunner.ExecEventFile(
+                network, events, mode="concurrent"))
+            self.assertEqual(len(results),
+                             sum(1 for x in events
+                                 if x[0] == SocialNetworkEvents.POST))
+            self.assertEqual([x.post for x in results],
+                             list(range(len(results))))
+            # Posts only propagate once every event has run, so each post
+            # reaches every user that transitively follows its poster in
+            # the final network, one level per timestep
+            for x in results:
+                seen = {x.user}
+                level = [x.user]
+                timesteps = 0
+                while level:
+                    timesteps += 1
+                    followers = []
+                    for u in level:
+                        for f in network.findUser(u).followers():
+                            if f.name() not in seen:
+                                seen.add(f.name())
+                                followers.append(f.name())
+                    level = followers
+                self.assertEqual((x.likes, x.follows, x.timesteps),
+                                 (len(seen), 0, timesteps))
+
+    def testCheckpoint(self):
+        import os
+        import tempfile
+        import numpy.random
+        with open("../example/doremi.e2", 'r') as event:
+            events = SocialNetworkEvents.compile(event)
+        digest = SocialNetworkSimRunner._Digest(events)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "checkpoint")
+            for mode in ("full", "summary"):
+                numpy.random.seed(0)
+                network = SocialNetwork(probLike=0.5, probFollow=0.5)
+                with open("../example/doremi.net", 'r') as net:
+                    network.loadNetwork(net)
+                results = []
+                saves = []
+                saved = []
+
+                def save(progress):
+                    # Checkpoint part way through the simulation, during a
+                    # post in full mode and between posts in summary mode
+                    if (len(saves) >= 3 and len(saved) == 0
+                       and progress.running == (mode == "full")):
+                        SocialNetworkCheckpoint.capture(
+                            network, progress._replace(digest=digest)
+                        ).save(filename)
+                        saved.append(len(results))
+                    saves.append(progress)
+                results.extend(SocialNetworkSimRunner._ExecBatches(
+                    network, events, events.batches(), mode=mode,
+                    stats=SocialNetworkSimRunner.STATS, interval=1,
+                    save=save))
+                self.assertEqual(len(saved), 1)
+                numpy.random.seed(1)
+                self.assertEqual(list(SocialNetworkSimRunner.Resume(filename,
+                                                                    events)),
+                                 results[saved[0]:])
+                # Once finished, resuming does nothing
+                self.assertEqual(list(SocialNetworkSimRunner.Resume(filename,
+                                                                    events)),
+                                 [])
+            self.assertRaises(ValueError, SocialNetworkSimRunner.Resume,
+                              filename, ["A:someone"])
+            with open(filename, 'r+b') as f:
+                f.truncate(100)
+            self.assertRaises(ValueError, SocialNetworkCheckpoint.load,
+                              filename)
+            self.assertRaises(ValueError,
+                              SocialNetworkSimRunner.ExecEventFile,
+                              SocialNetwork(), [], mode="concurrent",
+                              checkpoint=filename)
+
+    def testDaemon(self):
+        import asyncio
+        import os
+        import tempfile
+
+        async def send(connection, lines):
+            reader, writer = connection
+            writer.write("".join(x + "\n" for x in lines).encode())
+            await writer.drain()
+            return [(await reader.readline()).decode().rstrip("\n")
+                    for _ in lines]
+
+        async def run(**address):
+            daemon = SocialNetworkDaemon()
+            await daemon.start(**address)
+            if "path" in address:
+                connect = asyncio.open_unix_connection(address["path"])
+            else:
+                connect = asyncio.open_connection(*daemon.address)
+            c1 = await connect
+            if "path" in address:
+                c2 = await asyncio.open_unix_connection(address["path"])
+            else:
+                c2 = await asyncio.open_connection(*daemon.address)
+            self.assertEqual(await send(c1, ["net:LOAD:../example/doremi.net"
+                                             ":1:0", "net:NEW:1:0",
+                                             "other:F:a:b"]),
+                             ["OK", "ERROR net already exists.",
+                              "ERROR Network does not exist."])
+            # Pipelined requests from two connections at the same time
+            r1, r2 = await asyncio.gather(
+                send(c1, ["net:A:x", "net:F:Do:x", "net:F:Do:x",
+                          "net:P:Do:hello", "net:STATS"]),
+                send(c2, ["net:X", "net:A:x", "net:P:nobody:hi",
+                          "net:USERS"]))
+            self.assertEqual(r1[:3], ["OK", "OK",
+                                      "ERROR x already follows Do."])
+            self.assertTrue(r1[3].startswith("OK likes:"))
+            self.assertTrue(r1[4].startswith("OK likes:"))
+            self.assertEqual(r2[:3], ["ERROR Invalid file format.",
+                                      "ERROR x already exists.",
+                                      "ERROR Could not create post."])
+            self.assertIn("x", r2[3].split(" ")[1].split(","))
+            self.assertEqual(await send(c2, ["net:CLOSE", "net:STATS"]),
+                             ["OK", "ERROR Network does not exist."])
+            # A failed load does not leave the network behind
+            self.assertEqual(await send(c1, ["m:LOAD:/nonexistent:1:0",
+                                             "m:USERS"]),
+                             ["ERROR Could not read /nonexistent.",
+                              "ERROR Network does not exist."])
+            # Requests are run in the order they are sent
+            self.assertEqual(await send(c1, ["m:NEW:1:1", "m:A:a", "m:A:b",
+                                             "m:USERS", "m:A:c", "m:USERS",
+                                             "m:USERS", "m:P:a:x", "m:F:a:b",
+                                             "m:STATS", "m:R:c",
+                                             "m:USERS"]),
+                             ["OK", "OK", "OK", "OK a,b", "OK",
+                              "OK a,b,c", "OK a,b,c",
+                              "OK likes:1 follows:0 timesteps:1", "OK",
+                              "OK likes:0.3333333333333333 "
+                              "favg:0.3333333333333333 "
+                              "fsd:0.4714045207910317 "
+                              "clustering:0.16666666666666666",
+                              "OK", "OK a,b"])
+            for _, writer in (c1, c2):
+                writer.close()
+            await daemon.close()
+
+        asyncio.run(run())
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(run(path=os.path.join(directory, "daemon.sock")))
+
     def testPropogatePost(self):
         # Algorithm is deterministic when probabilities = 1
         with open("../example/doremi.net", 'r') as net, \